@@ -0,0 +1,74 @@
+"""
+Benchmark for batched task assignment (FleetManager.assign_tasks).
+
+A wave of orders lands on a fleet of idle robots. The orders are assigned once one at a
+time, each to the highest-priority idle robot (as assign_to_highest did, one find_path
+per order), and as a batch, weighing the 16 nearest candidates of each order (the default)
+and every pair. Reports wall time, and the total and priority-weighted travel time of the
+assigned routes.
+
+Run from the fleet_management_system directory:
+
+    python -m benchmarks.bench_assign_tasks [robots] [orders] [grid_size]
+"""
+import random
+import sys
+import time
+
+from benchmarks.synthetic import load_grid_graph
+from src.controllers.simulation_engine import SimulationEngine
+from src.utils.logger import configure_logging
+
+
+def make_fleet(nav_graph, robots, seed):
+    engine = SimulationEngine(nav_graph)
+    rng = random.Random(seed)
+    for pos_idx in rng.sample(range(len(nav_graph.vertices)), robots):
+        engine.spawn_robot(pos_idx, rng.randint(1, 5))
+    return engine
+
+
+def route_cost(nav_graph, robot):
+    cost, current = 0.0, robot.pos_idx
+    for idx in robot.path:
+        cost += nav_graph.travel_time(current, idx)
+        current = idx
+    return cost
+
+
+def report(label, nav_graph, engine, elapsed):
+    busy = [r for r in engine.fleet_manager.robots if r.status == "moving"]
+    total = sum(route_cost(nav_graph, r) for r in busy)
+    weighted = sum(route_cost(nav_graph, r) * r.priority for r in busy)
+    print(f"  {label:<12} {elapsed * 1000:9.1f} ms  {len(busy):4d} assigned  "
+          f"travel {total:9.1f} s  priority-weighted {weighted:10.1f}")
+
+
+def main():
+    robots = int(sys.argv[1]) if len(sys.argv) > 1 else 250
+    orders = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    size = int(sys.argv[3]) if len(sys.argv) > 3 else 60
+    configure_logging(path=None, console=False)
+    nav_graph = load_grid_graph(size, size, drop_ratio=0.1, seed=1)
+    rng = random.Random(9)
+    print(f"{robots} idle robots, {orders} orders, {size}x{size} grid")
+
+    engine = make_fleet(nav_graph, robots, seed=3)
+    occupied = {r.pos_idx for r in engine.fleet_manager.robots}
+    goals = rng.sample([v for v in range(len(nav_graph.vertices)) if v not in occupied], orders)
+    started = time.perf_counter()
+    for goal_idx in goals:
+        idle = [r for r in engine.fleet_manager.robots if r.status == "idle"]
+        if idle:
+            engine.assign_task(max(idle, key=lambda r: r.priority), goal_idx)
+    report("sequential", nav_graph, engine, time.perf_counter() - started)
+
+    for label, candidates in (("batch", 16), ("all pairs", max(robots, orders))):
+        engine = make_fleet(nav_graph, robots, seed=3)
+        started = time.perf_counter()
+        engine.fleet_manager.assign_tasks(goals, candidates=candidates)
+        report(label, nav_graph, engine, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark for the canvas spatial index and viewport culling (src/gui/viewport.py).
+
+Lays a large grid out on a 1000x700 canvas the way FleetGUI.draw_level does and reports:
+- the time to build the vertex and lane indexes;
+- the cost of a click hit-test with the grid against the linear scan over all vertices
+  it replaces (both must pick the same vertices);
+- for a range of zoom levels, the vertices and lanes left in view after culling and the
+  time the viewport query takes. No Tk display is needed.
+
+Run from the fleet_management_system directory:
+
+    python -m benchmarks.bench_canvas_index [rows] [cols] [clicks]
+"""
+import math
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.synthetic import make_grid_graph
+from src.gui.viewport import SpatialGrid, Viewport
+
+WIDTH, HEIGHT, PADDING, PICK_RADIUS = 1000, 700, 50, 15
+
+
+def layout(graph):
+    level = graph["levels"]["level1"]
+    xs = [v[0] for v in level["vertices"]]
+    ys = [v[1] for v in level["vertices"]]
+    graph_width = max(xs) - min(xs) or 1
+    graph_height = max(ys) - min(ys) or 1
+    scale = min((WIDTH - 2 * PADDING) / graph_width, (HEIGHT - 2 * PADDING) / graph_height)
+    x_offset = (WIDTH - graph_width * scale) / 2 - min(xs) * scale
+    y_offset = (HEIGHT - graph_height * scale) / 2 - min(ys) * scale
+    nodes = {i: (int(x * scale + x_offset), int(y * scale + y_offset)) for i, (x, y) in enumerate(zip(xs, ys))}
+    lanes = [(start, end) for start, end, _ in level["lanes"]]
+    return nodes, lanes
+
+
+def linear_pick(nodes, x, y):
+    return next((i for i, (vx, vy) in nodes.items() if abs(vx - x) < PICK_RADIUS and abs(vy - y) < PICK_RADIUS), None)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    clicks = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    nodes, lanes = layout(make_grid_graph(rows, cols, spacing=2.0, drop_ratio=0.1, seed=3))
+    print(f"{len(nodes)} vertices, {len(lanes)} lanes on a {WIDTH}x{HEIGHT} canvas")
+
+    started = time.perf_counter()
+    lane_length = max(statistics.median(math.dist(nodes[s], nodes[e]) for s, e in lanes), 1.0)
+    node_index = SpatialGrid(lane_length)
+    for i, (x, y) in nodes.items():
+        node_index.insert(i, x, y)
+    lane_index = SpatialGrid(lane_length)
+    for start, end in lanes:
+        lane_index.insert_segment((start, end), *nodes[start], *nodes[end])
+    print(f"  index build  {(time.perf_counter() - started) * 1000:9.1f} ms (cell {lane_length:.1f} px)")
+
+    rng = random.Random(5)
+    points = [(rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT)) for _ in range(clicks)]
+    started = time.perf_counter()
+    linear = [linear_pick(nodes, x, y) for x, y in points]
+    linear_time = (time.perf_counter() - started) / clicks
+    started = time.perf_counter()
+    picked = [node_index.within(x, y, PICK_RADIUS) for x, y in points]
+    grid_time = (time.perf_counter() - started) / clicks
+    # The linear scan returns the first vertex in range, the grid the nearest: compare the hit sets
+    agree = all((hit is None) == (not hits) and (hit is None or hit in hits) for hit, hits in zip(linear, picked))
+    print(f"  hit-test     {linear_time * 1e6:9.1f} us linear, {grid_time * 1e6:.1f} us grid "
+          f"(x{linear_time / grid_time:.0f}), {'same picks' if agree else 'DIFFERENT picks'}")
+
+    view = Viewport(WIDTH, HEIGHT)
+    for zoom in (1, 2, 4, 8, 16, 32, 64):
+        view.reset()
+        view.zoom_at(WIDTH / 2, HEIGHT / 2, zoom)
+        box = view.visible_box(30)
+        started = time.perf_counter()
+        visible = node_index.query(*box)
+        visible_lanes = lane_index.query(*box)
+        elapsed = time.perf_counter() - started
+        print(f"  zoom {zoom:3d}     {len(visible):7d} vertices {len(visible_lanes):7d} lanes in view, "
+              f"query {elapsed * 1000:7.2f} ms, lanes {lane_length * zoom:6.1f} px")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark for fleet checkpoints (src/utils/checkpoint.py).
+
+Builds a busy fleet on a large grid, then reports:
+- the pause of the tick loop while the state is copied and packed, and the time the
+  background compression and write take, with the tick time measured during the write
+  and without one;
+- the file size per robot;
+- the time to restore the checkpoint into a new engine, against building the same state
+  again from scratch (spawning, assigning and simulating up to the checkpoint time).
+Finally both engines run on and must stay identical.
+
+Run from the fleet_management_system directory:
+
+    python -m benchmarks.bench_checkpoint [robots] [warmup_ticks] [grid_size]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import make_grid_graph
+from src.controllers.simulation_engine import SimulationEngine
+from src.models.nav_graph import NavGraph
+from src.utils.checkpoint import capture_state, pack_state
+from src.utils.logger import configure_logging
+
+
+def build(graph_path, robots, ticks):
+    engine = SimulationEngine(NavGraph(graph_path))
+    rng = random.Random(7)
+    vertex_count = engine.nav_graph.vertex_count
+    for pos_idx in rng.sample(range(vertex_count), robots):
+        engine.spawn_robot(pos_idx, rng.randint(1, 5))
+    for tick in range(ticks):
+        if tick % 50 == 0:
+            for robot in engine.fleet_manager.robots:
+                if robot.status in ("idle", "task complete"):
+                    engine.assign_task(robot, rng.randrange(vertex_count))
+        engine.tick()
+    return engine, rng
+
+
+def tick_time(engine, ticks):
+    started = time.perf_counter()
+    for _ in range(ticks):
+        engine.tick()
+    return (time.perf_counter() - started) / ticks
+
+
+def state_key(engine):
+    traffic_manager = engine.traffic_manager
+    return ([(r.id, r.pos_idx, r.status, r.progress, tuple(r.path)) for r in engine.fleet_manager.robots],
+            traffic_manager.trip_times, traffic_manager.replan_count, engine.time)
+
+
+def main():
+    robots = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    warmup = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    size = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    configure_logging(path=None, console=False)
+
+    with tempfile.TemporaryDirectory() as directory:
+        graph_path = os.path.join(directory, "grid.json")
+        with open(graph_path, "w") as f:
+            json.dump(make_grid_graph(size, size, spacing=2.0, drop_ratio=0.1, seed=3), f)
+        checkpoint = os.path.join(directory, "fleet.flckpt")
+
+        started = time.perf_counter()
+        engine, rng = build(graph_path, robots, warmup)
+        cold = time.perf_counter() - started
+        print(f"{robots} robots, {size}x{size} grid, checkpoint at t={engine.time:.1f} s")
+
+        capture_state(engine, rng)  # The first one also hashes the map file
+        started = time.perf_counter()
+        pack_state(capture_state(engine, rng))
+        pause = time.perf_counter() - started
+
+        future = engine.save_checkpoint(checkpoint, rng)
+        started = time.perf_counter()
+        finished = []
+        future.add_done_callback(lambda _: finished.append(time.perf_counter()))
+        saved_at = engine.time
+        during, ticks = 0.0, 0
+        while not future.done():
+            during += tick_time(engine, 1)
+            ticks += 1
+        future.result()
+        written = finished[0] - started
+        baseline = tick_time(engine, 5)  # Right after: tick times drift as the fleet spreads out
+        print(f"  pause     {pause * 1000:8.2f} ms to copy and pack the state")
+        print(f"  write     {written * 1000:8.2f} ms in the background ({ticks} ticks ran meanwhile, "
+              f"{during / max(ticks, 1) * 1000:.2f} ms/tick vs {baseline * 1000:.2f} ms/tick)")
+        size_bytes = os.path.getsize(checkpoint)
+        print(f"  file      {size_bytes / 1024:8.1f} KiB ({size_bytes / robots:.1f} bytes per robot)")
+
+        started = time.perf_counter()
+        NavGraph(graph_path)
+        load = time.perf_counter() - started
+        started = time.perf_counter()
+        restored = SimulationEngine.from_checkpoint(checkpoint, rng=random.Random())
+        warm = time.perf_counter() - started
+        print(f"  restore   {warm * 1000:8.2f} ms, {load * 1000:.0f} ms of it loading the map "
+              f"(building it again: {cold * 1000:.0f} ms, x{cold / warm:.0f})")
+
+        # The original ran on while the checkpoint was written: bring the copy to the same time
+        while restored.time < engine.time - 1e-9:
+            restored.tick()
+        assert restored.time == engine.time and saved_at <= engine.time
+        for _ in range(100):
+            engine.tick()
+            restored.tick()
+        print("  continued identically" if state_key(engine) == state_key(restored) else "  DIVERGED")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Microbenchmark for TrafficManager path search.
+
+Compares the previous path-copying A* (every heap push carried ``path + [neighbor]``) with the
+parent-pointer A* and the bidirectional mode. Reports time per query, peak traced memory per
+query, and the bytes of path lists copied per query (zero for the parent-pointer searches).
+
+Run from the fleet_management_system directory:
+
+    python -m benchmarks.bench_find_path [rows] [cols] [queries]
+"""
+import heapq
+import random
+import sys
+import time
+import tracemalloc
+
+from benchmarks.synthetic import load_grid_graph
+from src.controllers.traffic_manager import TrafficManager
+
+
+def legacy_find_path(nav_graph, start_idx, goal_idx, copied=None):
+    """
+    The former search loop, kept here as the baseline: one list copy per heap push.
+
+    :param copied: Optional one-element list accumulating the bytes of path lists allocated.
+    """
+    def heuristic(idx1, idx2):
+        x1, y1 = nav_graph.get_vertex_coords(idx1)
+        x2, y2 = nav_graph.get_vertex_coords(idx2)
+        return ((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5
+
+    open_set = [(0, start_idx, [start_idx])]
+    g_score = {start_idx: 0}
+    while open_set:
+        _, current, path = heapq.heappop(open_set)
+        if current == goal_idx:
+            return path[1:]
+        for neighbor, _, _ in nav_graph.neighbors(current):
+            tentative_g_score = g_score[current] + heuristic(current, neighbor)
+            if tentative_g_score < g_score.get(neighbor, float('inf')):
+                g_score[neighbor] = tentative_g_score
+                new_path = path + [neighbor]
+                if copied is not None:
+                    copied[0] += sys.getsizeof(new_path)
+                heapq.heappush(open_set, (tentative_g_score + heuristic(neighbor, goal_idx), neighbor, new_path))
+    return []
+
+
+def measure(label, search, queries, copied_bytes=0):
+    # Time without tracing, then a second pass under tracemalloc for allocation totals
+    started = time.perf_counter()
+    for start_idx, goal_idx in queries:
+        search(start_idx, goal_idx)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    peak = 0
+    for start_idx, goal_idx in queries:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        search(start_idx, goal_idx)
+        _, query_peak = tracemalloc.get_traced_memory()
+        peak += query_peak - before
+    tracemalloc.stop()
+
+    print(f"{label:<16} {elapsed / len(queries) * 1000:9.3f} ms/query  "
+          f"peak {peak / len(queries) / 1024:9.1f} KiB/query  "
+          f"path copies {copied_bytes / len(queries) / 1024:10.1f} KiB/query")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 120
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+
+    nav_graph = load_grid_graph(rows, cols, drop_ratio=0.15, seed=1)
+    num_vertices = len(nav_graph.vertices)
+    rng = random.Random(7)
+    # Long cross-map routes: start in the first tenth of the map, goal in the last tenth
+    queries = [(rng.randrange(num_vertices // 10), num_vertices - 1 - rng.randrange(num_vertices // 10)) for _ in range(count)]
+
+    astar = TrafficManager(nav_graph, None, path_cache_size=0)
+    bidirectional = TrafficManager(nav_graph, None, path_cache_size=0, bidirectional=True)
+    empty = set()
+
+    print(f"grid {rows}x{cols}: {num_vertices} vertices, {len(nav_graph.edges())} connections, {count} queries")
+    copied = [0]
+    for start_idx, goal_idx in queries:
+        legacy_find_path(nav_graph, start_idx, goal_idx, copied)
+    measure("legacy A*", lambda s, g: legacy_find_path(nav_graph, s, g), queries, copied[0])
+    measure("parent-pointer", lambda s, g: astar._search_path(s, g, None, empty), queries)
+    measure("bidirectional", lambda s, g: bidirectional._search_path(s, g, None, empty), queries)
+
+
+if __name__ == "__main__":
+    main()
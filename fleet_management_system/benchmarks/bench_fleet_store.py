@@ -0,0 +1,85 @@
+"""
+Microbenchmark for per-tick fleet state updates.
+
+Compares the Python loop over ``Robot`` objects (travel-time progress, arrival, ``path.pop(0)`` and four
+status comprehensions, as the engine and dashboard did) with the vectorized ``FleetStore``
+(``advance`` plus ``status_counts``). Every robot follows a random walk on a synthetic grid.
+
+Run from the fleet_management_system directory (requires NumPy):
+
+    python -m benchmarks.bench_fleet_store [robots] [ticks]
+"""
+import random
+import sys
+import time
+
+from benchmarks.synthetic import load_grid_graph
+from src.models.fleet_store import FleetStore
+from src.models.robot import Robot
+
+DT = 0.05  # Seconds per tick
+
+
+def random_walk(nav_graph, start_idx, length, rng):
+    path, current = [], start_idx
+    for _ in range(length):
+        current = rng.choice(nav_graph.neighbors(current))[0]
+        path.append(current)
+    return path
+
+
+def python_tick(robots, nav_graph):
+    for robot in robots:
+        if robot.status == "moving" and robot.path:
+            robot.progress += DT * (1.0 / nav_graph.travel_time(robot.pos_idx, robot.path[0]))
+            if robot.progress >= 1:
+                robot.pos_idx = robot.path.pop(0)
+                robot.progress = 0
+                if not robot.path:
+                    robot.status = "task complete"
+    return (sum(1 for r in robots if r.status == "idle"), sum(1 for r in robots if r.status == "moving"),
+            sum(1 for r in robots if r.status == "waiting"), sum(1 for r in robots if r.status == "task complete"))
+
+
+def store_tick(store, nav_graph):
+    store.advance(DT, nav_graph.travel_time)
+    return store.status_counts()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    nav_graph = load_grid_graph(100, 100, seed=1)
+    rng = random.Random(3)
+    starts = [rng.randrange(len(nav_graph.vertices)) for _ in range(count)]
+    paths = [random_walk(nav_graph, start, rng.randint(2, 8), rng) for start in starts]
+
+    robots = []
+    store = FleetStore(capacity=count)
+    for i, (start, path) in enumerate(zip(starts, paths)):
+        robot = Robot(f"R{i}", start, "green", 1)
+        robot.path, robot.status, robot.progress = list(path), "moving", rng.random()
+        robots.append(robot)
+        view = store.add_robot(f"R{i}", start, "green", 1)
+        view.path, view.status, view.progress = path, "moving", robot.progress
+
+    print(f"{count} robots, {ticks} ticks")
+    started = time.perf_counter()
+    for _ in range(ticks):
+        python_tick(robots, nav_graph)
+    elapsed = time.perf_counter() - started
+    print(f"{'Robot objects':<16} {elapsed / ticks * 1000:9.3f} ms/tick")
+
+    started = time.perf_counter()
+    for _ in range(ticks):
+        store_tick(store, nav_graph)
+    elapsed = time.perf_counter() - started
+    print(f"{'FleetStore':<16} {elapsed / ticks * 1000:9.3f} ms/tick")
+
+    if [r.pos_idx for r in robots] != store.pos[:count].tolist():
+        print("warning: final positions differ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark for the ALT landmark heuristic and the component check in TrafficManager.
+
+For each map, runs the same random queries with the straight-line heuristic only and with
+landmark lower bounds, and reports expanded vertices and time per query (paths must have
+equal cost). Unreachable queries (start and goal in different components) are timed with
+a full search, as before, and with the O(1) component check.
+
+Run from the fleet_management_system directory:
+
+    python -m benchmarks.bench_landmarks [queries]
+"""
+import glob
+import os
+import random
+import sys
+import time
+
+from benchmarks.synthetic import load_graph_data, load_grid_graph, make_aisle_graph
+from src.controllers.traffic_manager import TrafficManager
+from src.models.nav_graph import NavGraph
+
+
+def path_cost(nav_graph, start_idx, path):
+    cost, current = 0.0, start_idx
+    for idx in path:
+        cost += dict((n, c) for n, c, _ in nav_graph.neighbors(current))[idx]
+        current = idx
+    return cost
+
+
+def run_queries(manager, queries):
+    expansions, results = 0, []
+    started = time.perf_counter()
+    for start_idx, goal_idx in queries:
+        results.append(manager._search_astar(start_idx, goal_idx, None, set()))
+        expansions += manager.last_search_expansions
+    return time.perf_counter() - started, expansions, results
+
+
+def bench_map(label, nav_graph, count, rng):
+    labels = nav_graph.components()
+    n = len(labels)
+    reachable, unreachable = [], []
+    while len(reachable) < count and len(reachable) + len(unreachable) < count * 50:
+        start_idx, goal_idx = rng.randrange(n), rng.randrange(n)
+        if start_idx == goal_idx:
+            continue
+        (reachable if labels[start_idx] == labels[goal_idx] else unreachable).append((start_idx, goal_idx))
+
+    plain = TrafficManager(nav_graph, None, path_cache_size=0, landmarks=0)
+    alt = TrafficManager(nav_graph, None, path_cache_size=0, landmarks=4)
+    started = time.perf_counter()
+    nav_graph.landmarks(4)
+    setup = time.perf_counter() - started
+
+    plain_time, plain_expanded, plain_paths = run_queries(plain, reachable)
+    alt_time, alt_expanded, alt_paths = run_queries(alt, reachable)
+    for (start_idx, _), a, b in zip(reachable, plain_paths, alt_paths):
+        if abs(path_cost(nav_graph, start_idx, a) - path_cost(nav_graph, start_idx, b)) > 1e-6:
+            print(f"warning: {label} path costs differ for start {start_idx}")
+
+    print(f"{label:<24} {n:>7} vertices  landmarks {setup * 1000:8.1f} ms setup")
+    if reachable:
+        q = len(reachable)
+        print(f"  {'euclidean':<12} {plain_expanded / q:10.1f} expanded/query {plain_time / q * 1000:9.3f} ms/query")
+        print(f"  {'ALT':<12} {alt_expanded / q:10.1f} expanded/query {alt_time / q * 1000:9.3f} ms/query"
+              f"  ({100 * (1 - alt_expanded / max(plain_expanded, 1)):.0f}% fewer expansions)")
+    if unreachable:
+        unreachable = unreachable[:count]
+        full_time, full_expanded, _ = run_queries(plain, unreachable)
+        started = time.perf_counter()
+        for start_idx, goal_idx in unreachable:
+            alt._search_path(start_idx, goal_idx, None, set())
+        check_time = time.perf_counter() - started
+        q = len(unreachable)
+        print(f"  unreachable: full search {full_expanded / q:.1f} expanded, {full_time / q * 1000:.3f} ms/query; "
+              f"component check {check_time / q * 1000:.4f} ms/query")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = random.Random(11)
+    for path in sorted(glob.glob(os.path.join("data", "nav_graph_*.json"))):
+        bench_map(os.path.basename(path), NavGraph(path), count, rng)
+    bench_map("grid 100x100 (15% cut)", load_grid_graph(100, 100, drop_ratio=0.15, seed=2), count, rng)
+    bench_map("grid 200x200 (40% cut)", load_grid_graph(200, 200, drop_ratio=0.4, seed=3), count // 4, rng)
+    bench_map("aisles 60x100", load_graph_data(make_aisle_graph(60, 100, cross_aisles=3)), count, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark for ShardedTrafficManager: reactive traffic resolution split over map regions.
+
+Runs the same busy fleet on a large grid with 1, 2, 4, ... regions and reports the wall
+time per tick, the speedup over a single region and the robots handed across region
+borders. Every run must end in exactly the same robot states as the single-region run.
+The speedup depends on the cores available; on a single core the regions only add the
+cost of shipping robot states to the workers.
+
+Run from the fleet_management_system directory:
+
+    python -m benchmarks.bench_sharded_traffic [robots] [ticks] [max_regions] [grid_size]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import make_grid_graph
+from src.controllers.simulation_engine import SimulationEngine
+from src.models.nav_graph import NavGraph
+from src.utils.logger import configure_logging
+
+
+def simulate(graph_path, regions, robots, ticks):
+    engine = SimulationEngine(NavGraph(graph_path), traffic_shards=regions)
+    traffic_manager = engine.traffic_manager
+    traffic_manager.parallel_min_robots = 0
+    rng = random.Random(11)
+    vertex_count = engine.nav_graph.vertex_count
+    for pos_idx in rng.sample(range(vertex_count), robots):
+        engine.spawn_robot(pos_idx, rng.randint(1, 5))
+    for robot in engine.fleet_manager.robots:
+        engine.assign_task(robot, rng.randrange(vertex_count))
+
+    engine.step(engine.tick_interval)  # Starts the worker pool outside the timing
+    started = time.perf_counter()
+    for _ in range(ticks):
+        engine.step(engine.tick_interval)
+    elapsed = time.perf_counter() - started
+    engine.close()
+    state = [(r.id, r.pos_idx, r.status, round(r.progress, 9), tuple(r.path)) for r in engine.fleet_manager.robots]
+    return elapsed, traffic_manager.handoffs, traffic_manager.replan_count, state
+
+
+def main():
+    robots = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    max_regions = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    size = int(sys.argv[4]) if len(sys.argv) > 4 else 120
+    configure_logging(path=None, console=False)
+
+    with tempfile.TemporaryDirectory() as directory:
+        graph_path = os.path.join(directory, "grid.json")
+        with open(graph_path, "w") as f:
+            json.dump(make_grid_graph(size, size, spacing=2.0, drop_ratio=0.1, seed=3), f)
+
+        print(f"{robots} robots, {ticks} ticks, {size}x{size} grid, {os.cpu_count()} CPUs")
+        if (os.cpu_count() or 1) < 2:
+            print("  (one CPU: the regions run one after another, expect no speedup)")
+        baseline_elapsed, baseline_state = None, None
+        regions = 1
+        while regions <= max_regions:
+            elapsed, handoffs, replans, state = simulate(graph_path, regions, robots, ticks)
+            if baseline_state is None:
+                baseline_elapsed, baseline_state = elapsed, state
+            same = "identical" if state == baseline_state else "DIFFERENT"
+            print(f"  {regions:2d} regions  {elapsed / ticks * 1000:8.2f} ms/tick  "
+                  f"x{baseline_elapsed / elapsed:5.2f}  {handoffs:6d} handoffs  {replans:5d} replans  {same}")
+            regions *= 2
+
+
+if __name__ == "__main__":
+    main()
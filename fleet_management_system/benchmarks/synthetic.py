@@ -0,0 +1,84 @@
+import json
+import os
+import random
+import tempfile
+
+from src.models.nav_graph import NavGraph
+
+
+def make_grid_graph(rows, cols, spacing=1.0, drop_ratio=0.0, seed=0):
+    """
+    Builds a warehouse-like grid in the nav_graph JSON layout.
+
+    :param rows: Number of vertex rows.
+    :param cols: Number of vertex columns.
+    :param spacing: Distance between neighboring vertices.
+    :param drop_ratio: Fraction of grid connections removed at random (shelving blocks).
+    :param seed: Seed for the connection dropout.
+    :return: Dict with a single level, ready to be written as a nav_graph file.
+    """
+    rng = random.Random(seed)
+    vertices = []
+    for r in range(rows):
+        for c in range(cols):
+            vertices.append([c * spacing, r * spacing, {"name": ""}])
+
+    lanes = []
+    for r in range(rows):
+        for c in range(cols):
+            idx = r * cols + c
+            for neighbor in ((idx + 1) if c + 1 < cols else None, (idx + cols) if r + 1 < rows else None):
+                if neighbor is None or rng.random() < drop_ratio:
+                    continue
+                lanes.append([idx, neighbor, {"speed_limit": 0}])
+                lanes.append([neighbor, idx, {"speed_limit": 0}])
+
+    return {"building_name": "synthetic", "levels": {"level1": {"vertices": vertices, "lanes": lanes}}}
+
+
+def make_aisle_graph(aisles, aisle_length, cross_aisles=2, spacing=1.0):
+    """
+    Builds a warehouse aisle layout: parallel aisles joined only by a few cross-aisles, so
+    the straight-line distance badly underestimates the route between adjacent aisles.
+
+    :param aisles: Number of parallel aisles.
+    :param aisle_length: Vertices per aisle.
+    :param cross_aisles: Number of evenly spaced cross-aisles (at least 1).
+    :param spacing: Distance between neighboring vertices.
+    :return: Dict with a single level, ready to be written as a nav_graph file.
+    """
+    vertices = [[a * spacing * 2, r * spacing, {"name": ""}] for a in range(aisles) for r in range(aisle_length)]
+    cross_rows = {round(i * (aisle_length - 1) / max(cross_aisles - 1, 1)) for i in range(cross_aisles)}
+    lanes = []
+    for a in range(aisles):
+        for r in range(aisle_length):
+            idx = a * aisle_length + r
+            neighbors = []
+            if r + 1 < aisle_length:
+                neighbors.append(idx + 1)
+            if a + 1 < aisles and r in cross_rows:
+                neighbors.append(idx + aisle_length)
+            for neighbor in neighbors:
+                lanes.append([idx, neighbor, {"speed_limit": 0}])
+                lanes.append([neighbor, idx, {"speed_limit": 0}])
+    return {"building_name": "synthetic", "levels": {"level1": {"vertices": vertices, "lanes": lanes}}}
+
+
+def load_graph_data(data):
+    """
+    Writes nav_graph data to a temporary file and loads it as a NavGraph.
+    """
+    fd, path = tempfile.mkstemp(suffix=".json", prefix="nav_graph_synthetic_")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        return NavGraph(path)
+    finally:
+        os.remove(path)
+
+
+def load_grid_graph(rows, cols, **kwargs):
+    """
+    Writes a synthetic grid to a temporary file and loads it as a NavGraph.
+    """
+    return load_graph_data(make_grid_graph(rows, cols, **kwargs))
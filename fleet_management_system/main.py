@@ -3,11 +3,11 @@
 import tkinter as tk
 from tkinter import messagebox
 import os
+import sys
 
 # Importing necessary modules for navigation, traffic, fleet, GUI, and logging
 from src.models.nav_graph import NavGraph
-from src.controllers.traffic_manager import TrafficManager
-from src.controllers.fleet_manager import FleetManager
+from src.controllers.simulation_engine import SimulationEngine
 from src.gui.fleet_gui import FleetGUI
 from src.utils.helpers import log_action
 
@@ -15,15 +15,17 @@ def main():
     """
     Initializes the Fleet Management System:
     - Loads the navigation graph.
-    - Sets up traffic and fleet managers.
+    - Sets up the simulation engine (traffic and fleet managers).
     - Initializes the GUI.
+    - Restores the checkpoint given on the command line, if any
+      (``python main.py logs/checkpoint_....flckpt``).
     - Logs system initialization.
     """
     root = tk.Tk()  # Create the main GUI window
 
     try:
-        # Load the navigation graph from a JSON file
-        nav_graph = NavGraph(os.path.join("data", "nav_graph_1.json"))
+        # Load the navigation graph (through its compiled cache when available)
+        nav_graph = NavGraph.load(os.path.join("data", "nav_graph_1.json"))
     
     except ValueError as e:
         # Show an error popup if the navigation graph fails to load
@@ -31,15 +33,15 @@ def main():
         root.destroy()  # Close the GUI window
         return  # Exit the function to prevent further execution
 
-    # Initialize traffic and fleet managers
-    traffic_manager = TrafficManager(nav_graph, None)
-    fleet_manager = FleetManager(nav_graph, traffic_manager)
+    # Initialize the simulation engine, which owns the traffic and fleet managers
+    engine = SimulationEngine(nav_graph)
 
-    # Initialize the GUI and connect it to the fleet manager
-    gui = FleetGUI(root, nav_graph, fleet_manager)
+    # Initialize the GUI; it attaches itself to the engine as an observer
+    gui = FleetGUI(root, engine)
 
-    # Pass the GUI reference to the traffic manager for interaction
-    traffic_manager.gui = gui
+    # Continue a saved simulation instead of starting empty
+    if len(sys.argv) > 1:
+        gui.restore_checkpoint(sys.argv[1])
 
     # Log that the system has been successfully initialized
     log_action(gui, "System initialized")
@@ -47,6 +49,9 @@ def main():
     # Start the GUI event loop
     root.mainloop()
 
+    # Stop the traffic workers of the engine the window last showed, if it has any
+    gui.engine.close()
+
 # Run the main function when the script is executed
 if __name__ == "__main__":
     main()
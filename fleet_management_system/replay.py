@@ -0,0 +1,53 @@
+# replay.py - Plays back or checks a fleet trace recorded with SimulationEngine.start_trace
+
+import argparse
+import json
+import sys
+
+from src.utils.trace import check_trace, first_divergence
+
+
+def main():
+    """
+    Replays a recorded fleet trace without re-running the traffic logic:
+    - in the GUI at any speed (default),
+    - headlessly, printing a summary and any vertex collisions (--check),
+    - or against a second trace, printing the first tick where they differ (--diff).
+    """
+    parser = argparse.ArgumentParser(description="Replay a fleet trace")
+    parser.add_argument("trace", help="trace file (.fltrace)")
+    parser.add_argument("--speed", type=float, default=1.0, help="simulated seconds per second in the GUI")
+    parser.add_argument("--check", action="store_true", help="replay headlessly and print a summary")
+    parser.add_argument("--diff", metavar="OTHER", help="compare with another trace tick by tick")
+    args = parser.parse_args()
+
+    if args.diff:
+        divergence = first_divergence(args.trace, args.diff)
+        if divergence is None:
+            print("Traces are identical")
+            return 0
+        print(json.dumps(divergence, indent=2))
+        return 1
+
+    if args.check:
+        summary = check_trace(args.trace)
+        print(json.dumps(summary, indent=2))
+        return 1 if summary["collisions"] else 0
+
+    import tkinter as tk
+    from src.controllers.replay_engine import ReplayEngine
+    from src.gui.fleet_gui import FleetGUI
+
+    root = tk.Tk()
+    engine = ReplayEngine(args.trace, speed=args.speed)
+    gui = FleetGUI(root, engine)
+    # FleetGUI loads the first graph of the data directory on start; switch back to the replay
+    gui.attach_engine(engine)
+    gui.show_graph(f"replay of {args.trace}")
+    gui.start_simulation()
+    root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
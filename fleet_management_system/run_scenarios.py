@@ -0,0 +1,53 @@
+# run_scenarios.py - Runs declarative fleet scenarios headlessly and writes a report
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from src.utils.scenario import load_scenarios, run_scenario, write_report
+
+
+def main():
+    """
+    Runs every scenario (and sweep combination) of the given files across a process pool
+    and writes one report row per run: throughput, mean and p99 trip time, wait time,
+    reroutes and deadlocks. See src/utils/scenario.py for the file format.
+    """
+    parser = argparse.ArgumentParser(description="Run fleet scenarios headlessly")
+    parser.add_argument("scenarios", nargs="+", help="scenario files (JSON)")
+    parser.add_argument("-o", "--output", default=os.path.join("logs", "scenario_report.csv"),
+                        help="report file, CSV or .json (default: logs/scenario_report.csv)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--trace-dir", help="record a fleet trace of every run into this directory")
+    args = parser.parse_args()
+
+    runs = []
+    for path in args.scenarios:
+        try:
+            runs.extend(load_scenarios(path))
+        except (OSError, ValueError) as e:
+            print(f"Cannot load {path}: {e}", file=sys.stderr)
+            return 2
+    if args.trace_dir:
+        for index, scenario in enumerate(runs):
+            scenario["trace"] = os.path.join(args.trace_dir, f"run_{index:04d}.fltrace")
+
+    print(f"Running {len(runs)} scenario(s)")
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for row in pool.map(run_scenario, runs):
+            rows.append(row)
+            if row["error"]:
+                print(f"  {row['name']}: {row['error']}")
+            else:
+                print(f"  {row['name']}: {row['tasks_completed']} tasks, "
+                      f"{row['throughput_per_hour']:.1f}/h, trip mean {row['mean_trip_time']:.1f} s "
+                      f"p99 {row['p99_trip_time']:.1f} s, wait {row['wait_time']:.0f} robot-s, "
+                      f"{row['reroutes']} reroutes ({row['wall_seconds']:.1f} s)")
+    print(f"Report written to {write_report(rows, args.output)}")
+    return 1 if any(row["error"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
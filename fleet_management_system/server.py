@@ -0,0 +1,56 @@
+# server.py - Runs the fleet simulation headlessly behind the asyncio command API
+
+import argparse
+import asyncio
+import os
+
+from src.models.nav_graph import NavGraph
+from src.controllers.command_server import CommandServer
+from src.controllers.simulation_engine import SimulationEngine
+from src.controllers.traffic_manager import TrafficManager
+from src.utils.logger import configure_logging
+
+
+def main():
+    """
+    Loads a navigation graph, starts a headless simulation engine and serves the
+    line-delimited JSON command API (see src/controllers/command_server.py) until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Headless fleet simulation with a command API")
+    parser.add_argument("--graph", default=os.path.join("data", "nav_graph_1.json"), help="nav_graph JSON file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--planning-mode", choices=TrafficManager.PLANNING_MODES, default="reactive")
+    parser.add_argument("--scheduler", choices=SimulationEngine.SCHEDULERS, default="fixed")
+    parser.add_argument("--speed", type=float, default=1.0, help="simulated seconds per wall-clock second")
+    parser.add_argument("--trace", help="record a fleet trace to this file")
+    parser.add_argument("--restore", help="continue the simulation saved in this checkpoint (its map and settings win)")
+    parser.add_argument("--checkpoint", help="save the simulation to this checkpoint when the server stops")
+    parser.add_argument("--log", action="store_true", help="write the fleet log (off by default for throughput)")
+    args = parser.parse_args()
+
+    if not args.log:
+        configure_logging(path=None, console=False)
+    if args.restore:
+        engine = SimulationEngine.from_checkpoint(args.restore)
+        args.graph = engine.nav_graph.file_path
+    else:
+        engine = SimulationEngine(NavGraph.load(args.graph), planning_mode=args.planning_mode, scheduler=args.scheduler)
+    if args.trace:
+        engine.start_trace(args.trace)
+    server = CommandServer(engine, args.host, args.port, speed=args.speed)
+    print(f"Serving {args.graph} on {args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop_trace()
+        if args.checkpoint:
+            engine.save_checkpoint(args.checkpoint, background=False)
+            print(f"Checkpoint saved to {args.checkpoint}")
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
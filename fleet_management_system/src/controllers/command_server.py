@@ -0,0 +1,283 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+from src.utils.events import EventBatcher
+from src.utils.helpers import log_action
+
+# Operations that change the fleet; they are queued and applied at the next tick boundary
+MUTATING_OPS = ("spawn", "assign", "assign_batch", "close_lane", "open_lane", "disable_vertex", "enable_vertex")
+# Operations answered immediately from the current state
+QUERY_OPS = ("state", "stats", "subscribe", "unsubscribe")
+
+
+def robot_state(robot):
+    return {"id": robot.id, "pos": robot.pos_idx, "progress": round(robot.progress, 4), "status": robot.status,
+            "path": list(robot.path), "priority": robot.priority, "goal": robot.goal_idx}
+
+
+class CommandServer:
+    def __init__(self, engine, host="127.0.0.1", port=8765, speed=1.0, max_queue=100000, batch_budget=None,
+                 diff_interval=0.1, max_client_buffer=1 << 20):
+        """
+        Line-delimited JSON command API for driving a headless SimulationEngine over TCP.
+
+        Each request is one JSON object per line, ``{"id": 1, "op": "spawn", "vertex": 3}``,
+        answered with ``{"id": 1, "ok": true, "result": ...}`` (or ``"ok": false`` and an
+        ``"error"``). Operations:
+
+        - ``spawn`` (vertex, priority=1), ``assign`` (robot, goal), ``assign_batch`` (goals):
+          queued and applied together at the next tick boundary, so request bursts never
+          interleave with a tick; the reply is sent once the command has been applied. A
+          boundary applies commands for at most ``batch_budget`` seconds, the rest wait for
+          the next one, so a burst of path searches cannot stall the simulation clock.
+        - ``close_lane`` / ``open_lane`` (a, b, both_ways=true), ``disable_vertex`` /
+          ``enable_vertex`` (vertex): queued like the above; the result lists the ids of the
+          robots whose route was repaired.
+        - ``state`` (all robots), ``stats`` (fleet, traffic and server counters): answered at once.
+        - ``subscribe`` / ``unsubscribe``: the connection then receives
+          ``{"event": "diff", "time": t, "full": false, "robots": [...], "events": [...]}``
+          messages at most every ``diff_interval`` seconds, holding only the robots whose
+          position, progress, status or path changed, plus the bus events since the last one.
+
+        :param engine: SimulationEngine to drive (its tick loop runs inside the server).
+        :param host: Interface to listen on (local only by default).
+        :param port: TCP port (0 picks a free one; see ``port`` after ``start``).
+        :param speed: Simulated seconds per wall-clock second.
+        :param max_queue: Pending commands accepted before requests are rejected as busy.
+        :param batch_budget: Wall time spent applying commands per tick boundary (defaults
+                             to half the tick interval; at least one command is applied).
+        :param diff_interval: Minimum wall time between two diff messages.
+        :param max_client_buffer: Unsent bytes after which a subscriber's diffs are skipped
+                                  (it receives a full state once it has caught up).
+        """
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.max_queue = max_queue
+        self.batch_budget = engine.tick_interval / 2 if batch_budget is None else batch_budget
+        self.diff_interval = diff_interval
+        self.max_client_buffer = max_client_buffer
+        self.requests = 0  # Requests received
+        self.applied = 0  # Queued commands applied
+        self.rejected = 0  # Requests refused (malformed, unknown or queue full)
+        self.batches = 0  # Tick boundaries at which commands were applied
+        self._pending = deque()  # (op, request, future) waiting for the next tick boundary
+        self._subscribers = {}  # writer -> True when the next diff must be a full state
+        self._published = {}  # robot id -> state key last sent to subscribers
+        self._last_diff = 0.0
+        self._server = None
+        self._tick_task = None
+        self.event_batcher = engine.events.subscribe(EventBatcher(max_per_interval=100))
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._tick_task = asyncio.ensure_future(self._tick_loop())
+        log_action(self.engine.gui, f"Command server listening on {self.host}:{self.port}")
+        return self
+
+    async def stop(self):
+        if self._tick_task is not None:
+            self._tick_task.cancel()
+            try:
+                await self._tick_task
+            except asyncio.CancelledError:
+                pass
+            self._tick_task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in list(self._subscribers):
+            writer.close()
+        self._subscribers.clear()
+        self.engine.events.unsubscribe(self.event_batcher)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _tick_loop(self):
+        """
+        Runs the engine in real time (scaled by ``speed``); queued commands are applied
+        right before each step.
+        """
+        loop = asyncio.get_running_loop()
+        interval = self.engine.tick_interval
+        next_tick = loop.time()
+        while True:
+            self._apply_pending()
+            self.engine.step(interval * self.speed)
+            self._publish_diff()
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < -interval:
+                next_tick = loop.time()  # Running behind: do not try to catch up in a burst
+            await asyncio.sleep(max(delay, 0))
+
+    def _apply_pending(self):
+        pending = self._pending
+        if not pending:
+            return
+        self.batches += 1
+        deadline = time.perf_counter() + self.batch_budget
+        while pending:
+            op, request, future = pending.popleft()
+            if future.cancelled():
+                continue
+            try:
+                future.set_result(self._apply(op, request))
+            except ValueError as e:
+                future.set_exception(e)
+            except (KeyError, TypeError, IndexError) as e:
+                future.set_exception(ValueError(f"invalid {op} request ({type(e).__name__}: {e})"))
+            self.applied += 1
+            if time.perf_counter() >= deadline:
+                break
+
+    def _apply(self, op, request):
+        engine = self.engine
+        if op == "spawn":
+            robot = engine.spawn_robot(int(request["vertex"]), int(request.get("priority", 1)))
+            if robot is None:
+                raise ValueError(f"vertex {request['vertex']} is occupied or out of service")
+            return robot_state(robot)
+        if op == "assign":
+            if not engine.assign_task(str(request["robot"]), int(request["goal"])):
+                raise ValueError(f"{request['robot']} cannot be assigned to {request['goal']}")
+            return robot_state(engine.get_robot(str(request["robot"])))
+        if op in ("close_lane", "open_lane"):
+            repaired = getattr(engine, op)(int(request["a"]), int(request["b"]), bool(request.get("both_ways", True)))
+            return [robot.id for robot in repaired]
+        if op in ("disable_vertex", "enable_vertex"):
+            return [robot.id for robot in getattr(engine, op)(int(request["vertex"]))]
+        robots = None
+        if request.get("robots") is not None:
+            robots = [engine.get_robot(str(robot_id)) for robot_id in request["robots"]]
+            robots = [robot for robot in robots if robot is not None and robot.status in ("idle", "task complete")]
+        assigned = engine.assign_tasks([int(goal) for goal in request["goals"]], robots)
+        return [{"robot": robot.id, "goal": goal_idx} for robot, goal_idx in assigned]
+
+    def _query(self, op, request, writer):
+        engine = self.engine
+        if op == "state":
+            return {"time": engine.time, "robots": [robot_state(r) for r in engine.fleet_manager.robots]}
+        if op == "stats":
+            return {
+                "time": engine.time,
+                "fleet": engine.fleet_manager.status_counts(),
+                "traffic": engine.traffic_manager.traffic_stats(),
+                "server": {"requests": self.requests, "applied": self.applied, "rejected": self.rejected,
+                           "batches": self.batches, "pending": len(self._pending),
+                           "subscribers": len(self._subscribers)},
+            }
+        if op == "subscribe":
+            self._subscribers[writer] = True
+            return {"diff_interval": self.diff_interval}
+        self._subscribers.pop(writer, None)
+        return {}
+
+    async def _handle_client(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        replies = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.requests += 1
+                try:
+                    request = json.loads(line)
+                    op = request["op"]
+                except (ValueError, KeyError, TypeError):
+                    self.rejected += 1
+                    self._send(writer, {"id": None, "ok": False, "error": "malformed request"})
+                    continue
+                request_id = request.get("id")
+                if op in QUERY_OPS:
+                    self._send(writer, {"id": request_id, "ok": True, "result": self._query(op, request, writer)})
+                elif op not in MUTATING_OPS:
+                    self.rejected += 1
+                    self._send(writer, {"id": request_id, "ok": False, "error": f"unknown op {op!r}"})
+                elif len(self._pending) >= self.max_queue:
+                    self.rejected += 1
+                    self._send(writer, {"id": request_id, "ok": False, "error": "busy"})
+                else:
+                    future = loop.create_future()
+                    self._pending.append((op, request, future))
+                    # Reply when the command has been applied, without blocking this reader
+                    task = asyncio.ensure_future(self._reply(writer, request_id, future))
+                    replies.add(task)
+                    task.add_done_callback(replies.discard)
+                if writer.transport.get_write_buffer_size() > self.max_client_buffer:
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._subscribers.pop(writer, None)
+            for task in replies:
+                task.cancel()
+            writer.close()
+
+    async def _reply(self, writer, request_id, future):
+        try:
+            result = await future
+            message = {"id": request_id, "ok": True, "result": result}
+        except ValueError as e:
+            message = {"id": request_id, "ok": False, "error": str(e)}
+        self._send(writer, message)
+
+    @staticmethod
+    def _send(writer, message):
+        if not writer.is_closing():
+            writer.write(json.dumps(message).encode("utf-8") + b"\n")
+
+    def _publish_diff(self):
+        """
+        Sends subscribers the robots that changed since the last diff (a full state to new or
+        lagging subscribers), along with the buffered bus events.
+        """
+        if not self._subscribers:
+            self._published.clear()
+            return
+        now = time.monotonic()
+        if now - self._last_diff < self.diff_interval:
+            return
+        self._last_diff = now
+
+        changed, current = [], {}
+        robots = self.engine.fleet_manager.robots
+        for robot in robots:
+            key = (robot.pos_idx, round(robot.progress, 4), robot.status, tuple(robot.path))
+            current[robot.id] = key
+            if self._published.get(robot.id) != key:
+                changed.append(robot)
+        self._published = current
+        events, _ = self.event_batcher.drain()
+        event_list = [{"type": e.type, "time": e.time, "message": e.message, "robot": e.robot_id} for e in events]
+        diff = None
+        full = None
+        for writer, needs_full in list(self._subscribers.items()):
+            if writer.is_closing():
+                del self._subscribers[writer]
+                continue
+            if writer.transport.get_write_buffer_size() > self.max_client_buffer:
+                self._subscribers[writer] = True  # Lagging: skip diffs, resync once drained
+                continue
+            if needs_full:
+                if full is None:
+                    full = {"event": "diff", "time": self.engine.time, "full": True,
+                            "robots": [robot_state(r) for r in robots], "events": event_list}
+                self._send(writer, full)
+                self._subscribers[writer] = False
+            elif changed or event_list:
+                if diff is None:
+                    diff = {"event": "diff", "time": self.engine.time, "full": False,
+                            "robots": [robot_state(r) for r in changed], "events": event_list}
+                self._send(writer, diff)
@@ -1,48 +1,70 @@
-from tkinter import simpledialog
-from src.utils.helpers import log_action, notify_user
+import heapq
+from src.utils.events import SPAWN_REJECTED
+from src.utils.helpers import log_action
 from src.models.robot import Robot
+from src.utils.assignment import INF, solve_sparse_assignment
 
 class FleetManager:
-    def __init__(self, nav_graph, traffic_manager):
+    def __init__(self, nav_graph, traffic_manager, store=None):
         """
         Initialize the FleetManager with a navigation graph and traffic manager.
+
+        :param store: Optional FleetStore; robots are then array-backed RobotView objects.
         """
         self.nav_graph = nav_graph
         self.traffic_manager = traffic_manager
+        self.store = store  # Array-backed robot state (None for plain Robot objects)
         self.gui = None  # GUI reference (optional)
         self.robots = []  # List to store robot instances
         self.robot_count = 0  # Counter for unique robot IDs
         self.colors = ["orange", "purple", "green", "yellow", "cyan"]  # Predefined colors for robots
 
-    def spawn_robot(self, pos_idx):
+    def spawn_robot(self, pos_idx, priority=None):
         """
         Spawns a new robot at the given position index if it's not occupied.
+
+        :param pos_idx: Vertex index to spawn the robot at.
+        :param priority: Robot priority (1-10, default 1).
+        :raises ValueError: If the map has no vertex ``pos_idx``.
         """
+        self._check_vertex(pos_idx)
         self.robot_count += 1
         
-        # Ask the user for the robot's priority (default is 1 if canceled)
-        priority = simpledialog.askinteger("Priority", f"Enter priority for R{self.robot_count} (1-10):", minvalue=1, maxvalue=10)
         if priority is None:
             priority = 1
         
-        # Create a new robot instance
-        robot = Robot(f"R{self.robot_count}", pos_idx, self.colors[self.robot_count % len(self.colors)], priority)
+        robot_id = f"R{self.robot_count}"
+        color = self.colors[self.robot_count % len(self.colors)]
         
-        # Check if the position is already occupied
-        if pos_idx in self.traffic_manager.occupied_vertices:
-            log_action(self.gui, f"Cannot spawn {robot.id} at vertex {pos_idx} (occupied)")
-            notify_user(self.gui, f"Vertex {pos_idx} is occupied")
+        # Check if a robot stands on the position or, in reservation mode, is driving onto it
+        if pos_idx in self.traffic_manager.robot_vertices or self.traffic_manager.vertex_claimed(pos_idx):
+            log_action(self.gui, f"Cannot spawn {robot_id} at vertex {pos_idx} (occupied)")
+            self.traffic_manager.events.publish(SPAWN_REJECTED, self.traffic_manager.clock,
+                                                f"Vertex {pos_idx} is occupied", robot_id, vertex=pos_idx)
+            return None
+        if pos_idx in self.nav_graph.disabled_vertices:
+            log_action(self.gui, f"Cannot spawn {robot_id} at vertex {pos_idx} (out of service)")
+            self.traffic_manager.events.publish(SPAWN_REJECTED, self.traffic_manager.clock,
+                                                f"Vertex {pos_idx} is out of service", robot_id, vertex=pos_idx)
             return None
         
-        # Add the robot to the fleet
+        # Create the robot and add it to the fleet
+        if self.store is not None:
+            robot = self.store.add_robot(robot_id, pos_idx, color, priority)
+        else:
+            robot = Robot(robot_id, pos_idx, color, priority)
         self.robots.append(robot)
+        self.traffic_manager.park_robot(robot)
         log_action(self.gui, f"Spawned {robot.id} at vertex {pos_idx} with priority {robot.priority}")
         return robot
 
     def assign_task(self, robot, goal_idx):
         """
         Assigns a robot a task to move to the specified goal index.
+
+        :raises ValueError: If the map has no vertex ``goal_idx``.
         """
+        self._check_vertex(goal_idx)
         # If the robot is already at the destination, do nothing
         if robot.pos_idx == goal_idx:
             log_action(self.gui, f"{robot.id} is already at destination")
@@ -62,6 +84,10 @@ class FleetManager:
             
             # Set the robot status to moving and confirm task assignment
             robot.status = "moving"
+            robot.schedule = []
+            self.traffic_manager.start_task(robot)
+            # In reservation mode, replace the route with a conflict-free timed plan
+            self.traffic_manager.plan_route(robot)
             log_action(self.gui, f"Assigned {robot.id} (P:{robot.priority}) to vertex {goal_idx}")
             return True
         
@@ -69,3 +95,162 @@ class FleetManager:
         robot.status = "idle"
         log_action(self.gui, f"No path found for {robot.id} (P:{robot.priority}) to vertex {goal_idx}")
         return False
+
+    def assign_tasks(self, goals, robots=None, candidates=16):
+        """
+        Assigns a batch of goals to idle robots at once, minimizing the total travel time.
+
+        Only near pairs are weighed: a reverse search from each goal stops once it has
+        reached the ``candidates`` nearest robots (with fewer robots than goals, a search
+        from each robot stops at its nearest goals instead), and the assignment is solved
+        over these pairs with the Hungarian method. Priority comes first: when there are more
+        robots than goals, the highest-priority robots are served, and travel times are
+        weighted by priority, so higher-priority robots get the nearer goals; a robot of a
+        priority that gets served but that no goal reached gets a search of its own, and a
+        search that leaves its goal or robot unmatched is widened until it is served (or
+        reaches everything). Routes are read off the same searches and committed together,
+        with a single occupancy update; in reservation mode they are then planned in
+        priority order.
+
+        The travel times are the open map's and ignore the other robots; a route that would
+        cross an occupied vertex or lane is searched again around them (``find_path``).
+
+        :param goals: Goal vertex indices; duplicates and currently occupied goals are skipped.
+        :param robots: Candidate robots (default: every idle or finished robot).
+        :param candidates: Nearest robots (or goals) each search reaches before it stops.
+        :return: List of (robot, goal_idx) pairs that were assigned.
+        :raises ValueError: If a goal is not a vertex of the map (nothing is assigned then).
+        """
+        goals = list(dict.fromkeys(goals))
+        for goal_idx in goals:
+            self._check_vertex(goal_idx)
+        traffic_manager = self.traffic_manager
+        if robots is None:
+            robots = [r for r in self.robots if r.status in ("idle", "task complete")]
+        goals = [g for g in goals if g not in traffic_manager.occupied_vertices]
+        if not robots or not goals:
+            return []
+
+        # Load every level a route of the batch may use before searching
+        robot_levels = {self.nav_graph.level_of(r.pos_idx): r.pos_idx for r in robots}
+        goal_levels = {self.nav_graph.level_of(g): g for g in goals}
+        for start_idx in robot_levels.values():
+            for goal_idx in goal_levels.values():
+                self.nav_graph.ensure_route_levels(start_idx, goal_idx)
+
+        starts = {}
+        for i, robot in enumerate(robots):
+            starts.setdefault(robot.pos_idx, []).append(i)
+        goal_index = {goal_idx: j for j, goal_idx in enumerate(goals)}
+        times = {}  # (robot, goal) index pair -> travel time, for the pairs the searches reached
+        to_goal = {}  # Goal index -> its reverse search
+        from_start = {}  # Robot index -> its forward search
+        reverse_pairs = set()  # Pairs whose route is read off the goal's search
+        if len(robots) >= len(goals):
+            for j in range(len(goals)):
+                self._search_goal(j, goals, starts, candidates, times, to_goal, reverse_pairs)
+            # Robots down to the lowest priority served compete for the goals: give those no
+            # goal search reached a search of their own
+            cutoff = sorted((r.priority for r in robots), reverse=True)[len(goals) - 1]
+            reached = {i for i, _ in times}
+            searched = [i for i, robot in enumerate(robots) if robot.priority >= cutoff and i not in reached]
+        else:
+            searched = range(len(robots))
+        for i in searched:
+            self._search_robot(i, robots, goal_index, candidates, times, from_start)
+
+        # Costs are (priority shortfall, weighted travel time) folded into one number: a tier
+        # exceeds any difference in total travel time, so priority always wins. When the near
+        # pairs leave a goal (or a robot that outranks a served one) unmatched, its search
+        # reaches twice as far and the assignment is solved again.
+        pairs = min(len(robots), len(goals))
+        top = max(r.priority for r in robots)
+        while True:
+            tier = max((t * robots[i].priority for (i, _), t in times.items()), default=0.0) * pairs + 1
+            options = [[] for _ in robots]
+            for (i, j), t in times.items():
+                robot = robots[i]
+                options[i].append((j, t * robot.priority + tier * (top - robot.priority)))
+            matches = solve_sparse_assignment(options, len(goals))
+            if candidates >= max(len(robots), len(goals)):
+                break
+            candidates *= 2
+            served = {i for i, _ in matches}
+            lowest = min((robots[i].priority for i in served), default=top)
+            retried = [i for i, robot in enumerate(robots) if i not in served and robot.priority > lowest]
+            if len(matches) < pairs:
+                if len(robots) >= len(goals):
+                    matched = {j for _, j in matches}
+                    for j in range(len(goals)):
+                        if j not in matched:
+                            self._search_goal(j, goals, starts, candidates, times, to_goal, reverse_pairs)
+                else:
+                    retried = [i for i in range(len(robots)) if i not in served]
+            elif not retried:
+                break
+            for i in retried:
+                self._search_robot(i, robots, goal_index, candidates, times, from_start)
+
+        assigned = []
+        for i, j in sorted(matches, key=lambda match: -robots[match[0]].priority):
+            robot, goal_idx = robots[i], goals[j]
+            if (i, j) in reverse_pairs:
+                path = traffic_manager.route_down(robot.pos_idx, goal_idx, to_goal[j])
+            else:
+                path = traffic_manager.route_up(robot.pos_idx, goal_idx, from_start[i])
+            path = traffic_manager.unblocked_route(robot.pos_idx, goal_idx, path)
+            if not path:
+                continue
+            robot.goal_idx = goal_idx
+            robot.path = path
+            robot.status = "moving"
+            robot.schedule = []
+            traffic_manager.start_task(robot)
+            assigned.append((robot, goal_idx))
+
+        traffic_manager.update_occupancy(self.robots)
+        for robot, goal_idx in assigned:
+            traffic_manager.plan_route(robot)
+            log_action(self.gui, f"Assigned {robot.id} (P:{robot.priority}) to vertex {goal_idx}")
+        log_action(self.gui, f"Batch assignment: {len(assigned)} of {len(goals)} goals to {len(robots)} idle robots")
+        return assigned
+
+    def _search_goal(self, j, goals, starts, candidates, times, to_goal, reverse_pairs):
+        """
+        Reverse search of ``assign_tasks`` from goal ``j`` to its ``candidates`` nearest robots.
+        """
+        goal_idx = goals[j]
+        needed = starts.keys() - {goal_idx}
+        table = to_goal[j] = self.nav_graph.travel_times_to(goal_idx, needed=needed, limit=candidates)
+        # The nearest ``candidates`` are final; the rest may hold upper bounds
+        for start_idx in heapq.nsmallest(candidates, needed, key=table.__getitem__):
+            if table[start_idx] != INF:
+                for i in starts[start_idx]:
+                    times[i, j] = table[start_idx]
+                    reverse_pairs.add((i, j))
+
+    def _search_robot(self, i, robots, goal_index, candidates, times, from_start):
+        """
+        Forward search of ``assign_tasks`` from robot ``i`` to its ``candidates`` nearest goals.
+        """
+        start_idx = robots[i].pos_idx
+        needed = goal_index.keys() - {start_idx}
+        table = from_start[i] = self.nav_graph.travel_times_from(start_idx, needed=needed, limit=candidates)
+        for goal_idx in heapq.nsmallest(candidates, needed, key=table.__getitem__):
+            if table[goal_idx] != INF:
+                times.setdefault((i, goal_index[goal_idx]), table[goal_idx])
+
+    def _check_vertex(self, idx):
+        if not 0 <= idx < self.nav_graph.vertex_count:
+            raise ValueError(f"Unknown vertex {idx}")
+
+    def status_counts(self):
+        """
+        Returns the number of robots per status ("idle", "moving", "waiting", "task complete").
+        """
+        if self.store is not None:
+            return self.store.status_counts()
+        counts = {"idle": 0, "moving": 0, "waiting": 0, "task complete": 0}
+        for robot in self.robots:
+            counts[robot.status] = counts.get(robot.status, 0) + 1
+        return counts
@@ -0,0 +1,131 @@
+import heapq
+
+INF = float('inf')
+
+
+class GoalTree:
+    def __init__(self, nav_graph, goal_idx):
+        """
+        Shortest-path tree toward one goal: the travel time from every vertex to the goal and
+        the next vertex on a fastest route, repaired in place when lanes close or open.
+
+        Built once with a reverse Dijkstra. Afterwards only the vertices whose distance can
+        change are searched again (in the spirit of D* Lite): a closure re-settles the subtree
+        that drove through the closed lane, an opening propagates the shortcut outwards from
+        it. Distances past unaffected vertices are reused as they are.
+
+        :param nav_graph: Navigation graph (its costs must reflect the current closures).
+        :param goal_idx: Goal vertex.
+        """
+        self.nav_graph = nav_graph
+        self.goal_idx = goal_idx
+        self.version = nav_graph.version  # Graph version the distances are valid for
+        self.distances = [INF] * nav_graph.vertex_count
+        self.successors = [-1] * nav_graph.vertex_count  # Next vertex toward the goal (-1 if none)
+        self.distances[goal_idx] = 0.0
+        self.repaired = 0  # Vertices settled again by repairs
+        self._settle([(0.0, goal_idx)])
+
+    def _settle(self, heap, within=None):
+        """
+        Reverse Dijkstra from the vertices on the heap, updating distances and successors.
+
+        :param within: Optional set of vertices the search may improve (others are final).
+        :return: Number of vertices settled.
+        """
+        nav_graph = self.nav_graph
+        offsets, targets, costs = nav_graph.rev_offsets, nav_graph.rev_targets, nav_graph.rev_costs
+        distances, successors = self.distances, self.successors
+        heapq.heapify(heap)
+        settled = 0
+        while heap:
+            distance, current = heapq.heappop(heap)
+            if distance > distances[current]:
+                continue
+            settled += 1
+            # In-edges of current are the lanes neighbor -> current
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
+                if within is not None and neighbor not in within:
+                    continue
+                candidate = distance + costs[edge]
+                if candidate < distances[neighbor]:
+                    distances[neighbor] = candidate
+                    successors[neighbor] = current
+                    heapq.heappush(heap, (candidate, neighbor))
+        return settled
+
+    def lanes_closed(self, lanes):
+        """
+        Repairs the tree after directed lanes became impassable (or slower).
+
+        Only vertices whose tree route used one of the lanes can get slower: they are reset
+        and re-settled from their unaffected neighbors, everything else is kept.
+        """
+        nav_graph = self.nav_graph
+        successors, distances = self.successors, self.distances
+        rev_offsets, rev_targets = nav_graph.rev_offsets, nav_graph.rev_targets
+        adj_offsets, adj_targets, adj_costs = nav_graph.adj_offsets, nav_graph.adj_targets, nav_graph.adj_costs
+
+        # Vertices routed over a changed lane, plus every vertex routed through them
+        affected = set()
+        stack = [idx1 for idx1, idx2 in lanes if successors[idx1] == idx2]
+        while stack:
+            current = stack.pop()
+            if current in affected:
+                continue
+            affected.add(current)
+            for edge in range(rev_offsets[current], rev_offsets[current + 1]):
+                neighbor = rev_targets[edge]
+                if successors[neighbor] == current and neighbor not in affected:
+                    stack.append(neighbor)
+        if not affected:
+            return
+
+        # Seed each affected vertex with its best lane into the unaffected part of the tree
+        heap = []
+        for current in affected:
+            best, successor = INF, -1
+            for edge in range(adj_offsets[current], adj_offsets[current + 1]):
+                neighbor = adj_targets[edge]
+                if neighbor not in affected:
+                    candidate = adj_costs[edge] + distances[neighbor]
+                    if candidate < best:
+                        best, successor = candidate, neighbor
+            distances[current], successors[current] = best, successor
+            if best < INF:
+                heap.append((best, current))
+        self._settle(heap, within=affected)
+        self.repaired += len(affected)
+
+    def lanes_opened(self, lanes):
+        """
+        Repairs the tree after directed lanes became passable (or faster): the shortcut is
+        propagated to the vertices it improves, and no further.
+        """
+        nav_graph = self.nav_graph
+        distances, successors = self.distances, self.successors
+        heap = []
+        for idx1, idx2 in lanes:
+            cost = nav_graph.adj_costs[nav_graph._find_edge(idx1, idx2)]
+            candidate = cost + distances[idx2]
+            if candidate < distances[idx1]:
+                distances[idx1] = candidate
+                successors[idx1] = idx2
+                heap.append((candidate, idx1))
+        self.repaired += self._settle(heap)
+
+    def route(self, start_idx):
+        """
+        Returns the tree route from start_idx to the goal (excluding the start), or None if
+        the goal is unreachable.
+        """
+        if self.distances[start_idx] == INF:
+            return None
+        successors = self.successors
+        path = []
+        current = start_idx
+        while current != self.goal_idx:
+            current = successors[current]
+            path.append(current)
+        return path
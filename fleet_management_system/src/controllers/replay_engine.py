@@ -0,0 +1,162 @@
+from src.controllers.fleet_manager import FleetManager
+from src.controllers.traffic_manager import TrafficManager
+from src.models.nav_graph import NavGraph
+from src.models.robot import Robot
+from src.utils.helpers import log_action
+from src.utils.trace import COMMAND, LANE_COMMANDS, TraceReader, apply_command, apply_deltas, apply_lane_command
+
+
+class ReplayEngine:
+    def __init__(self, trace_path, nav_graph=None, speed=1.0, gui=None):
+        """
+        Plays a recorded fleet trace back in place of a SimulationEngine, so FleetGUI (or any
+        other observer) can show it. Robot states come from the trace; no path search or
+        traffic resolution runs, only the occupancy shown on the map is derived from them.
+
+        :param trace_path: Trace written by ``SimulationEngine.start_trace``.
+        :param nav_graph: Graph the trace was recorded on (loaded from the trace's META
+                          record when omitted).
+        :param speed: Simulated seconds replayed per second passed to ``step``.
+        :param gui: Optional GUI used for logging.
+        """
+        self.reader = TraceReader(trace_path)
+        meta = self.reader.meta
+        if nav_graph is None:
+            if not meta.get("graph"):
+                raise ValueError(f"{trace_path} does not name its nav graph")
+            nav_graph = NavGraph.load(meta["graph"])
+        self.nav_graph = nav_graph
+        self.tick_interval = meta.get("tick_interval", 0.05)
+        self.speed = speed
+        self.traffic_manager = TrafficManager(nav_graph, gui, planning_mode=meta.get("planning_mode", "reactive"))
+        self.fleet_manager = FleetManager(nav_graph, self.traffic_manager)
+        self.fleet_manager.gui = gui
+        self.observers = []
+        self.time = meta.get("start_time", 0.0)
+        self.ticks = 0  # Trace ticks applied
+        self.trace = None  # A replay is never recorded again
+        self._records = self.reader.records()
+        self._pending = next(self._records, None)
+
+    @property
+    def gui(self):
+        return self.traffic_manager.gui
+
+    @gui.setter
+    def gui(self, gui):
+        self.traffic_manager.gui = gui
+        self.fleet_manager.gui = gui
+
+    @property
+    def events(self):
+        return self.traffic_manager.events
+
+    @property
+    def finished(self):
+        return self._pending is None
+
+    def add_observer(self, observer):
+        if observer not in self.observers:
+            self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        if observer in self.observers:
+            self.observers.remove(observer)
+
+    def spawn_robot(self, pos_idx, priority=None):
+        log_action(self.gui, "Replay is read-only: robots cannot be spawned")
+        return None
+
+    def assign_task(self, robot, goal_idx):
+        log_action(self.gui, "Replay is read-only: tasks cannot be assigned")
+        return False
+
+    def assign_tasks(self, goals, robots=None):
+        log_action(self.gui, "Replay is read-only: tasks cannot be assigned")
+        return []
+
+    def close_lane(self, idx1, idx2, both_ways=True):
+        log_action(self.gui, "Replay is read-only: lanes cannot be closed")
+        return []
+
+    def open_lane(self, idx1, idx2, both_ways=True):
+        log_action(self.gui, "Replay is read-only: lanes cannot be opened")
+        return []
+
+    def disable_vertex(self, idx):
+        log_action(self.gui, "Replay is read-only: vertices cannot be disabled")
+        return []
+
+    def enable_vertex(self, idx):
+        log_action(self.gui, "Replay is read-only: vertices cannot be enabled")
+        return []
+
+    def get_robot(self, robot_id):
+        return next((r for r in self.fleet_manager.robots if r.id == robot_id), None)
+
+    def stop_trace(self):
+        """
+        Nothing to stop: a replay is never recorded.
+        """
+
+    def close(self):
+        """
+        Nothing to close: a replay runs no traffic workers.
+        """
+
+    def _apply(self, record):
+        record_type, time, data = record
+        robots = self.fleet_manager.robots
+        if record_type == COMMAND:
+            if data["command"] == "spawn" and data.get("ok"):
+                robots.append(Robot(data["robot_id"], data["pos"], data["color"], data["priority"]))
+                self.fleet_manager.robot_count = len(robots)
+            elif data["command"] in LANE_COMMANDS:
+                # Shown on the map; the recorded robot states already include the reroutes
+                apply_lane_command(self.nav_graph, data)
+            else:
+                apply_command(robots, data)
+        else:
+            apply_deltas(robots, data)
+            self.ticks += 1
+        self.time = max(self.time, time)
+        self.traffic_manager.clock = self.time
+
+    def step(self, dt=None):
+        """
+        Applies the trace records up to ``speed * dt`` simulated seconds ahead, then
+        notifies the observers.
+
+        :return: Number of trace ticks applied.
+        """
+        end_time = self.time + (self.tick_interval if dt is None else dt) * self.speed
+        ticks = self.ticks
+        while self._pending is not None and self._pending[1] <= end_time + 1e-9:
+            self._apply(self._pending)
+            self._pending = next(self._records, None)
+        if self._pending is not None:
+            self.time = end_time  # Between ticks: hold the clock at the requested time
+        self.traffic_manager.update_occupancy(self.fleet_manager.robots)
+        for observer in self.observers:
+            observer.on_tick(self)
+        return self.ticks - ticks
+
+    def run(self, until=None, max_ticks=None):
+        """
+        Applies the trace as fast as possible up to simulated time ``until`` (the whole
+        trace when omitted) or ``max_ticks`` trace ticks.
+
+        :return: Number of trace ticks applied.
+        """
+        ticks = self.ticks
+        while self._pending is not None:
+            if until is not None and self._pending[1] > until + 1e-9:
+                break
+            if max_ticks is not None and self.ticks - ticks >= max_ticks and self._pending[0] != COMMAND:
+                break
+            self._apply(self._pending)
+            self._pending = next(self._records, None)
+        self.traffic_manager.update_occupancy(self.fleet_manager.robots)
+        for observer in self.observers:
+            observer.on_tick(self)
+        return self.ticks - ticks
@@ -0,0 +1,96 @@
+class ReservationTable:
+    def __init__(self, margin=0.1):
+        """
+        Shared space-time reservation table used by the cooperative planner.
+
+        Vertices and lanes are reserved over closed time intervals (in simulated seconds).
+        Two intervals conflict if they overlap or come within ``margin`` seconds of each other,
+        which absorbs the tick quantization of the simulation.
+
+        :param margin: Safety gap in seconds required between reservations of the same resource.
+        """
+        self.margin = margin
+        self.vertices = {}  # vertex -> list of (start, end, robot_id)
+        self.lanes = {}  # undirected lane key -> list of (start, end, robot_id)
+        self._owned = {}  # robot_id -> set of (is_lane, key) reserved by that robot
+        self.indefinite = {}  # vertex -> ids of robots holding it with no end time (parked or stuck)
+
+    def _is_free(self, table, key, start, end, robot_id):
+        margin = self.margin
+        for res_start, res_end, owner in table.get(key, ()):
+            if owner != robot_id and start < res_end + margin and res_start < end + margin:
+                return False
+        return True
+
+    def vertex_free(self, vertex, start, end, robot_id):
+        """
+        Checks whether a vertex is free of other robots' reservations over [start, end].
+        """
+        return self._is_free(self.vertices, vertex, start, end, robot_id)
+
+    def lane_free(self, lane, start, end, robot_id):
+        """
+        Checks whether a lane is free of other robots' reservations over [start, end].
+        """
+        return self._is_free(self.lanes, lane, start, end, robot_id)
+
+    def vertex_owners(self, vertex, start, end, robot_id):
+        """
+        Returns the ids of other robots holding the vertex at some point in [start, end].
+        """
+        margin = self.margin
+        return {
+            owner for res_start, res_end, owner in self.vertices.get(vertex, ())
+            if owner != robot_id and start < res_end + margin and res_start < end + margin
+        }
+
+    def reserve_vertex(self, vertex, start, end, robot_id):
+        self.vertices.setdefault(vertex, []).append((start, end, robot_id))
+        self._owned.setdefault(robot_id, set()).add((False, vertex))
+        if end == float('inf'):
+            self.indefinite.setdefault(vertex, set()).add(robot_id)
+
+    def blocked_vertices(self, robot_id):
+        """
+        Returns the vertices other robots hold indefinitely; no route can pass through them.
+        """
+        return frozenset(vertex for vertex, owners in self.indefinite.items() if owners - {robot_id})
+
+    def reserve_lane(self, lane, start, end, robot_id):
+        self.lanes.setdefault(lane, []).append((start, end, robot_id))
+        self._owned.setdefault(robot_id, set()).add((True, lane))
+
+    def release(self, robot_id):
+        """
+        Drops every reservation held by a robot.
+        """
+        for is_lane, key in self._owned.pop(robot_id, ()):
+            table = self.lanes if is_lane else self.vertices
+            if not is_lane and key in self.indefinite:
+                self.indefinite[key].discard(robot_id)
+                if not self.indefinite[key]:
+                    del self.indefinite[key]
+            remaining = [res for res in table.get(key, ()) if res[2] != robot_id]
+            if remaining:
+                table[key] = remaining
+            else:
+                table.pop(key, None)
+
+    def prune(self, now):
+        """
+        Forgets reservations that ended before ``now`` (minus the margin).
+        """
+        cutoff = now - self.margin
+        for table in (self.vertices, self.lanes):
+            for key in list(table):
+                remaining = [res for res in table[key] if res[1] >= cutoff]
+                if remaining:
+                    table[key] = remaining
+                else:
+                    del table[key]
+
+    def clear(self):
+        self.vertices.clear()
+        self.lanes.clear()
+        self._owned.clear()
+        self.indefinite.clear()
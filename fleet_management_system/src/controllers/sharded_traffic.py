@@ -0,0 +1,361 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from src.controllers.traffic_manager import TrafficManager
+from src.models.nav_graph import NavGraph
+from src.utils.events import EventBus
+from src.utils.logger import configure_logging
+from src.utils.metrics import instrument
+
+# Statuses of robots that act in a traffic update; the others are only obstacles
+ACTIVE_STATUSES = ("moving", "waiting")
+
+
+def partition_vertices(nav_graph, regions):
+    """
+    Splits the vertices into ``regions`` spatial tiles of about equal size by recursive
+    coordinate bisection: each set of vertices is cut across its wider axis, at the rank that
+    shares the regions it still has to form proportionally between the two sides.
+
+    :return: List with the region (0 .. regions - 1) of every vertex.
+    """
+    labels = [0] * nav_graph.vertex_count
+    coords_x, coords_y = nav_graph.coords_x, nav_graph.coords_y
+    stack = [(list(range(nav_graph.vertex_count)), 0, regions)]
+    while stack:
+        vertices, first, count = stack.pop()
+        if count <= 1 or len(vertices) <= 1:
+            for idx in vertices:
+                labels[idx] = first
+            continue
+        xs = [coords_x[idx] for idx in vertices]
+        ys = [coords_y[idx] for idx in vertices]
+        axis = coords_x if max(xs) - min(xs) >= max(ys) - min(ys) else coords_y
+        vertices.sort(key=lambda idx: (axis[idx], idx))
+        left = count // 2
+        cut = len(vertices) * left // count
+        stack.append((vertices[:cut], first, left))
+        stack.append((vertices[cut:], first + left, count - left))
+    return labels
+
+
+class _ShardRobot:
+    """
+    Robot state shipped to a region worker for one traffic update. Only the first two path
+    steps travel: a traffic update drives at most one of them, and a reroute replaces the path.
+    """
+    __slots__ = ("id", "pos_idx", "previous_pos_idx", "goal_idx", "path", "priority", "status", "progress",
+                 "schedule", "task_started_at")
+
+    def __init__(self, row):
+        (self.id, self.pos_idx, self.previous_pos_idx, self.goal_idx, self.path, self.priority, self.status,
+         self.progress, self.task_started_at) = row
+        self.schedule = []
+
+
+def _robot_row(robot):
+    return (robot.id, robot.pos_idx, robot.previous_pos_idx, robot.goal_idx, list(robot.path[:2]), robot.priority,
+            robot.status, robot.progress, robot.task_started_at)
+
+
+def _resolve_region(manager, task):
+    """
+    Runs the reactive conflict resolution of one region on a worker-side TrafficManager.
+
+    :param task: (clock, occupied vertices, occupied lanes, closures, robot rows, wait-for
+                 edges, open deadlocks, stranded robot ids). Rows are (order, active, state)
+                 in fleet order; ``order`` is the robot's place in the global priority order.
+    :return: (robot updates, wait-for edges of the active robots, replans, deadlocks,
+             ordered outputs), where each output is (order, kind, value) with kind "event",
+             "trip" or "deadlock".
+    """
+    clock, occupied_vertices, occupied_lanes, closures, rows, wait_for, open_deadlocks, stranded = task
+    manager.nav_graph.set_closures(*closures)
+    manager.clock = clock
+    manager.occupied_vertices, manager.occupied_lanes = occupied_vertices, occupied_lanes
+    manager.wait_for = wait_for
+    manager._open_deadlocks = open_deadlocks
+    manager._stranded = stranded
+    manager.replan_count = manager.deadlock_count = 0
+    manager.trip_times = []
+    published = []
+    manager.events = EventBus()
+    manager.events.subscribe(published.append)
+
+    robots = [_ShardRobot(state) for _, _, state in rows]
+    manager._build_conflict_index(robots)
+    manager._robot_lookup = {robot.id: robot for robot in robots}
+    paths = {robot.id: (robot.path, len(robot.path)) for robot in robots}
+    acting = sorted((order, robot) for (order, active, _), robot in zip(rows, robots) if active)
+
+    outputs = []
+    for order, robot in acting:
+        events, trips, deadlocks = len(published), len(manager.trip_times), len(open_deadlocks)
+        manager._resolve_robot(robot)
+        outputs.extend((order, "event", (e.type, e.time, e.message, e.robot_id, e.data)) for e in published[events:])
+        outputs.extend((order, "trip", trip) for trip in manager.trip_times[trips:])
+        if len(open_deadlocks) != deadlocks:
+            outputs.extend((order, "deadlock", (key, open_deadlocks[key])) for key in list(open_deadlocks)[deadlocks:])
+
+    updates = []
+    for _, robot in acting:
+        path, length = paths[robot.id]
+        # A replaced path is sent whole, otherwise only the number of steps driven
+        update = length - len(path) if robot.path is path else list(robot.path)
+        updates.append((robot.id, robot.pos_idx, robot.previous_pos_idx, robot.status, robot.progress, update,
+                        robot.task_started_at))
+    edges = {robot.id: wait_for.get(robot.id) for _, robot in acting}
+    return updates, edges, manager.replan_count, manager.deadlock_count, outputs
+
+
+_worker = None  # TrafficManager of a worker process
+
+
+def _init_worker(graph_path, settings):
+    global _worker
+    configure_logging(path=None, console=False)
+    nav_graph = NavGraph.load(graph_path)
+    for level in nav_graph.level_names:
+        nav_graph.load_level(level)
+    _worker = TrafficManager(nav_graph, None, **settings)
+
+
+def _resolve_in_worker(task):
+    return _resolve_region(_worker, task)
+
+
+class ShardedTrafficManager(TrafficManager):
+    def __init__(self, nav_graph, gui, regions=1, workers=None, parallel_min_robots=200, **kwargs):
+        """
+        TrafficManager whose reactive conflict resolution runs in a process pool, one task
+        per region of the map.
+
+        The map is cut into ``regions`` spatial tiles (see ``partition_vertices``) and each
+        robot belongs to the region of its vertex. Robots only interact with robots standing
+        within one lane of them (or that they wait for), so regions are independent except
+        at their borders. Robots on boundary vertices are checked every update: if one
+        interacts with a robot of another region, their whole interaction cluster is handed
+        to the region of its first robot for that update. Each worker resolves its robots in
+        the global priority order and returns their new states, events, trip times and
+        deadlocks, which are merged back in that order.
+
+        Ticks are therefore identical to those of a single shard (``regions=1``). This needs
+        searches that depend only on the graph and the occupancy, so there is no path cache
+        and the A* heuristic is the straight line (no landmarks, which are computed lazily
+        and could differ between processes); every level is loaded up front for the same
+        reason. The first region is resolved in-process and logs as usual; the workers run
+        without logging, and their searches are not counted in the metrics.
+
+        Experimental: the speedup over one region has not been measured on a multi-core
+        host. On a single CPU the regions run one after another and shipping robot states
+        to the workers makes updates about twice as slow (see
+        benchmarks/bench_sharded_traffic.py). Call ``close`` to stop the workers.
+
+        :param nav_graph: Navigation graph, loaded from a file the workers can read again.
+        :param regions: Number of regions (and of tasks per traffic update); 1 resolves the
+                        fleet in-process.
+        :param workers: Worker processes (defaults to ``regions``, at most the CPU count).
+        :param parallel_min_robots: Fleets smaller than this are resolved in-process.
+        :param kwargs: Other TrafficManager settings; only the reactive planning mode is
+                       supported.
+        :raises ValueError: On reservation planning or a graph without a readable file.
+        """
+        if kwargs.get("planning_mode", "reactive") != "reactive":
+            raise ValueError("Sharded traffic resolution supports the reactive planning mode only")
+        if not nav_graph.file_path or not os.path.exists(nav_graph.file_path):
+            raise ValueError("Sharded traffic resolution needs a nav graph loaded from a file")
+        kwargs.update(path_cache_size=0, landmarks=0)
+        super().__init__(nav_graph, gui, **kwargs)
+        for level in nav_graph.level_names:
+            nav_graph.load_level(level)
+        self._worker_settings = {key: kwargs[key] for key in ("bidirectional", "bidirectional_min_distance")
+                                 if key in kwargs}
+        self._worker_settings.update(path_cache_size=0, landmarks=0)
+        self.regions = regions
+        self.workers = workers or min(regions, os.cpu_count() or 1)
+        self.parallel_min_robots = parallel_min_robots
+        self.region_of = partition_vertices(nav_graph, regions)
+        self.parallel_updates = 0  # Traffic updates resolved by region
+        self.handoffs = 0  # Robots resolved by another region's worker than their own
+        self._pool = None
+        self._local = None  # In-process worker manager for the first region of each update
+
+        # Vertices within one lane (either way) of each vertex, including itself, the regions
+        # they belong to, and the vertices next to another region
+        offsets, targets = nav_graph.adj_offsets, nav_graph.adj_targets
+        rev_offsets, rev_targets = nav_graph.rev_offsets, nav_graph.rev_targets
+        region_of = self.region_of
+        self._around = []
+        self._nearby_regions = []
+        self.boundary_vertices = set()
+        for idx in range(nav_graph.vertex_count):
+            around = {idx}
+            around.update(targets[offsets[idx]:offsets[idx + 1]])
+            around.update(rev_targets[rev_offsets[idx]:rev_offsets[idx + 1]])
+            nearby = {region_of[v] for v in around}
+            self._around.append(tuple(around))
+            self._nearby_regions.append(tuple(nearby))
+            if len(nearby) > 1:
+                self.boundary_vertices.add(idx)
+
+    def close(self):
+        """
+        Shuts the worker pool down.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def update_traffic(self, robots):
+        self.update_occupancy(robots)
+        if self.regions < 2 or len(robots) < self.parallel_min_robots:
+            self._resolve_conflicts(robots)
+            self._prune_wait_for()
+            self.track_robot_vertices(robots)
+            return
+
+        tasks = self._region_tasks(robots)
+        if self._pool is None and len(tasks) > 1:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self.nav_graph.file_path, self._worker_settings))
+        if self._local is None:
+            self._local = TrafficManager(self.nav_graph, None, **self._worker_settings)
+        # The main process resolves the first region while the pool works on the others
+        pending = self._pool.map(_resolve_in_worker, tasks[1:]) if len(tasks) > 1 else ()
+        results = [_resolve_region(self._local, tasks[0])] if tasks else []
+        results.extend(pending)
+        self.parallel_updates += 1
+        self._merge(robots, results)
+        self.track_robot_vertices(robots)
+
+    def _region_tasks(self, robots):
+        """
+        Assigns every acting robot to a region and builds one worker task per region that
+        has acting robots. Robots outside a region that its robots could meet are included
+        as read-only obstacles.
+        """
+        region_of, around, wait_for = self.region_of, self._around, self.wait_for
+        at_vertex = {}
+        index_of = {}
+        active = []
+        for i, robot in enumerate(robots):
+            at_vertex.setdefault(robot.pos_idx, []).append(i)
+            index_of[robot.id] = i
+            active.append(robot.status in ACTIVE_STATUSES)
+        owner = [region_of[robot.pos_idx] for robot in robots]
+        waited_by = {}  # robot id -> indices of the robots waiting for it
+        for robot_id, blockers in wait_for.items():
+            if robot_id in index_of:
+                for blocker_id in blockers:
+                    waited_by.setdefault(blocker_id, []).append(index_of[robot_id])
+
+        def partners(i):
+            for v in around[robots[i].pos_idx]:
+                for j in at_vertex[v] if v in at_vertex else ():
+                    if active[j] and j != i:
+                        yield j
+            for robot_id in wait_for.get(robots[i].id, ()):
+                j = index_of.get(robot_id)
+                if j is not None and active[j]:
+                    yield j
+            for j in waited_by.get(robots[i].id, ()):
+                if active[j]:
+                    yield j
+
+        # Handoff: a cluster of interacting robots that spans regions goes to the region
+        # of its first robot
+        handed = []
+        seen = set()
+        for i, robot in enumerate(robots):
+            if not active[i] or i in seen:
+                continue
+            if robot.pos_idx not in self.boundary_vertices and not any(
+                    robot_id in index_of and owner[index_of[robot_id]] != owner[i]
+                    for robot_id in wait_for.get(robot.id, ())):
+                continue
+            cluster = [i]
+            seen.add(i)
+            for member in cluster:
+                for j in partners(member):
+                    if j not in seen:
+                        seen.add(j)
+                        cluster.append(j)
+            region = owner[min(cluster)]
+            for j in cluster:
+                if owner[j] != region:
+                    owner[j] = region
+                    handed.append(j)
+        self.handoffs += len(handed)
+
+        orders = {i: order for order, i in enumerate(sorted(range(len(robots)), key=lambda i: -robots[i].priority))}
+        members = {}  # region -> robot indices (acting robots and obstacles)
+        for i in range(len(robots)):
+            if active[i]:
+                members.setdefault(owner[i], set()).add(i)
+        for i in range(len(robots)):
+            if not active[i]:
+                for region in self._nearby_regions[robots[i].pos_idx]:
+                    if region in members:
+                        members[region].add(i)
+        for i in handed:
+            # Obstacles around a robot resolved away from its own region
+            for v in around[robots[i].pos_idx]:
+                members[owner[i]].update(j for j in at_vertex.get(v, ()) if not active[j])
+
+        closures = (set(self.nav_graph.closed_lanes), set(self.nav_graph.disabled_vertices))
+        tasks = []
+        for region in sorted(members):
+            indices = sorted(members[region])
+            rows = [(orders[i], active[i] and owner[i] == region, _robot_row(robots[i])) for i in indices]
+            ids = {robots[i].id for i in indices}
+            tasks.append((
+                self.clock, self.occupied_vertices, self.occupied_lanes, closures, rows,
+                {robot_id: set(edges) for robot_id, edges in wait_for.items() if robot_id in ids},
+                {key: detected for key, detected in self._open_deadlocks.items() if key & ids},
+                self._stranded & ids,
+            ))
+        return tasks
+
+    def _merge(self, robots, results):
+        """
+        Applies the workers' results: robot states and wait-for edges, then events, trips and
+        deadlocks in the global priority order.
+        """
+        lookup = {robot.id: robot for robot in robots}
+        outputs = []
+        for updates, edges, replans, deadlocks, region_outputs in results:
+            for robot_id, pos_idx, previous_pos_idx, status, progress, path, task_started_at in updates:
+                robot = lookup[robot_id]
+                if isinstance(path, list):
+                    robot.path = path
+                else:
+                    for _ in range(path):
+                        robot.path.pop(0)
+                robot.pos_idx, robot.previous_pos_idx = pos_idx, previous_pos_idx
+                robot.status, robot.progress, robot.task_started_at = status, progress, task_started_at
+                if status == "task complete":
+                    robot.schedule = []
+            for robot_id, blockers in edges.items():
+                if blockers is None:
+                    self.wait_for.pop(robot_id, None)
+                else:
+                    self.wait_for[robot_id] = blockers
+            self.replan_count += replans
+            self.deadlock_count += deadlocks
+            outputs.extend(region_outputs)
+
+        outputs.sort(key=lambda output: output[0])  # Stable: a robot's outputs keep their order
+        for _, kind, value in outputs:
+            if kind == "event":
+                event_type, time, message, robot_id, data = value
+                self.events.publish(event_type, time, message, robot_id, **data)
+            elif kind == "trip":
+                self.trip_times.append(value)
+            else:
+                key, detected = value
+                self._open_deadlocks[key] = detected
+        self._robot_lookup = lookup
+        self._prune_wait_for()
+
+
+instrument(ShardedTrafficManager, "update_traffic", "update_traffic_seconds")
@@ -0,0 +1,558 @@
+import heapq
+import math
+import os
+
+from src.controllers.fleet_manager import FleetManager
+from src.controllers.sharded_traffic import ShardedTrafficManager
+from src.controllers.traffic_manager import TrafficManager
+from src.models.fleet_store import ARRIVAL_TOLERANCE, FleetStore
+from src.models.nav_graph import NavGraph
+from src.utils.checkpoint import capture_state, read_checkpoint, restore_state, write_checkpoint, write_checkpoint_async
+from src.utils.helpers import log_action, log_enabled, INFO
+from src.utils.metrics import metrics, instrument
+from src.utils.trace import TraceWriter
+
+
+class SimulationEngine:
+    SCHEDULERS = ("fixed", "event")
+
+    def __init__(self, nav_graph, gui=None, tick_interval=0.05, planning_mode="reactive", array_store=False,
+                 scheduler="fixed", traffic_shards=None):
+        """
+        Owns the fleet and traffic managers and advances the simulation without a GUI.
+
+        The engine uses a fixed timestep: ``step(dt)`` accumulates wall or simulated time and
+        runs as many ticks of ``tick_interval`` seconds as fit, so results do not depend on
+        how often the caller steps it. A robot crosses a lane in the lane's travel time
+        (length over speed limit, see ``NavGraph.travel_time``), the same cost routes are
+        planned with.
+
+        With ``scheduler="event"`` the engine is discrete-event instead: it keeps a priority
+        queue of each robot's next arrival, departure or retry, jumps the clock straight to
+        the earliest one and runs the traffic update only at those instants. The instants
+        are the ticks the fixed scheduler would run at, and only ticks where nothing can
+        change are skipped: a tick that changed a robot is followed by the next one, and
+        robots that are waiting on a conflict retry every tick. Both schedulers therefore
+        make the same traffic decisions.
+
+        :param nav_graph: Navigation graph the fleet moves on.
+        :param gui: Optional GUI used for logging and dialogs (None when headless).
+        :param tick_interval: Simulated seconds per tick.
+        :param planning_mode: Traffic planning mode, "reactive" or "reservation".
+        :param array_store: Keep robot state in a NumPy-backed FleetStore (requires NumPy).
+        :param scheduler: "fixed" (tick every tick_interval) or "event" (jump between events).
+        :param traffic_shards: Experimental: resolve traffic in this many map regions on a
+                               process pool (see ShardedTrafficManager; reactive planning
+                               only). Call ``close`` when done to stop the workers.
+        """
+        if scheduler not in self.SCHEDULERS:
+            raise ValueError(f"Unknown scheduler {scheduler!r}")
+        self.nav_graph = nav_graph
+        self.tick_interval = tick_interval
+        if traffic_shards:
+            self.traffic_manager = ShardedTrafficManager(nav_graph, gui, regions=traffic_shards,
+                                                         planning_mode=planning_mode)
+        else:
+            self.traffic_manager = TrafficManager(nav_graph, gui, planning_mode=planning_mode)
+        self.fleet_store = FleetStore() if array_store else None
+        self.fleet_manager = FleetManager(nav_graph, self.traffic_manager, self.fleet_store)
+        self.fleet_manager.gui = gui
+        self.observers = []  # Objects notified after every step (e.g. the GUI)
+        self.time = 0.0  # Simulated time in seconds
+        self.ticks = 0  # Ticks elapsed (the event scheduler skips the idle ones)
+        self.wait_time = 0.0  # Robot-seconds spent waiting on conflicts
+        self._accumulator = 0.0  # Time not yet consumed by a full tick
+
+        # Discrete-event scheduler state
+        self.scheduler = scheduler
+        self.event_count = 0  # Event instants processed (event scheduler)
+        self._event_queue = []  # Heap of (tick, sequence, robot id); stale entries are skipped
+        self._event_times = {}  # robot id -> tick of its live queue entry
+        self._event_sequence = 0
+        self._settled = None  # Fleet signature after an event that changed nothing, else None
+
+        self.trace = None  # TraceWriter while a trace is being recorded
+
+    @property
+    def gui(self):
+        return self.traffic_manager.gui
+
+    @gui.setter
+    def gui(self, gui):
+        """
+        Attaches (or detaches with None) the GUI used for logging and dialogs.
+        """
+        self.traffic_manager.gui = gui
+        self.fleet_manager.gui = gui
+
+    @property
+    def events(self):
+        """
+        Event bus carrying conflict, reroute, deadlock, spawn-rejected and task-complete events.
+        """
+        return self.traffic_manager.events
+
+    def add_observer(self, observer):
+        """
+        Registers an observer whose ``on_tick(engine)`` is called after each step.
+        """
+        if observer not in self.observers:
+            self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        if observer in self.observers:
+            self.observers.remove(observer)
+
+    def spawn_robot(self, pos_idx, priority=None):
+        """
+        Spawns a robot through the fleet manager (recorded in the trace, if one is open).
+        """
+        robot = self.fleet_manager.spawn_robot(pos_idx, priority)
+        if self.trace is not None:
+            if robot is None:
+                self.trace.record_command(self.time, "spawn", pos=pos_idx, ok=False)
+            else:
+                self.trace.record_command(self.time, "spawn", robot_id=robot.id, pos=pos_idx,
+                                          priority=robot.priority, color=robot.color, ok=True)
+        return robot
+
+    def assign_task(self, robot, goal_idx):
+        """
+        Assigns a task to a robot given either the robot instance or its id.
+        """
+        if isinstance(robot, str):
+            robot = self.get_robot(robot)
+            if robot is None:
+                return False
+        assigned = self.fleet_manager.assign_task(robot, goal_idx)
+        if self.trace is not None:
+            self.trace.record_command(self.time, "assign", robot_id=robot.id, goal=goal_idx, ok=assigned)
+        return assigned
+
+    def assign_tasks(self, goals, robots=None):
+        """
+        Assigns a batch of goals to idle robots (see ``FleetManager.assign_tasks``).
+        """
+        assigned = self.fleet_manager.assign_tasks(goals, robots)
+        if self.trace is not None:
+            for robot, goal_idx in assigned:
+                self.trace.record_command(self.time, "assign", robot_id=robot.id, goal=goal_idx, ok=True)
+        return assigned
+
+    def close_lane(self, idx1, idx2, both_ways=True):
+        """
+        Closes a lane at runtime (see ``NavGraph.close_lane``) and repairs the routes that
+        drove it, keeping every robot.
+
+        :return: Robots whose route was replanned.
+        :raises ValueError: If there is no lane between the vertices.
+        """
+        lanes = self.nav_graph.close_lane(idx1, idx2, both_ways)
+        return self._lanes_changed(lanes, False, "close_lane", a=idx1, b=idx2, both_ways=both_ways)
+
+    def open_lane(self, idx1, idx2, both_ways=True):
+        """
+        Reopens a closed lane and gives the robots it helps a new route.
+        """
+        lanes = self.nav_graph.open_lane(idx1, idx2, both_ways)
+        return self._lanes_changed(lanes, True, "open_lane", a=idx1, b=idx2, both_ways=both_ways)
+
+    def disable_vertex(self, idx):
+        """
+        Takes a vertex out of service and repairs the routes through it.
+        """
+        lanes = self.nav_graph.disable_vertex(idx)
+        return self._lanes_changed(lanes, False, "disable_vertex", vertex=idx)
+
+    def enable_vertex(self, idx):
+        """
+        Puts a disabled vertex back in service and gives the robots it helps a new route.
+        """
+        lanes = self.nav_graph.enable_vertex(idx)
+        return self._lanes_changed(lanes, True, "enable_vertex", vertex=idx)
+
+    def _lanes_changed(self, lanes, opened, command, **fields):
+        if self.trace is not None:
+            self.trace.record_command(self.time, command, ok=True, **fields)
+        if not lanes:
+            return []
+        log_action(self.gui, f"{len(lanes)} lane(s) {'opened' if opened else 'closed'} ({command})")
+        return self.traffic_manager.repair_routes(self.fleet_manager.robots, lanes, opened)
+
+    def get_robot(self, robot_id):
+        """
+        Returns the robot with the given id, or None if it does not exist.
+        """
+        return next((r for r in self.fleet_manager.robots if r.id == robot_id), None)
+
+    def start_trace(self, path, flush_every=100):
+        """
+        Starts recording a fleet trace (see ``src.utils.trace``) to ``path``: the state
+        changes of every robot after each tick or event, and every spawn and task command
+        issued through the engine. Robots that already exist are recorded as spawned now.
+
+        :return: The TraceWriter.
+        """
+        self.stop_trace()
+        meta = {
+            "graph": getattr(self.nav_graph, "file_path", None),
+            "tick_interval": self.tick_interval,
+            "planning_mode": self.traffic_manager.planning_mode,
+            "scheduler": self.scheduler,
+            "start_time": self.time,
+        }
+        self.trace = TraceWriter(path, meta, flush_every)
+        for robot in self.fleet_manager.robots:
+            self.trace.record_command(self.time, "spawn", robot_id=robot.id, pos=robot.pos_idx,
+                                      priority=robot.priority, color=robot.color, ok=True)
+            if robot.goal_idx is not None:
+                self.trace.record_command(self.time, "assign", robot_id=robot.id, goal=robot.goal_idx, ok=True)
+        self.trace.record_tick(self.time, self.fleet_manager.robots)
+        return self.trace
+
+    def stop_trace(self):
+        """
+        Flushes and closes the trace being recorded, if any.
+        """
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    def close(self):
+        """
+        Shuts down the traffic worker processes, if any (``traffic_shards``). The engine stays
+        usable: a later sharded update starts them again.
+        """
+        if isinstance(self.traffic_manager, ShardedTrafficManager):
+            self.traffic_manager.close()
+
+    def save_checkpoint(self, path, rng=None, extra=None, background=True):
+        """
+        Saves the complete simulation state (see ``src.utils.checkpoint``): robots, traffic
+        tables, clocks, the map and its closures. The state is copied and packed right away,
+        between two ticks; compressing and writing it happen on a background thread unless
+        ``background`` is False.
+
+        :param rng: Optional random.Random of the caller whose state is saved along.
+        :param extra: Optional JSON-serializable dict saved along (e.g. run counters).
+        :return: A Future resolving to the path, or the path when written in the foreground.
+        """
+        state = capture_state(self, rng, extra)
+        if background:
+            return write_checkpoint_async(path, state)
+        return write_checkpoint(path, state)
+
+    def restore_checkpoint(self, checkpoint, rng=None):
+        """
+        Continues a saved simulation in this engine, which must run on the checkpoint's map
+        and have no robots yet.
+
+        :param checkpoint: Checkpoint file, or a state returned by ``read_checkpoint``.
+        :param rng: Optional random.Random that gets the saved RNG state back.
+        :return: The extra data saved with the checkpoint.
+        :raises ValueError: If the checkpoint is unreadable or belongs to another map.
+        """
+        state = read_checkpoint(checkpoint) if isinstance(checkpoint, str) else checkpoint
+        extra = restore_state(self, state, rng)
+        log_action(self.gui, f"Restored {len(self.fleet_manager.robots)} robots at t={self.time:.2f} s")
+        return extra
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint, nav_graph=None, gui=None, rng=None, **kwargs):
+        """
+        Builds an engine with the settings a checkpoint was saved with and restores it.
+
+        :param nav_graph: Graph to run on (loaded from the checkpoint's map file if omitted).
+        :param kwargs: SimulationEngine settings overriding the saved ones.
+        :raises ValueError: If the checkpoint is unreadable or its map cannot be loaded.
+        """
+        state = read_checkpoint(checkpoint) if isinstance(checkpoint, str) else checkpoint
+        meta = state["meta"]
+        if nav_graph is None:
+            if not meta["map"]["graph"] or not os.path.exists(meta["map"]["graph"]):
+                raise ValueError(f"The map of the checkpoint ({meta['map']['graph']}) is not available")
+            nav_graph = NavGraph.load(meta["map"]["graph"])
+        saved = meta["engine"]
+        settings = {key: saved[key] for key in ("tick_interval", "planning_mode", "array_store", "scheduler")}
+        settings.update(kwargs)
+        engine = cls(nav_graph, gui, **settings)
+        engine.restore_checkpoint(state, rng)
+        return engine
+
+    def tick(self):
+        """
+        Runs exactly one fixed-length tick: advances robot progress, then resolves traffic.
+        """
+        self._advance(self._tick_time(self.ticks + 1), self.tick_interval)
+        self.ticks += 1
+
+    def _tick_time(self, tick):
+        # One formula for both schedulers, so a tick has the same clock value in each
+        return tick * self.tick_interval
+
+    def _advance(self, now, dt):
+        """
+        Moves the simulation to ``now``, ``dt`` seconds after the previous update: advances
+        robot progress, then resolves traffic at that instant.
+        """
+        replans = self.traffic_manager.replan_count
+        self.wait_time += dt * self.fleet_manager.status_counts()["waiting"]
+        self.traffic_manager.clock = now
+        if self.fleet_store is not None and self.traffic_manager.planning_mode == "reactive":
+            self._advance_store(dt)
+            robots = ()  # Reactive robots have no schedules; the store moved all of them
+        else:
+            robots = self.fleet_manager.robots
+        for robot in robots:
+            if robot.schedule:
+                self._follow_schedule(robot, now)
+            elif robot.status == "moving" and robot.path:
+                lane_time = self.lane_time(robot.pos_idx, robot.path[0])
+                robot.progress = robot.progress + dt * (1.0 / lane_time) if lane_time else 1
+                if robot.progress >= 1 - ARRIVAL_TOLERANCE:
+                    log_action(self.gui, f"{robot.id} (P:{robot.priority}) moved to {robot.path[0]}")
+                    robot.pos_idx = robot.path.pop(0)
+                    robot.progress = 0
+                    if not robot.path:
+                        robot.status = "task complete"
+                        self.traffic_manager.record_task_complete(robot)
+
+        self.traffic_manager.update_traffic(self.fleet_manager.robots)
+        self.time = now
+        if self.trace is not None:
+            self.trace.record_tick(now, self.fleet_manager.robots)
+        if metrics.enabled:
+            metrics.count("reroutes", self.traffic_manager.replan_count - replans)
+            metrics.end_tick()
+
+    def _robot_event_tick(self, robot):
+        """
+        Returns the tick at which a robot next needs attention: the end of its current lane,
+        its next planned departure, its plan refresh (reservation mode) or, while it waits,
+        the next tick. Returns None for idle and finished robots. Predictions may come a tick
+        early, which only costs an event, but never late.
+        """
+        tick = self.ticks
+        if robot.schedule:
+            depart = robot.schedule[0]
+            if depart > self.time:
+                event = self._tick_at(depart)
+            else:
+                event = self._tick_at(depart + self.lane_time(robot.pos_idx, robot.path[0]))
+            replan = self.traffic_manager.replan_time(robot)
+            if replan is not None:
+                event = min(event, self._tick_at(replan))
+        elif robot.status == "moving" and robot.path:
+            lane_time = self.lane_time(robot.pos_idx, robot.path[0])
+            # The tick whose progress step reaches the end of the lane
+            remaining = (1 - ARRIVAL_TOLERANCE - robot.progress) * lane_time / self.tick_interval
+            event = tick + math.ceil(remaining - 1e-6)
+        elif robot.status == "waiting":
+            event = tick + 1
+        else:
+            return None
+        # Events are strictly in the future so the clock always moves forward
+        return max(event, tick + 1)
+
+    def _tick_at(self, time):
+        """
+        Returns the first tick at or after ``time`` (or the one before, within float error).
+        """
+        return math.ceil(time / self.tick_interval - 1e-6)
+
+    def _schedule_events(self):
+        """
+        Queues the next event of every robot whose event tick changed at this instant.
+        """
+        for robot in self.fleet_manager.robots:
+            event = self._robot_event_tick(robot)
+            if event == self._event_times.get(robot.id):
+                continue
+            if event is None:
+                del self._event_times[robot.id]
+                continue
+            self._event_times[robot.id] = event
+            self._event_sequence += 1
+            heapq.heappush(self._event_queue, (event, self._event_sequence, robot.id))
+
+    def _next_tick(self, signature):
+        """
+        Returns the tick of the earliest pending event: the next tick if the fleet changed
+        since the last event settled (at that event, or through commands in between).
+        """
+        if signature != self._settled:
+            return self.ticks + 1
+        self._schedule_events()
+        queue = self._event_queue
+        while queue and self._event_times.get(queue[0][2]) != queue[0][0]:
+            heapq.heappop(queue)  # Superseded by a later reschedule
+        return queue[0][0] if queue else None
+
+    def next_event_time(self):
+        """
+        Returns the time of the earliest pending event, or None if nothing is scheduled.
+        """
+        event = self._next_tick(self._fleet_signature())
+        return None if event is None else self._tick_time(event)
+
+    def process_event(self, limit=None):
+        """
+        Jumps to the next event instant (event scheduler) and resolves traffic there.
+
+        :param limit: Do not go past this simulated time; the clock stops at the limit.
+        :return: True if an event was processed, False if none was due before the limit.
+        """
+        before = self._fleet_signature()
+        event = self._next_tick(before)
+        now = None if event is None else self._tick_time(event)
+        if now is None or (limit is not None and now > limit + 1e-9):
+            if limit is not None and limit > self.time:
+                self._interpolate(limit)
+            return False
+        self._advance(now, now - self.time)
+        self.ticks = event
+        after = self._fleet_signature()
+        self._settled = after if after == before else None
+        self.event_count += 1
+        return True
+
+    def _fleet_signature(self):
+        """
+        What the traffic update reads and changes: if a tick leaves it alone, the ticks after
+        it do too until the next arrival, departure or retry.
+        """
+        traffic_manager = self.traffic_manager
+        return ([(robot.status, robot.pos_idx, len(robot.path)) for robot in self.fleet_manager.robots],
+                traffic_manager.replan_count, traffic_manager.deadlock_count)
+
+    def _interpolate(self, now):
+        """
+        Moves the clock to a time between events: robots on a lane advance their progress,
+        nothing arrives and no traffic update runs.
+        """
+        dt = now - self.time
+        self.wait_time += dt * self.fleet_manager.status_counts()["waiting"]
+        for robot in self.fleet_manager.robots:
+            if robot.schedule:
+                # Departures are events, so a robot past its departure time is on the lane
+                lane_time = self.lane_time(robot.pos_idx, robot.path[0])
+                if lane_time and now >= robot.schedule[0]:
+                    robot.progress = min((now - robot.schedule[0]) / lane_time, 1.0)
+            elif robot.status == "moving" and robot.path:
+                lane_time = self.lane_time(robot.pos_idx, robot.path[0])
+                if lane_time:
+                    robot.progress = min(robot.progress + dt * (1.0 / lane_time), 1.0)
+        self.traffic_manager.clock = now
+        self.time = now
+        # Ticks passed on the way had no event, so nothing happened at them
+        self.ticks = max(self.ticks, math.floor(now / self.tick_interval + 1e-9))
+
+    def lane_time(self, idx1, idx2):
+        """
+        Returns the seconds needed to drive from idx1 to idx2, or 0 when there is no lane
+        (e.g. a path that repeats the current vertex), which completes the step at once.
+        """
+        return self.nav_graph.travel_time(idx1, idx2) or 0.0
+
+    def _advance_store(self, dt):
+        """
+        Vectorized progress update for array-backed fleets; only robots that reached a vertex
+        are visited in Python, for logging and trip bookkeeping.
+        """
+        arrived, completed = self.fleet_store.advance(dt, self.lane_time)
+        if not arrived.size:
+            return
+        robots = self.fleet_store.views
+        log_moves = log_enabled(INFO)
+        for slot in arrived.tolist():
+            robot = robots[slot]
+            if log_moves:
+                log_action(self.gui, f"{robot.id} (P:{robot.priority}) moved to {robot.pos_idx}")
+            if completed[slot]:
+                self.traffic_manager.record_task_complete(robot)
+
+    def _follow_schedule(self, robot, now):
+        """
+        Moves a robot along a timed plan: its progress on a lane is derived from the planned
+        departure time, so tick quantization never accumulates into schedule drift.
+        """
+        while robot.path and robot.schedule and now >= robot.schedule[0]:
+            duration = self.lane_time(robot.pos_idx, robot.path[0])
+            progress = (now - robot.schedule[0]) / duration if duration else 1
+            if progress < 1:
+                robot.progress = progress
+                robot.status = "moving"
+                return
+            log_action(self.gui, f"{robot.id} (P:{robot.priority}) moved to {robot.path[0]}")
+            robot.previous_pos_idx = robot.pos_idx
+            robot.pos_idx = robot.path.pop(0)
+            robot.schedule.pop(0)
+            robot.progress = 0
+        if not robot.path:
+            robot.status = "task complete"
+            self.traffic_manager.record_task_complete(robot)
+            log_action(self.gui, f"{robot.id} (P:{robot.priority}) completed task")
+
+    def step(self, dt=None):
+        """
+        Advances the simulation by ``dt`` seconds using fixed-length ticks.
+
+        With the event scheduler, processes every event up to ``time + dt`` instead.
+
+        :param dt: Elapsed time in seconds (defaults to one tick interval).
+        :return: Number of ticks (or event instants) executed.
+        """
+        if self.scheduler == "event":
+            end_time = self.time + (self.tick_interval if dt is None else dt)
+            executed = 0
+            while self.process_event(end_time):
+                executed += 1
+            for observer in self.observers:
+                observer.on_tick(self)
+            return executed
+        self._accumulator += self.tick_interval if dt is None else dt
+        executed = 0
+        # Small tolerance so float accumulation does not drop a tick
+        while self._accumulator >= self.tick_interval - 1e-9:
+            self._accumulator -= self.tick_interval
+            self.tick()
+            executed += 1
+        for observer in self.observers:
+            observer.on_tick(self)
+        return executed
+
+    def run(self, until=None, max_ticks=None):
+        """
+        Runs the simulation as fast as possible.
+
+        :param until: Simulated time in seconds to stop at, or a callable ``until(engine)``
+                      returning True when the run should stop. When omitted, runs until no
+                      robot is moving or waiting.
+        :param max_ticks: Optional hard limit on the number of ticks (or event instants) to execute.
+        :return: Number of ticks (or event instants) executed.
+        """
+        end_time = None
+        if until is None:
+            def until(engine):
+                return not any(r.status in ("moving", "waiting") for r in engine.fleet_manager.robots)
+        elif not callable(until):
+            end_time = until
+
+            def until(engine):
+                return engine.time >= end_time - 1e-9
+
+        executed = 0
+        while not until(self) and (max_ticks is None or executed < max_ticks):
+            if self.scheduler == "event":
+                # Nothing left to happen (or nothing before end_time): the run is over
+                if not self.process_event(end_time):
+                    break
+            else:
+                self.tick()
+            executed += 1
+        for observer in self.observers:
+            observer.on_tick(self)
+        return executed
+
+
+instrument(SimulationEngine, "_advance", "tick_seconds")
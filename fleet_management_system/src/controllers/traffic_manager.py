@@ -1,203 +1,1503 @@
-import random
 import heapq
-from src.utils.helpers import log_action, notify_user
-from tkinter import messagebox
+import bisect
+from collections import OrderedDict
+from src.controllers.goal_tree import GoalTree
+from src.controllers.reservation_table import ReservationTable
+from src.utils.events import EventBus, CONFLICT, REROUTE, DEADLOCK, TASK_COMPLETE
+from src.utils.helpers import log_action, log_enabled, DEBUG
+from src.utils.metrics import metrics, instrument
 
 
 class TrafficManager:
-    def __init__(self, nav_graph, gui):
+    PLANNING_MODES = ("reactive", "reservation")
+
+    def __init__(self, nav_graph, gui, path_cache_size=1024, bidirectional=False, bidirectional_min_distance=0.0,
+                 planning_mode="reactive", reservation_window=10.0, events=None, landmarks=4):
         self.nav_graph = nav_graph  # Stores the navigation graph for robot movement
         self.gui = gui  # GUI for logging actions
+        self.events = events if events is not None else EventBus()  # Conflict/reroute notifications
         self.occupied_lanes = set()  # Tracks lanes currently occupied by robots
         self.occupied_vertices = set()  # Tracks vertices currently occupied by robots
-        self.waiting_cooldown = {}  # Stores cooldown timers for waiting robots
+        self.wait_for = {}  # Wait-for graph: waiting robot id -> ids of the robots it waits for
+        self._robot_lookup = {}  # robot id -> robot, refreshed every traffic update
+
+        # LRU cache of find_path results, validated against the occupancy version
+        self.path_cache_size = path_cache_size
+        self.path_cache = OrderedDict()  # query -> (occupancy version, path tuple)
+        self.occupancy_version = 0  # Bumped whenever occupied vertices or lanes change
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+        self.cache_invalidations = 0
+        self._graph_version = nav_graph.version  # Levels loaded lazily invalidate cached searches
+
+        # Search settings: bidirectional A* for routes at least this long (straight-line)
+        self.bidirectional = bidirectional
+        self.bidirectional_min_distance = bidirectional_min_distance
+        self.landmarks = landmarks  # ALT landmark slots tightening the A* heuristic (0 disables)
+        self.last_search_expansions = 0  # Vertices expanded by the most recent search
+
+        # Planning mode: "reactive" resolves conflicts as they happen, "reservation" plans
+        # space-time routes against a shared reservation table (windowed cooperative A*)
+        if planning_mode not in self.PLANNING_MODES:
+            raise ValueError(f"Unknown planning mode {planning_mode!r}")
+        self.planning_mode = planning_mode
+        self.reservations = ReservationTable()
+        self.reservation_window = reservation_window  # Seconds of the future that are reserved
+        self.goal_hold_time = 2.5  # Seconds a robot's goal stays reserved after it arrives
+        self.max_plan_expansions = 20000  # Safety limit for a single space-time search
+        self.wait_duration = 0.5  # Seconds a robot waits in place per wait action
+        self.clock = 0.0  # Current simulated time, updated by the simulation engine
+        self._goal_distances = {}  # (goal, blocked vertices) -> travel time to goal from every vertex
+        self._pending_plans = set()  # Robot ids whose space-time plan must be (re)computed
+        self._stuck_robots = set()  # Robot ids holding their vertex because no route was found
+        self._making_way = {}  # robot id -> (vertex it moves to, vertex of the robot it makes way for)
+        self.robot_vertices = set()  # Vertices robots stood on after the last update, plus robots parked since
+
+        # Route repair after lanes close or open at runtime
+        self._goal_trees = OrderedDict()  # goal -> GoalTree, repaired in place on every change
+        self._stranded = set()  # Robot ids cut off from their goal by a closure (reactive mode)
+        self.route_repairs = 0  # Routes replaced because lanes closed or opened
+
+        # Comparison metrics shared by both planning modes
+        self.replan_count = 0  # Route recomputations after the initial assignment
+        self.trip_times = []  # Seconds from assignment to task completion
+
+        # Deadlock metrics (reactive mode)
+        self.deadlock_count = 0  # Wait-for cycles detected
+        self.deadlock_resolution_times = []  # Seconds from detection until no robot of the cycle waits
+        self._open_deadlocks = {}  # frozenset of robot ids in the cycle -> detection time
+
+    def traffic_stats(self):
+        """
+        Returns replanning, trip-time and deadlock metrics for comparing planning modes.
+        """
+        completed = len(self.trip_times)
+        return {
+            "planning_mode": self.planning_mode,
+            "replans": self.replan_count,
+            "completed_trips": completed,
+            "average_trip_time": sum(self.trip_times) / completed if completed else 0.0,
+            "route_repairs": self.route_repairs,
+            "deadlocks": self.deadlock_count,
+            "open_deadlocks": len(self._open_deadlocks),
+            "average_deadlock_resolution": (sum(self.deadlock_resolution_times) / len(self.deadlock_resolution_times)
+                                            if self.deadlock_resolution_times else 0.0),
+        }
+
+    # Counters carried over by checkpoints
+    CHECKPOINT_COUNTERS = ("replan_count", "deadlock_count", "route_repairs", "occupancy_version", "cache_hits",
+                           "cache_misses", "cache_evictions", "cache_invalidations")
+
+    def checkpoint_state(self):
+        """
+        Returns copies of the tables the next traffic updates depend on (see
+        ``src.utils.checkpoint``): occupancy, wait-for graph, open deadlocks, reservations,
+        the path cache and the comparison metrics. Robots are referred to by id. Caches
+        derived from the graph alone (goal distances and trees, landmarks) are not included;
+        they are rebuilt on demand.
+        """
+        reservations = self.reservations
+        return {
+            "clock": self.clock,
+            "counters": {name: getattr(self, name) for name in self.CHECKPOINT_COUNTERS},
+            "occupied_vertices": list(self.occupied_vertices),
+            "occupied_lanes": list(self.occupied_lanes),
+            "wait_for": [(robot_id, list(blockers)) for robot_id, blockers in self.wait_for.items()],
+            "open_deadlocks": [(list(key), detected) for key, detected in self._open_deadlocks.items()],
+            "stranded": list(self._stranded),
+            "stuck": list(self._stuck_robots),
+            "pending_plans": list(self._pending_plans),
+            "making_way": [(robot_id, target, asker_idx) for robot_id, (target, asker_idx) in self._making_way.items()],
+            "vertex_reservations": [(vertex, start, end, owner) for vertex, entries in reservations.vertices.items()
+                                    for start, end, owner in entries],
+            "lane_reservations": [(lane, start, end, owner) for lane, entries in reservations.lanes.items()
+                                  for start, end, owner in entries],
+            "path_cache": [(key, version, path) for key, (version, path) in self.path_cache.items()],
+            "trip_times": list(self.trip_times),
+            "deadlock_resolution_times": list(self.deadlock_resolution_times),
+        }
+
+    def restore_checkpoint_state(self, state):
+        """
+        Replaces the traffic tables with the ones returned by ``checkpoint_state``. The
+        navigation graph must already be in the checkpoint's state (levels and closures).
+        """
+        self.clock = state["clock"]
+        for name, value in state["counters"].items():
+            setattr(self, name, value)
+        self.occupied_vertices.clear()
+        self.occupied_vertices.update(state["occupied_vertices"])
+        self.occupied_lanes.clear()
+        self.occupied_lanes.update(state["occupied_lanes"])
+        self.wait_for = {robot_id: set(blockers) for robot_id, blockers in state["wait_for"]}
+        self._open_deadlocks = {frozenset(key): detected for key, detected in state["open_deadlocks"]}
+        self._stranded = set(state["stranded"])
+        self._stuck_robots = set(state["stuck"])
+        self._pending_plans = set(state["pending_plans"])
+        self._making_way = {robot_id: (target, asker_idx) for robot_id, target, asker_idx in state["making_way"]}
+        self.reservations.clear()
+        for vertex, start, end, owner in state["vertex_reservations"]:
+            self.reservations.reserve_vertex(vertex, start, end, owner)
+        for lane, start, end, owner in state["lane_reservations"]:
+            self.reservations.reserve_lane(lane, start, end, owner)
+        self.path_cache = OrderedDict((key, (version, path)) for key, version, path in state["path_cache"])
+        self._graph_version = self.nav_graph.version  # The cached paths belong to the restored graph
+        self._goal_distances.clear()
+        self._goal_trees.clear()
+        self.trip_times = list(state["trip_times"])
+        self.deadlock_resolution_times = list(state["deadlock_resolution_times"])
+
+    def start_task(self, robot):
+        """
+        Records the start of a robot's task for trip-time statistics.
+        """
+        robot.task_started_at = self.clock
+        self._stranded.discard(robot.id)
+        self._making_way.pop(robot.id, None)
+
+    def record_task_complete(self, robot):
+        """
+        Records a finished trip and frees the robot's reservations.
+        """
+        if robot.id in self._making_way:
+            del self._making_way[robot.id]
+            robot.schedule = []
+            if robot.goal_idx is None:
+                # A parked robot that made way parks again; it had no trip to record
+                robot.status = "idle"
+                self.park_robot(robot)
+                return
+            if robot.pos_idx != robot.goal_idx:
+                # A stuck robot that made way plans its route from here on the next update
+                robot.status = "waiting"
+                self._pending_plans.add(robot.id)
+                return
+        if robot.pos_idx != robot.goal_idx and (robot.id in self._stranded or robot.id in self._stuck_robots):
+            # A robot left without a route while on a lane only finished that lane: it waits
+            # there until a route opens up
+            robot.status = "waiting"
+            return
+        if robot.task_started_at is not None:
+            self.trip_times.append(self.clock - robot.task_started_at)
+            robot.task_started_at = None
+        robot.schedule = []
+        self._pending_plans.discard(robot.id)
+        self._stuck_robots.discard(robot.id)
+        self.park_robot(robot)
+        self.events.publish(TASK_COMPLETE, self.clock, f"{robot.id} reached vertex {robot.pos_idx}", robot.id,
+                            vertex=robot.pos_idx)
+
+    def park_robot(self, robot):
+        """
+        In reservation mode, a robot without a task blocks its vertex until it is given a new
+        route, so other robots plan around it.
+        """
+        self.reservations.release(robot.id)
+        self.robot_vertices.add(robot.pos_idx)
+        if self.planning_mode == "reservation":
+            self._hold_vertex(robot.id, robot.pos_idx, self.clock)
+
+    def track_robot_vertices(self, robots):
+        """
+        Records the vertices the robots stand on once they have moved (robots parked later
+        are added by ``park_robot``), so a spawn can be checked without a scan of the fleet.
+        """
+        self.robot_vertices = {robot.pos_idx for robot in robots}
+
+    def vertex_claimed(self, vertex):
+        """
+        Checks whether a space-time plan holds the vertex right now (reservation mode), e.g.
+        for a robot on a lane leading to it.
+        """
+        return not self.reservations.vertex_free(vertex, self.clock, self.clock, None)
+
+    def _hold_vertex(self, robot_id, vertex, start_time):
+        """
+        Reserves a vertex indefinitely and asks robots planned through it to replan.
+        """
+        self.reservations.reserve_vertex(vertex, start_time, float('inf'), robot_id)
+        self._pending_plans.update(self.reservations.vertex_owners(vertex, start_time, float('inf'), robot_id))
+
+    def cache_stats(self):
+        """
+        Returns the path cache counters so the cache can be sized.
+        """
+        return {
+            "size": len(self.path_cache),
+            "capacity": self.path_cache_size,
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "evictions": self.cache_evictions,
+            "invalidations": self.cache_invalidations,
+            "occupancy_version": self.occupancy_version,
+        }
+
+    def clear_path_cache(self):
+        """
+        Drops every cached path (e.g. after the navigation graph changes).
+        """
+        self.path_cache.clear()
+
+    def _graph_changed(self):
+        """
+        Drops search results computed before the navigation graph gained a level or a lane
+        closed or opened.
+        """
+        self._graph_version = self.nav_graph.version
+        self.path_cache.clear()
+        self._goal_distances.clear()
+
+    def _set_occupancy(self, vertices, lanes):
+        """
+        Replaces the occupied vertices and lanes, bumping the occupancy version if they changed.
+        """
+        if vertices != self.occupied_vertices or lanes != self.occupied_lanes:
+            self.occupancy_version += 1
+        # Update in place: callers may hold a reference to these sets
+        self.occupied_vertices.clear()
+        self.occupied_vertices.update(vertices)
+        self.occupied_lanes.clear()
+        self.occupied_lanes.update(lanes)
+
+    def _cached_path_valid(self, start_idx, path, uses_occupied_lanes):
+        """
+        Checks whether a cached path still avoids every occupied vertex (and lane, when the
+        query avoided the occupied lanes). Failed searches (None) are never revalidated, since
+        freeing any vertex may have opened a route.
+        """
+        if path is None:
+            return False
+        occupied_vertices = self.occupied_vertices
+        occupied_lanes = self.occupied_lanes
+        previous = start_idx
+        for idx in path:
+            if idx in occupied_vertices:
+                return False
+            if uses_occupied_lanes and self._lane_key(previous, idx) in occupied_lanes:
+                return False
+            previous = idx
+        return True
 
     def find_path(self, start_idx, goal_idx, avoid_vertex=None, avoid_lanes=None):
-        if avoid_lanes is None:
-            avoid_lanes = self.occupied_lanes
-
-        # Heuristic function for A* (Euclidean distance)
-        def heuristic(idx1, idx2):
-            x1, y1 = self.nav_graph.get_vertex_coords(idx1)
-            x2, y2 = self.nav_graph.get_vertex_coords(idx2)
-            return ((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5
-
-        # Priority queue for A*
-        open_set = [(0, start_idx, [start_idx])]
-        heapq.heapify(open_set)
+        """
+        Returns the shortest path from start_idx to goal_idx (excluding the start), or [] if none.
+
+        Results are served from an LRU cache while the occupancy version is unchanged. When the
+        occupancy has changed, a cached path is reused only if none of the vertices or lanes it
+        touches became occupied.
+
+        On multi-level maps, the levels on the way from the start to the goal are loaded first.
+        """
+        if metrics.enabled:
+            metrics.count("path_searches")
+        self.nav_graph.ensure_route_levels(start_idx, goal_idx)
+        if self.nav_graph.version != self._graph_version:
+            self._graph_changed()
+        uses_occupied_lanes = avoid_lanes is None
+        key = (start_idx, goal_idx, avoid_vertex, None if uses_occupied_lanes else frozenset(avoid_lanes))
+
+        cached = self.path_cache.get(key)
+        if cached is not None:
+            version, path = cached
+            if version == self.occupancy_version or self._cached_path_valid(start_idx, path, uses_occupied_lanes):
+                self.path_cache[key] = (self.occupancy_version, path)
+                self.path_cache.move_to_end(key)
+                self.cache_hits += 1
+                return list(path) if path is not None else []
+            del self.path_cache[key]
+            self.cache_invalidations += 1
+
+        self.cache_misses += 1
+        path = self._search_path(start_idx, goal_idx, avoid_vertex, self.occupied_lanes if uses_occupied_lanes else avoid_lanes)
+        if metrics.enabled:
+            metrics.observe("astar_expansions", self.last_search_expansions)
+        # Search results are hot-path DEBUG messages; skip formatting them when disabled
+        if log_enabled(DEBUG):
+            if path is not None:
+                log_action(self.gui, f"Path found from {start_idx} to {goal_idx}: {path}", DEBUG)
+            else:
+                log_action(self.gui, f"No path found from {start_idx} to {goal_idx}", DEBUG)
+
+        if self.path_cache_size > 0:
+            self.path_cache[key] = (self.occupancy_version, tuple(path) if path is not None else None)
+            if len(self.path_cache) > self.path_cache_size:
+                self.path_cache.popitem(last=False)
+                self.cache_evictions += 1
+        return path if path is not None else []
+
+    def _search_path(self, start_idx, goal_idx, avoid_vertex, avoid_lanes):
+        """
+        Runs A* over the neighbor index, skipping occupied vertices and avoided lanes.
+
+        Long queries (straight-line distance of at least ``bidirectional_min_distance``) use
+        the bidirectional search when ``bidirectional`` is enabled.
+
+        :return: Path excluding the start vertex, or None if the goal is unreachable.
+        """
+        if start_idx == goal_idx:
+            self.last_search_expansions = 0
+            return []
+        # Different components can never be joined, whatever the occupancy
+        if not self.nav_graph.connected(start_idx, goal_idx):
+            self.last_search_expansions = 0
+            return None
+        if self.bidirectional and self._heuristic(start_idx, goal_idx) >= self.bidirectional_min_distance:
+            return self._search_bidirectional(start_idx, goal_idx, avoid_vertex, avoid_lanes)
+        return self._search_astar(start_idx, goal_idx, avoid_vertex, avoid_lanes)
+
+    def _heuristic(self, idx1, idx2):
+        """
+        Straight-line distance between two vertices, from the cached coordinate arrays.
+        Divided by ``nav_graph.max_speed`` it is a lower bound on their travel time.
+        """
+        coords_x, coords_y = self.nav_graph.coords_x, self.nav_graph.coords_y
+        dx = coords_x[idx1] - coords_x[idx2]
+        dy = coords_y[idx1] - coords_y[idx2]
+        return (dx * dx + dy * dy) ** 0.5
+
+    def _landmark_bounds(self, goal_idx):
+        """
+        Returns (from_table, to_table, from goal, to goal) tuples for the directed ALT lower
+        bound on the travel time from v to the goal,
+        ``max(from goal - from_table[v], to_table[v] - to goal)``, or an empty list when
+        landmarks are disabled.
+        """
+        if not self.landmarks:
+            return []
+        _, tables = self.nav_graph.landmarks(self.landmarks)
+        return [(from_table, to_table, from_table[goal_idx], to_table[goal_idx]) for from_table, to_table in tables]
+
+    @staticmethod
+    def _reconstruct(parent, node, stop):
+        """
+        Follows parent pointers from node back to stop and returns the visited vertices,
+        ending at node and excluding stop.
+        """
+        path = []
+        while node != stop:
+            path.append(node)
+            node = parent[node]
+        path.reverse()
+        return path
+
+    def _search_astar(self, start_idx, goal_idx, avoid_vertex, avoid_lanes, occupied_vertices=None):
+        # Cached coordinates for the heuristic: straight-line distance at the top speed
+        coords_x, coords_y = self.nav_graph.coords_x, self.nav_graph.coords_y
+        goal_x, goal_y = coords_x[goal_idx], coords_y[goal_idx]
+        inverse_speed = 1.0 / self.nav_graph.max_speed
+
+        # Landmark lower bounds; the heuristic is the larger of these and the straight line
+        bounds = self._landmark_bounds(goal_idx)
+
+        # Neighbor index precomputed by the navigation graph
+        offsets = self.nav_graph.adj_offsets
+        targets = self.nav_graph.adj_targets
+        costs = self.nav_graph.adj_costs
+        if occupied_vertices is None:
+            occupied_vertices = self.occupied_vertices
+
+        # Heap entries are (f, vertex, g); the path is rebuilt from parent pointers at the end
+        open_set = [(0, start_idx, 0)]
         g_score = {start_idx: 0}
-        f_score = {start_idx: heuristic(start_idx, goal_idx)}
-        came_from = {}
+        parent = {}
+        expansions = 0
 
         while open_set:
-            _, current, path = heapq.heappop(open_set)
+            _, current, current_g = heapq.heappop(open_set)
+            if current_g > g_score[current]:
+                continue  # Stale entry left behind by a later, cheaper push
             if current == goal_idx:
-                log_action(self.gui, f"Path found from {start_idx} to {goal_idx}: {path[1:]}")
-                return path[1:]
-
-            for start, end, _ in self.nav_graph.lanes:
-                # Identify neighbors
-                if start == current:
-                    neighbor = end
-                elif end == current:
-                    neighbor = start
-                else:
-                    continue
+                self.last_search_expansions = expansions
+                return self._reconstruct(parent, goal_idx, start_idx)
+            expansions += 1
+
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
 
                 # Avoid conflicts
-                if avoid_vertex == neighbor or neighbor in self.occupied_vertices:
+                if avoid_vertex == neighbor or neighbor in occupied_vertices:
                     continue
 
-                lane = tuple(sorted([current, neighbor]))
+                lane = (current, neighbor) if current < neighbor else (neighbor, current)
                 if lane in avoid_lanes:
                     continue
 
                 # A* Algorithm updates
-                tentative_g_score = g_score[current] + heuristic(current, neighbor)
+                tentative_g_score = current_g + costs[edge]
                 if tentative_g_score < g_score.get(neighbor, float('inf')):
-                    came_from[neighbor] = current
+                    parent[neighbor] = current
                     g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = g_score[neighbor] + heuristic(neighbor, goal_idx)
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor, path + [neighbor]))
+                    dx = coords_x[neighbor] - goal_x
+                    dy = coords_y[neighbor] - goal_y
+                    h = (dx * dx + dy * dy) ** 0.5 * inverse_speed
+                    for from_table, to_table, from_goal, to_goal in bounds:
+                        bound = from_goal - from_table[neighbor]
+                        if bound > h:
+                            h = bound
+                        bound = to_table[neighbor] - to_goal
+                        if bound > h:
+                            h = bound
+                    heapq.heappush(open_set, (tentative_g_score + h, neighbor, tentative_g_score))
 
-        log_action(self.gui, f"No path found from {start_idx} to {goal_idx}")
-        return []
+        self.last_search_expansions = expansions
+        return None
 
+    def _search_bidirectional(self, start_idx, goal_idx, avoid_vertex, avoid_lanes):
+        """
+        Bidirectional A* with the average potential p(v) = (h_goal(v) - h_start(v)) / 2, which
+        keeps both searches consistent. The reverse search follows lanes backwards (in-edges). The search stops once the two frontier minimums add up
+        to at least the best meeting cost found so far.
+        """
+        occupied_vertices = self.occupied_vertices
+        # The reverse search starts at the goal, so reject a goal the forward search could not enter
+        if goal_idx == avoid_vertex or goal_idx in occupied_vertices:
+            self.last_search_expansions = 0
+            return None
 
-    def update_traffic(self, robots):
-    # Reset occupied lanes and vertices
-        self.occupied_lanes.clear()
-        self.occupied_vertices.clear()
+        coords_x, coords_y = self.nav_graph.coords_x, self.nav_graph.coords_y
+        sx, sy = coords_x[start_idx], coords_y[start_idx]
+        tx, ty = coords_x[goal_idx], coords_y[goal_idx]
+
+        inverse_speed = 1.0 / self.nav_graph.max_speed
+        goal_bounds = self._landmark_bounds(goal_idx)
+        start_bounds = [(from_table, to_table, from_table[start_idx], to_table[start_idx])
+                        for from_table, to_table, _, _ in goal_bounds]
+
+        def potential(idx):
+            x, y = coords_x[idx], coords_y[idx]
+            # Lower bounds on the travel time from idx to the goal and from the start to idx
+            to_goal = ((x - tx) ** 2 + (y - ty) ** 2) ** 0.5 * inverse_speed
+            to_start = ((x - sx) ** 2 + (y - sy) ** 2) ** 0.5 * inverse_speed
+            for from_table, to_table, from_goal, to_goal_time in goal_bounds:
+                to_goal = max(to_goal, from_goal - from_table[idx], to_table[idx] - to_goal_time)
+            for from_table, to_table, from_start, to_start_time in start_bounds:
+                to_start = max(to_start, from_table[idx] - from_start, to_start_time - to_table[idx])
+            return (to_goal - to_start) / 2
+
+        # Index 0 walks lanes forwards (out-edges), 1 backwards (in-edges)
+        indexes = ((self.nav_graph.adj_offsets, self.nav_graph.adj_targets, self.nav_graph.adj_costs),
+                   (self.nav_graph.rev_offsets, self.nav_graph.rev_targets, self.nav_graph.rev_costs))
+
+        # Index 0 is the forward search (from start), 1 the reverse search (from goal)
+        g_scores = ({start_idx: 0}, {goal_idx: 0})
+        parents = ({}, {})
+        heaps = ([(potential(start_idx), start_idx, 0)], [(-potential(goal_idx), goal_idx, 0)])
+        signs = (1, -1)
+        best_cost = float('inf')
+        meeting = None
+        expansions = 0
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best_cost:
+                break
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            _, current, current_g = heapq.heappop(heaps[side])
+            g_score, other_g = g_scores[side], g_scores[1 - side]
+            if current_g > g_score[current]:
+                continue  # Stale entry
+            expansions += 1
+            sign = signs[side]
+            # Only the real endpoints may be occupied: the reverse search may step onto the robot's
+            # own start vertex (the forward search starts there and never enters it)
+            origin = start_idx if side == 1 else None
+            offsets, targets, costs = indexes[side]
+
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
+                if neighbor != origin and (avoid_vertex == neighbor or neighbor in occupied_vertices):
+                    continue
+                lane = (current, neighbor) if current < neighbor else (neighbor, current)
+                if lane in avoid_lanes:
+                    continue
+
+                tentative_g_score = current_g + costs[edge]
+                # Every usable edge into the other search's labels is a candidate meeting point
+                if neighbor in other_g and tentative_g_score + other_g[neighbor] < best_cost:
+                    best_cost = tentative_g_score + other_g[neighbor]
+                    meeting = (current, neighbor) if side == 0 else (neighbor, current)
+                if tentative_g_score < g_score.get(neighbor, float('inf')):
+                    parents[side][neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    heapq.heappush(heaps[side], (tentative_g_score + sign * potential(neighbor), neighbor, tentative_g_score))
 
-        # Track currently occupied lanes and vertices
+        self.last_search_expansions = expansions
+        if meeting is None:
+            return None
+        # The meeting edge joins the forward tree (ending at tail) to the reverse tree (at head)
+        tail, head = meeting
+        path = self._reconstruct(parents[0], tail, start_idx)
+        node = head
+        path.append(node)
+        while node != goal_idx:
+            node = parents[1][node]
+            path.append(node)
+        return path
+
+    @staticmethod
+    def _lane_key(idx1, idx2):
+        """
+        Returns the undirected lane key for two vertices without allocating a sorted list.
+        """
+        return (idx1, idx2) if idx1 < idx2 else (idx2, idx1)
+
+    def _build_conflict_index(self, robots):
+        """
+        Builds per-tick hash indexes used by the conflict queries in update_traffic.
+
+        Buckets hold (order, robot) pairs kept sorted by the robot's position in ``robots`` so
+        query results come out in the same order as a full scan would produce them.
+        """
+        self._robot_order = {id(robot): order for order, robot in enumerate(robots)}
+        self._robot_keys = {}
+        self.vertex_robots = {}  # vertex -> robots standing on it
+        self.lane_robots = {}  # undirected lane -> robots whose next move uses it
+        self.next_edge_robots = {}  # (vertex, next vertex) -> robots about to take that edge
+        for robot in robots:
+            self._index_robot(robot)
+
+    def _index_robot(self, robot):
+        order = self._robot_order[id(robot)]
+        keys = [(self.vertex_robots, robot.pos_idx)]
+        if robot.path:
+            next_idx = robot.path[0]
+            keys.append((self.lane_robots, self._lane_key(robot.pos_idx, next_idx)))
+            keys.append((self.next_edge_robots, (robot.pos_idx, next_idx)))
+        for index, key in keys:
+            bucket = index.setdefault(key, [])
+            if not bucket or bucket[-1][0] < order:
+                bucket.append((order, robot))
+            else:
+                bisect.insort(bucket, (order, robot))
+        self._robot_keys[id(robot)] = keys
+
+    def _reindex_robot(self, robot):
+        """
+        Moves a robot to the correct buckets after its position or path changed.
+        """
+        for index, key in self._robot_keys.get(id(robot), ()):
+            bucket = index[key]
+            bucket[:] = [entry for entry in bucket if entry[1] is not robot]
+            if not bucket:
+                del index[key]
+        self._index_robot(robot)
+
+    def update_occupancy(self, robots):
+        """
+        Recomputes the occupied vertices and lanes from the robots' positions: a moving robot
+        that has left its vertex holds its lane and vertex, a moving or waiting one its vertex.
+        """
+        occupied_lanes = set()
+        occupied_vertices = set()
         for robot in robots:
             if robot.status == "moving" and robot.path and robot.progress > 0:
                 next_idx = robot.path[0]
-                lane = tuple(sorted([robot.pos_idx, next_idx]))
-                self.occupied_lanes.add(lane)
-                self.occupied_vertices.add(robot.pos_idx)
+                lane = self._lane_key(robot.pos_idx, next_idx)
+                occupied_lanes.add(lane)
+                occupied_vertices.add(robot.pos_idx)
             elif robot.status in ["moving", "waiting"]:
-                self.occupied_vertices.add(robot.pos_idx)
+                occupied_vertices.add(robot.pos_idx)
+        self._set_occupancy(occupied_vertices, occupied_lanes)
+
+    def update_traffic(self, robots):
+        self.update_occupancy(robots)
+
+        if self.planning_mode == "reservation":
+            self._update_reservations(robots)
+        else:
+            self._resolve_conflicts(robots)
+            self._prune_wait_for()
+        self.track_robot_vertices(robots)
+
+    def _resolve_conflicts(self, robots):
+        """
+        Reactive conflict resolution over the robots, in priority order (stable, so equal
+        priorities keep their order in ``robots``).
+        """
+        # Index robots by vertex, lane and next edge so each conflict query is a dict lookup
+        self._build_conflict_index(robots)
+        self._robot_lookup = {robot.id: robot for robot in robots}
 
         # Sort robots by priority (higher priority moves first)
-        sorted_robots = sorted(robots, key=lambda r: r.priority, reverse=True)
-        
-        for robot in sorted_robots:
-            if robot.status == "moving" and robot.path:
-                next_idx = robot.path[0]
-                lane = tuple(sorted([robot.pos_idx, next_idx]))
-                
-                # Check for robots meeting at the same vertex or lane
-                meeting_robots = [
-                    r for r in robots
-                    if r != robot and r.status == "moving" and r.path and (
-                        (r.pos_idx == next_idx and r.path[0] == robot.pos_idx) or  # Head-on collision
-                        (tuple(sorted([r.pos_idx, r.path[0]])) == lane)  # Same lane conflict
-                    )
-                ]
-                
-                if meeting_robots:
-                    # Both robots enter waiting state
+        for robot in sorted(robots, key=lambda r: r.priority, reverse=True):
+            self._resolve_robot(robot)
+
+    def _resolve_robot(self, robot):
+        """
+        Moves one robot on, or makes it wait or reroute, given the robots around it.
+        """
+        if robot.status == "moving" and robot.path:
+            next_idx = robot.path[0]
+            lane = self._lane_key(robot.pos_idx, next_idx)
+
+            # Check for robots meeting at the same vertex or lane
+            meeting_robots = self._meeting_robots(robot, lane)
+
+            if meeting_robots:
+                # Both robots enter waiting state
+                robot.status = "waiting"
+                self._wait_for(robot, meeting_robots)
+                for other_robot in meeting_robots:
+                    other_robot.status = "waiting"
+                    # Only a robot coming the other way is held up by this one
+                    if other_robot.path and other_robot.path[0] == robot.pos_idx:
+                        self._wait_for(other_robot, [robot])
+                log_action(self.gui, f"{robot.id} (P:{robot.priority}) and {meeting_robots[0].id} (P:{meeting_robots[0].priority}) waiting due to meeting")
+                return
+
+            # Handle same-vertex conflicts (existing logic)
+            same_vertex_competitors = self._same_edge_robots(robot, next_idx)
+            if same_vertex_competitors:
+                highest_priority = max(same_vertex_competitors + [robot], key=lambda r: r.priority)
+                if robot != highest_priority:
                     robot.status = "waiting"
-                    self.waiting_cooldown[robot.id] = self.waiting_cooldown.get(robot.id, 0) + 1
-                    for other_robot in meeting_robots:
-                        other_robot.status = "waiting"
-                        self.waiting_cooldown[other_robot.id] = self.waiting_cooldown.get(other_robot.id, 0) + 1
-                    log_action(self.gui, f"{robot.id} (P:{robot.priority}) and {meeting_robots[0].id} (P:{meeting_robots[0].priority}) waiting due to meeting")
-                    continue
+                    self._wait_for(robot, [highest_priority])
+                    log_action(self.gui, f"{robot.id} waiting for {highest_priority.id} to move (same vertex)")
+                    return
 
-                # Handle same-vertex conflicts (existing logic)
-                same_vertex_competitors = [
-                    r for r in robots
-                    if r != robot and r.pos_idx == robot.pos_idx and r.path and r.path[0] == next_idx
-                ]
-                if same_vertex_competitors:
-                    highest_priority = max(same_vertex_competitors + [robot], key=lambda r: r.priority)
-                    if robot != highest_priority:
-                        robot.status = "waiting"
-                        self.waiting_cooldown[robot.id] = self.waiting_cooldown.get(robot.id, 0) + 1
-                        log_action(self.gui, f"{robot.id} waiting for {highest_priority.id} to move (same vertex)")
-                        continue
-
-                # Detect blockers (existing logic adapted)
-                blockers = [
-                    r for r in robots
-                    if r != robot and (
-                        (r.status == "moving" and r.path and tuple(sorted([r.pos_idx, r.path[0]])) == lane)
-                        or (r.pos_idx == next_idx and r.status in ["moving", "waiting"])
-                    )
-                ]
-
-                if blockers and robot.progress >= 1:
-                    highest_priority_blocker = max(blockers, key=lambda r: r.priority, default=None)
-                    if highest_priority_blocker.priority > robot.priority:
-                        # Show conflict notification
-                        messagebox.showwarning("Conflict Detected", 
-                                            f"{robot.id} (P:{robot.priority}) blocked by {highest_priority_blocker.id} (P:{highest_priority_blocker.priority})")
-                        # Lower-priority robot finds alternative path
-                        alternative_path = self.find_path(robot.pos_idx, robot.goal_idx, avoid_vertex=next_idx, avoid_lanes=self.occupied_lanes)
-                        if alternative_path:
-                            robot.path = alternative_path
-                            robot.status = "moving"
-                            robot.progress = 0
-                            log_action(self.gui, f"{robot.id} (P:{robot.priority}) rerouted to avoid {highest_priority_blocker.id}")
-                        else:
-                            robot.status = "waiting"
-                            self.waiting_cooldown[robot.id] = self.waiting_cooldown.get(robot.id, 0) + 1
-                            log_action(self.gui, f"{robot.id} (P:{robot.priority}) waiting due to no alternative path")
-                    else:
-                        # Higher-priority robot moves, lower-priority blockers adjust
-                        for blocker in blockers:
-                            messagebox.showwarning("Conflict Detected", 
-                                                f"{blocker.id} (P:{blocker.priority}) blocked by {robot.id} (P:{robot.priority})")
-                            alternative_path = self.find_path(blocker.pos_idx, blocker.goal_idx, avoid_vertex=robot.pos_idx)
-                            if alternative_path:
-                                blocker.path = alternative_path
-                                blocker.status = "moving"
-                                blocker.progress = 0
-                                log_action(self.gui, f"{blocker.id} (P:{blocker.priority}) rerouted for {robot.id}")
-                            else:
-                                blocker.status = "waiting"
-                                self.waiting_cooldown[blocker.id] = self.waiting_cooldown.get(blocker.id, 0) + 1
-                                log_action(self.gui, f"{blocker.id} (P:{blocker.priority}) waiting for {robot.id}")
-                elif robot.progress >= 1:
-                    # No blockers, proceed with movement
-                    robot.previous_pos_idx = robot.pos_idx
-                    robot.pos_idx = robot.path.pop(0)
-                    if not robot.path:
-                        robot.status = "task complete"
-                        log_action(self.gui, f"{robot.id} (P:{robot.priority}) completed task")
-
-            elif robot.status == "waiting" and robot.path:
-                next_idx = robot.path[0]
-                blockers = [r for r in robots if r != robot and r.pos_idx == next_idx]
-                if not blockers or all(r.priority < robot.priority for r in blockers):
-                    # Resolve waiting state for higher-priority robot
-                    robot.status = "moving"
-                    self.waiting_cooldown[robot.id] = 0
-                    log_action(self.gui, f"{robot.id} (P:{robot.priority}) resumed movement")
-                else:
+            # Detect blockers (existing logic adapted)
+            blockers = self._blockers(robot, next_idx, lane)
+
+            if blockers and robot.progress >= 1:
+                highest_priority_blocker = max(blockers, key=lambda r: r.priority, default=None)
+                if highest_priority_blocker.priority > robot.priority:
+                    # Publish the conflict; subscribers (e.g. the GUI event panel) never block the loop
+                    self.events.publish(CONFLICT, self.clock,
+                                        f"{robot.id} (P:{robot.priority}) blocked by {highest_priority_blocker.id} (P:{highest_priority_blocker.priority})",
+                                        robot.id, blocker=highest_priority_blocker.id, vertex=next_idx)
                     # Lower-priority robot finds alternative path
                     alternative_path = self.find_path(robot.pos_idx, robot.goal_idx, avoid_vertex=next_idx, avoid_lanes=self.occupied_lanes)
-                    if alternative_path:
-                        robot.path = alternative_path
+                    if alternative_path and self._reroute(robot, alternative_path):
+                        self.replan_count += 1
                         robot.status = "moving"
-                        robot.progress = 0
-                        log_action(self.gui, f"{robot.id} (P:{robot.priority}) rerouted after waiting")
+                        log_action(self.gui, f"{robot.id} (P:{robot.priority}) rerouted to avoid {highest_priority_blocker.id}")
+                        self.events.publish(REROUTE, self.clock, f"{robot.id} rerouted to avoid {highest_priority_blocker.id}",
+                                            robot.id, path=list(robot.path))
                     else:
-                        self.waiting_cooldown[robot.id] = self.waiting_cooldown.get(robot.id, 0) + 1
+                        robot.status = "waiting"
+                        self._wait_for(robot, blockers)
+                        log_action(self.gui, f"{robot.id} (P:{robot.priority}) waiting due to no alternative path")
+                else:
+                    # Higher-priority robot moves, lower-priority blockers adjust
+                    for blocker in blockers:
+                        self.events.publish(CONFLICT, self.clock,
+                                            f"{blocker.id} (P:{blocker.priority}) blocked by {robot.id} (P:{robot.priority})",
+                                            blocker.id, blocker=robot.id, vertex=robot.pos_idx)
+                        alternative_path = self.find_path(blocker.pos_idx, blocker.goal_idx, avoid_vertex=robot.pos_idx)
+                        if alternative_path and self._reroute(blocker, alternative_path):
+                            self.replan_count += 1
+                            blocker.status = "moving"
+                            log_action(self.gui, f"{blocker.id} (P:{blocker.priority}) rerouted for {robot.id}")
+                            self.events.publish(REROUTE, self.clock, f"{blocker.id} rerouted for {robot.id}",
+                                                blocker.id, path=list(blocker.path))
+                        else:
+                            blocker.status = "waiting"
+                            self._wait_for(blocker, [robot])
+                            log_action(self.gui, f"{blocker.id} (P:{blocker.priority}) waiting for {robot.id}")
+            elif robot.progress >= 1:
+                # No blockers, proceed with movement
+                robot.previous_pos_idx = robot.pos_idx
+                robot.pos_idx = robot.path.pop(0)
+                self._reindex_robot(robot)
+                if not robot.path:
+                    robot.status = "task complete"
+                    self.record_task_complete(robot)
+                    log_action(self.gui, f"{robot.id} (P:{robot.priority}) completed task")
 
-        # Handle deadlock (existing logic)
-        for robot in robots:
-            if robot.status == "waiting" and self.waiting_cooldown.get(robot.id, 0) >= 3:
-                adjacent_vertices = [
-                    end for start, end, _ in self.nav_graph.lanes
-                    if start == robot.pos_idx and end not in self.occupied_vertices
-                ]
-                if adjacent_vertices:
-                    random_vertex = random.choice(adjacent_vertices)
-                    robot.path = [random_vertex] + self.find_path(random_vertex, robot.goal_idx)
-                    robot.pos_idx = random_vertex
+        elif robot.status == "waiting" and robot.path:
+            next_idx = robot.path[0]
+            blockers = self._robots_at(robot, next_idx)
+            if not blockers or all(r.priority < robot.priority for r in blockers):
+                # Resolve waiting state for higher-priority robot
+                robot.status = "moving"
+                self.wait_for.pop(robot.id, None)
+                log_action(self.gui, f"{robot.id} (P:{robot.priority}) resumed movement")
+            else:
+                # Lower-priority robot finds alternative path
+                alternative_path = self.find_path(robot.pos_idx, robot.goal_idx, avoid_vertex=next_idx, avoid_lanes=self.occupied_lanes)
+                if alternative_path and self._reroute(robot, alternative_path):
+                    self.replan_count += 1
                     robot.status = "moving"
-                    self.waiting_cooldown[robot.id] = 0
-                    log_action(self.gui, f"{robot.id} (P:{robot.priority}) randomly moved to resolve deadlock")
\ No newline at end of file
+                    log_action(self.gui, f"{robot.id} (P:{robot.priority}) rerouted after waiting")
+                    self.events.publish(REROUTE, self.clock, f"{robot.id} rerouted after waiting",
+                                        robot.id, path=list(robot.path))
+                else:
+                    self._wait_for(robot, blockers)
+
+    def _meeting_robots(self, robot, lane):
+        """
+        Returns the other moving robots whose next move uses the robot's lane (a head-on
+        approach always shares the lane, so the lane bucket covers both).
+        """
+        return [r for _, r in self.lane_robots.get(lane, ()) if r is not robot and r.status == "moving"]
+
+    def _same_edge_robots(self, robot, next_idx):
+        """
+        Returns the other robots on the robot's vertex about to drive to next_idx as well.
+        """
+        return [r for _, r in self.next_edge_robots.get((robot.pos_idx, next_idx), ()) if r is not robot]
+
+    def _blockers(self, robot, next_idx, lane):
+        """
+        Returns the other robots moving on the robot's lane or active on next_idx, in fleet order.
+        """
+        blocker_entries = {
+            order: r for order, r in self.lane_robots.get(lane, ())
+            if r is not robot and r.status == "moving"
+        }
+        for order, r in self.vertex_robots.get(next_idx, ()):
+            if r is not robot and r.status in ["moving", "waiting"]:
+                blocker_entries[order] = r
+        return [blocker_entries[order] for order in sorted(blocker_entries)]
+
+    def _robots_at(self, robot, vertex):
+        """
+        Returns the other robots standing on a vertex, in fleet order.
+        """
+        return [r for _, r in self.vertex_robots.get(vertex, ()) if r is not robot]
+
+    def _wait_for(self, robot, blockers):
+        """
+        Records the robots a waiting robot waits for, replacing its previous wait-for edges.
+        If the new edges close a cycle, the deadlock is resolved immediately; a robot waiting
+        for a parked robot goes around it.
+        """
+        self.wait_for[robot.id] = {blocker.id for blocker in blockers if blocker is not robot}
+        cycle = self._find_cycle(robot.id)
+        if cycle:
+            self._resolve_deadlock(cycle)
+        elif any(blocker.status in ("idle", "task complete") for blocker in blockers):
+            # A parked robot never frees its vertex, so waiting for it can only end by going around
+            if self._yield(robot):
+                log_action(self.gui, f"{robot.id} (P:{robot.priority}) rerouted around a parked robot")
+                self.events.publish(REROUTE, self.clock, f"{robot.id} rerouted around a parked robot",
+                                    robot.id, path=list(robot.path))
+
+    def _is_waiting(self, robot_id):
+        robot = self._robot_lookup.get(robot_id)
+        return robot is not None and robot.status == "waiting" and robot_id in self.wait_for
+
+    def _find_cycle(self, start_id):
+        """
+        Looks for a wait-for cycle through ``start_id`` (only edges just added can close one).
+
+        :return: Robot ids along the cycle starting at start_id, or None.
+        """
+        parent = {start_id: None}
+        stack = [start_id]
+        while stack:
+            current = stack.pop()
+            for blocker_id in sorted(self.wait_for.get(current, ())):
+                if blocker_id == start_id:
+                    cycle = []
+                    while current is not None:
+                        cycle.append(current)
+                        current = parent[current]
+                    cycle.reverse()
+                    return cycle
+                if blocker_id not in parent and self._is_waiting(blocker_id):
+                    parent[blocker_id] = current
+                    stack.append(blocker_id)
+        return None
+
+    def _resolve_deadlock(self, cycle):
+        """
+        Breaks a wait-for cycle with a single yield: robots try, from the lowest priority up
+        (ties by id), to reroute around their blocked vertex or to back off onto a free
+        neighbor. Robots standing on a vertex are asked before robots partway along a lane,
+        which can only yield by turning back. The first one that can yield does; the rest
+        keep their routes.
+        """
+        key = frozenset(cycle)
+        new = key not in self._open_deadlocks
+        if new:
+            self.deadlock_count += 1
+            self._open_deadlocks[key] = self.clock
+        members = sorted((self._robot_lookup[robot_id] for robot_id in cycle),
+                         key=lambda r: (r.progress > 0, r.priority, r.id))
+        names = ", ".join(robot_id for robot_id in cycle)
+        for robot in members:
+            if self._yield(robot):
+                log_action(self.gui, f"{robot.id} (P:{robot.priority}) yields to resolve a deadlock among {names}")
+                self.events.publish(DEADLOCK, self.clock, f"Deadlock among {names}: {robot.id} yields",
+                                    robot.id, cycle=list(cycle), path=list(robot.path))
+                return True
+        if new:
+            self.events.publish(DEADLOCK, self.clock, f"Deadlock among {names}: no robot can yield yet",
+                                None, cycle=list(cycle))
+        return False
+
+    def _yield(self, robot):
+        """
+        Gives a blocked robot a route that does not use the vertex it is waiting for: an
+        alternative path, or else a detour over a free neighbor. The route starts where the
+        robot is (see ``_reroute``); nothing is teleported.
+
+        :return: True if the robot got a new route.
+        """
+        if robot.goal_idx is None:
+            return False
+        next_idx = robot.path[0] if robot.path else None
+        path = self.find_path(robot.pos_idx, robot.goal_idx, avoid_vertex=next_idx, avoid_lanes=self.occupied_lanes)
+        if not path:
+            free = sorted(
+                (self._heuristic(neighbor, robot.goal_idx), neighbor)
+                for neighbor, _, _ in self.nav_graph.neighbors(robot.pos_idx)
+                if neighbor != next_idx and neighbor not in self.occupied_vertices
+                and self._lane_key(robot.pos_idx, neighbor) not in self.occupied_lanes
+            )
+            for _, step in free:
+                # Continue on the static route if the current traffic leaves no free one
+                onward = self.find_path(step, robot.goal_idx) or self._search_astar(
+                    step, robot.goal_idx, None, (), occupied_vertices=())
+                if onward or step == robot.goal_idx:
+                    path = [step] + (onward or [])
+                    break
+        if not path or not self._reroute(robot, path):
+            return False
+        robot.status = "moving"
+        self.replan_count += 1
+        self.wait_for.pop(robot.id, None)
+        return True
+
+    def _reroute(self, robot, path):
+        """
+        Replaces a robot's route with ``path``, which starts from ``robot.pos_idx``. A robot
+        partway along a lane stays where it is: it keeps its progress if the new route goes
+        on down the lane, and otherwise turns back on it toward the vertex it left.
+
+        :return: False, leaving the route unchanged, if turning back would need a lane that
+                 does not run (or is closed) the other way.
+        """
+        if robot.progress > 0 and robot.path and path[0] != robot.path[0]:
+            start, next_idx = robot.pos_idx, robot.path[0]
+            if self.nav_graph.travel_time(next_idx, start) is None or self.nav_graph.is_closed(next_idx, start):
+                return False
+            # Same spot, driving the lane the other way
+            robot.pos_idx = next_idx
+            robot.progress = 1 - robot.progress
+            path = [start] + path
+        robot.path = path
+        self._reindex_robot(robot)
+        return True
+
+    def _prune_wait_for(self):
+        """
+        Drops wait-for edges of robots that stopped waiting and closes the deadlocks none of
+        whose robots waits any more, recording how long they took to resolve.
+        """
+        for robot_id in [robot_id for robot_id in self.wait_for if not self._is_waiting(robot_id)]:
+            del self.wait_for[robot_id]
+        for key, detected in list(self._open_deadlocks.items()):
+            if not any(self._is_waiting(robot_id) for robot_id in key):
+                del self._open_deadlocks[key]
+                self.deadlock_resolution_times.append(self.clock - detected)
+
+    def traversal_time(self, idx1, idx2):
+        """
+        Returns the time in seconds a robot needs to drive the lane from idx1 to idx2.
+        """
+        return self.nav_graph.travel_time(idx1, idx2)
+
+    def _distances_to(self, goal_idx, blocked=frozenset()):
+        """
+        Static travel time from every vertex to the goal (reverse Dijkstra), cached per goal and
+        set of blocked vertices. Used as the exact heuristic of the space-time search and to
+        route past its window.
+        """
+        key = (goal_idx, blocked)
+        distances = self._goal_distances.get(key)
+        if distances is not None:
+            return distances
+        if len(self._goal_distances) >= 256:
+            self._goal_distances.clear()
+        if goal_idx in blocked:
+            self._goal_distances[key] = {}
+            return {}
+
+        # Walk lanes backwards so one-way lanes are only used in their driving direction
+        offsets = self.nav_graph.rev_offsets
+        targets = self.nav_graph.rev_targets
+        costs = self.nav_graph.rev_costs
+        distances = {goal_idx: 0.0}
+        heap = [(0.0, goal_idx)]
+        while heap:
+            dist, current = heapq.heappop(heap)
+            if dist > distances[current]:
+                continue
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
+                if neighbor in blocked:
+                    continue
+                candidate = dist + costs[edge]
+                if candidate < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, neighbor))
+        self._goal_distances[key] = distances
+        return distances
+
+    def route_down(self, start_idx, goal_idx, distances):
+        """
+        Returns the path from start_idx to goal_idx (excluding the start) that descends
+        ``distances``, the travel times to the goal from ``NavGraph.travel_times_to``, or []
+        if the goal is unreachable. This is a shortest route, rebuilt without another search.
+        """
+        if distances[start_idx] == float('inf'):
+            return []
+        nav_graph = self.nav_graph
+        offsets, targets, costs = nav_graph.adj_offsets, nav_graph.adj_targets, nav_graph.adj_costs
+        path = []
+        current = start_idx
+        # Zero-cost lanes could make the descent revisit a vertex; a route never needs more steps
+        while current != goal_idx and len(path) < len(distances):
+            best, best_cost = None, float('inf')
+            for edge in range(offsets[current], offsets[current + 1]):
+                candidate = costs[edge] + distances[targets[edge]]
+                if candidate < best_cost:
+                    best, best_cost = targets[edge], candidate
+            if best is None:
+                return []
+            path.append(best)
+            current = best
+        return path if current == goal_idx else []
+
+    def route_up(self, start_idx, goal_idx, distances):
+        """
+        Counterpart of ``route_down`` for ``distances``, the travel times from start_idx from
+        ``NavGraph.travel_times_from``: the path is traced back from the goal.
+        """
+        if distances[goal_idx] == float('inf'):
+            return []
+        nav_graph = self.nav_graph
+        offsets, targets, costs = nav_graph.rev_offsets, nav_graph.rev_targets, nav_graph.rev_costs
+        path = []
+        current = goal_idx
+        while current != start_idx and len(path) < len(distances):
+            best, best_cost = None, float('inf')
+            for edge in range(offsets[current], offsets[current + 1]):
+                candidate = distances[targets[edge]] + costs[edge]
+                if candidate < best_cost:
+                    best, best_cost = targets[edge], candidate
+            if best is None:
+                return []
+            path.append(current)
+            current = best
+        path.reverse()
+        return path if current == start_idx else []
+
+    def unblocked_route(self, start_idx, goal_idx, path):
+        """
+        Returns ``path``, a route read off a search of the open map (``route_down`` or
+        ``route_up``), if it avoids every occupied vertex and lane, and otherwise the route
+        ``find_path`` takes around them.
+        """
+        if path and self._cached_path_valid(start_idx, path, True):
+            return path
+        return self.find_path(start_idx, goal_idx)
+
+    def plan_route(self, robot):
+        """
+        Plans a space-time route for a robot toward its goal and reserves it (reservation mode).
+
+        :return: True if the robot received a route, False if it has to wait and retry.
+        """
+        if self.planning_mode != "reservation":
+            return bool(robot.path)
+        return self._plan_robot(robot, replanning=False)
+
+    def replan_time(self, robot):
+        """
+        Returns when the traffic update next refreshes or retries a robot's space-time plan
+        (now, if it is waiting for one), or None if it has none to refresh (or in reactive
+        mode).
+        """
+        if self.planning_mode != "reservation" or (robot.goal_idx is None and robot.id not in self._making_way):
+            return None
+        if robot.id in self._pending_plans:
+            return self.clock
+        if robot.path:
+            return robot.plan_time + self.reservation_window / 2
+        return None
+
+    def _plan_robot(self, robot, replanning=True):
+        now = self.clock
+        robot_id = robot.id
+        was_stuck = robot_id in self._stuck_robots
+        self._pending_plans.discard(robot_id)
+        previous_route = list(robot.path)
+
+        # A robot already on a lane finishes that traversal before the new plan starts
+        prefix_path, prefix_schedule = [], []
+        start_idx, start_time = robot.pos_idx, now
+        in_flight = self._in_flight(robot)
+        if in_flight is not None:
+            _, next_idx, depart, arrive = in_flight
+            prefix_path, prefix_schedule = [next_idx], [depart]
+            start_idx, start_time = next_idx, arrive
+
+        # The search ignores the robot's own reservations, so they are only replaced on success
+        if robot_id in self._making_way:
+            # A robot making way never drives back through the robot it makes way for
+            target, asker_idx = self._making_way[robot_id]
+            plan = self._space_time_search(robot_id, start_idx, start_time, target, frozenset((asker_idx,)))
+        else:
+            plan = self._space_time_search(robot_id, start_idx, start_time, robot.goal_idx)
+        if plan is None and robot_id in self._making_way and in_flight is None:
+            # No way out after all: a parked robot parks again, a stuck one retries its own route
+            del self._making_way[robot_id]
+            if robot.goal_idx is None or robot.goal_idx == start_idx:
+                robot.path, robot.schedule = [], []
+                if robot.goal_idx is None:
+                    robot.status = "idle"
+                    self.park_robot(robot)
+                else:
+                    robot.status = "task complete"
+                    self.record_task_complete(robot)
+                return False
+            plan = self._space_time_search(robot_id, start_idx, start_time, robot.goal_idx)
+        if plan is None:
+            # Stay put until a route frees up: hold the vertex indefinitely and make robots
+            # planned through it route around the stuck robot
+            robot.path, robot.schedule = prefix_path, prefix_schedule
+            if not was_stuck:
+                self.reservations.release(robot_id)
+                if in_flight is not None:
+                    self._reserve_traversal(robot_id, *in_flight)
+                self._hold_vertex(robot_id, start_idx, start_time)
+                log_action(self.gui, f"{robot.id} (P:{robot.priority}) waiting for a free space-time route")
+                self.events.publish(CONFLICT, self.clock, f"{robot.id} (P:{robot.priority}) has no free space-time route",
+                                    robot.id, vertex=start_idx)
+            self._stuck_robots.add(robot_id)
+            self._pending_plans.add(robot_id)
+            if not robot.path:
+                robot.status = "waiting"
+            return False
+
+        self._stuck_robots.discard(robot_id)
+        self.reservations.release(robot_id)
+        if in_flight is not None:
+            self._reserve_traversal(robot_id, *in_flight)
+        path, schedule = plan
+        robot.path = prefix_path + path
+        robot.schedule = prefix_schedule + schedule
+        robot.plan_time = now
+        self._reserve_plan(robot_id, start_idx, start_time, path, schedule)
+        if replanning and previous_route and robot.path != previous_route:
+            self.replan_count += 1
+            self.events.publish(REROUTE, now, f"{robot.id} replanned around reservations", robot_id,
+                                path=list(robot.path))
+        return True
+
+    def repair_routes(self, robots, lanes, opened=False):
+        """
+        Repairs the robots' routes after lanes closed or opened at runtime (see
+        ``NavGraph.close_lane``), replanning as little as possible.
+
+        After a closure, only robots whose remaining route drives one of the lanes are
+        replanned; after an opening, the robots it can help: those cut off by an earlier
+        closure, and those whose goal tree now offers a faster route. A robot already on a
+        lane finishes it first. In reactive mode the new route is read off the goal's
+        GoalTree, which is repaired in place instead of searched again, so every later change
+        reuses it; a robot with no route left waits where it is. In reservation mode the
+        robots get a new space-time plan.
+
+        :param robots: Every robot of the fleet.
+        :param lanes: Directed (from, to) lanes whose passability changed.
+        :param opened: True if the lanes became passable, False if they closed.
+        :return: The robots whose route was replanned.
+        """
+        nav_graph = self.nav_graph
+        # Each change bumps the graph version once; trees older than that missed a change
+        for goal_idx, tree in list(self._goal_trees.items()):
+            if tree.version != nav_graph.version - 1:
+                del self._goal_trees[goal_idx]
+                continue
+            if opened:
+                tree.lanes_opened(lanes)
+            else:
+                tree.lanes_closed(lanes)
+            tree.version = nav_graph.version
+        if nav_graph.version != self._graph_version:
+            self._graph_changed()
+
+        active = [robot for robot in robots if robot.goal_idx is not None and robot.status in ("moving", "waiting")]
+        if not opened:
+            changed = set(lanes)
+            affected = [robot for robot in active if self._route_uses(robot, changed)]
+        elif self.planning_mode == "reservation":
+            affected = [robot for robot in active if robot.id in self._stuck_robots]
+        else:
+            affected = [robot for robot in active if robot.id in self._stranded or self._faster_route(robot)]
+        if not affected:
+            return []
+
+        if self.planning_mode == "reservation":
+            self._pending_plans.update(robot.id for robot in affected)
+            self._update_reservations(robots)
+            return affected
+
+        for robot in sorted(affected, key=lambda r: r.priority, reverse=True):
+            prefix = robot.path[:1] if self._in_flight(robot) is not None else []
+            start_idx = prefix[0] if prefix else robot.pos_idx
+            nav_graph.ensure_route_levels(start_idx, robot.goal_idx)
+            route = self._goal_tree(robot.goal_idx).route(start_idx)
+            self.route_repairs += 1
+            if route is None:
+                robot.path = prefix
+                if not prefix:
+                    robot.status = "waiting"
+                if robot.id not in self._stranded:
+                    self._stranded.add(robot.id)
+                    log_action(self.gui, f"{robot.id} (P:{robot.priority}) cut off from vertex {robot.goal_idx}")
+                    self.events.publish(CONFLICT, self.clock, f"{robot.id} (P:{robot.priority}) has no route to {robot.goal_idx}",
+                                        robot.id, vertex=start_idx)
+                continue
+            robot.path = prefix + route
+            if robot.id in self._stranded:
+                self._stranded.discard(robot.id)
+                robot.status = "moving"
+            self.replan_count += 1
+            log_action(self.gui, f"{robot.id} (P:{robot.priority}) route repaired")
+            self.events.publish(REROUTE, self.clock, f"{robot.id} rerouted after a lane {'opened' if opened else 'closed'}",
+                                robot.id, path=list(robot.path))
+        return affected
+
+    def _goal_tree(self, goal_idx):
+        """
+        Returns the GoalTree of a goal, building it if none is valid for the current graph.
+        """
+        tree = self._goal_trees.get(goal_idx)
+        if tree is not None and tree.version == self.nav_graph.version:
+            self._goal_trees.move_to_end(goal_idx)
+            return tree
+        if len(self._goal_trees) >= 256:
+            self._goal_trees.popitem(last=False)
+        tree = self._goal_trees[goal_idx] = GoalTree(self.nav_graph, goal_idx)
+        return tree
+
+    def _route_uses(self, robot, lanes):
+        """
+        Checks whether the part of a robot's route it is not yet committed to drives one of
+        the given directed lanes.
+        """
+        path = robot.path
+        skip = 1 if path and self._in_flight(robot) is not None else 0
+        previous = path[0] if skip else robot.pos_idx
+        for idx in path[skip:]:
+            if (previous, idx) in lanes:
+                return True
+            previous = idx
+        return False
+
+    def _faster_route(self, robot):
+        """
+        Checks whether the robot's goal tree (if one is kept) beats its remaining route.
+        """
+        tree = self._goal_trees.get(robot.goal_idx)
+        if tree is None or tree.version != self.nav_graph.version or not robot.path:
+            return False
+        skip = 1 if self._in_flight(robot) is not None else 0
+        previous = robot.path[0] if skip else robot.pos_idx
+        remaining = 0.0
+        for idx in robot.path[skip:]:
+            remaining += self.traversal_time(previous, idx) or 0.0
+            previous = idx
+        start_idx = robot.path[0] if skip else robot.pos_idx
+        return tree.distances[start_idx] < remaining - 1e-9
+
+    def _in_flight(self, robot):
+        """
+        Returns the lane traversal a robot is currently committed to as
+        (from, to, depart, arrive), or None if it is standing on a vertex.
+        """
+        if not robot.path:
+            return None
+        if robot.schedule:
+            if robot.schedule[0] > self.clock:
+                return None
+            depart = robot.schedule[0]
+        elif robot.progress > 0:
+            depart = self.clock - robot.progress * self.traversal_time(robot.pos_idx, robot.path[0])
+        else:
+            return None
+        return robot.pos_idx, robot.path[0], depart, depart + self.traversal_time(robot.pos_idx, robot.path[0])
+
+    def _reserve_traversal(self, robot_id, idx1, idx2, depart, arrive):
+        self.reservations.reserve_lane(self._lane_key(idx1, idx2), depart, arrive, robot_id)
+        self.reservations.reserve_vertex(idx1, depart, arrive, robot_id)
+        self.reservations.reserve_vertex(idx2, depart, arrive, robot_id)
+
+    def _reserve_plan(self, robot_id, start_idx, start_time, path, schedule):
+        """
+        Reserves the holds and traversals of a plan that start inside the reservation window.
+        """
+        window_end = self.clock + self.reservation_window
+        current, arrived = start_idx, start_time
+        for next_idx, depart in zip(path, schedule):
+            if arrived > window_end:
+                return
+            # The robot waits where it is until it departs, even if that is past the window
+            self.reservations.reserve_vertex(current, arrived, depart, robot_id)
+            if depart > window_end:
+                return
+            arrive = depart + self.traversal_time(current, next_idx)
+            self._reserve_traversal(robot_id, current, next_idx, depart, arrive)
+            current, arrived = next_idx, arrive
+        if arrived <= window_end:
+            # Keep the goal clear long enough for the robot to settle
+            self.reservations.reserve_vertex(current, arrived, arrived + self.goal_hold_time, robot_id)
+
+    def _space_time_search(self, robot_id, start_idx, start_time, goal_idx, avoid=frozenset()):
+        """
+        Windowed cooperative A* over (vertex, time) states.
+
+        Inside the reservation window, moves and waits must not overlap other robots'
+        reservations; once a state lies beyond the window, the rest of the route follows the
+        static shortest path. The heuristic is the exact static travel time to the goal.
+        The route never passes the ``avoid`` vertices.
+
+        :return: (path, departure times) or None if no conflict-free route was found.
+        """
+        # Parked and stuck robots are static obstacles for the whole route, not just the window
+        reservations = self.reservations
+        distances = self._distances_to(goal_idx, reservations.blocked_vertices(robot_id) | avoid)
+        if start_idx not in distances:
+            return None
+        window_end = self.clock + self.reservation_window
+        wait = self.wait_duration
+        goal_hold = self.goal_hold_time
+        offsets = self.nav_graph.adj_offsets
+        targets = self.nav_graph.adj_targets
+        costs = self.nav_graph.adj_costs
+
+        start_state = (start_idx, round(start_time, 6))
+        open_set = [(start_time + distances[start_idx], start_time, start_idx)]
+        parent = {start_state: None}
+        closed = set()
+        expansions = 0
+        final_state = None
+
+        while open_set and expansions < self.max_plan_expansions:
+            _, time, current = heapq.heappop(open_set)
+            state = (current, round(time, 6))
+            if state in closed:
+                continue
+            closed.add(state)
+            expansions += 1
+
+            if time > window_end or (current == goal_idx and reservations.vertex_free(current, time, time + goal_hold, robot_id)):
+                final_state = state
+                break
+
+            # Wait in place
+            if reservations.vertex_free(current, time, time + wait, robot_id):
+                waited = (current, round(time + wait, 6))
+                if waited not in parent:
+                    parent[waited] = state
+                    heapq.heappush(open_set, (time + wait + distances[current], time + wait, current))
+
+            # Move to a neighbor
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
+                if neighbor not in distances or costs[edge] == float('inf'):
+                    continue
+                arrive = time + costs[edge]
+                if not (reservations.lane_free(self._lane_key(current, neighbor), time, arrive, robot_id)
+                        and reservations.vertex_free(current, time, arrive, robot_id)
+                        and reservations.vertex_free(neighbor, time, arrive, robot_id)):
+                    continue
+                moved = (neighbor, round(arrive, 6))
+                if moved not in parent:
+                    parent[moved] = state
+                    heapq.heappush(open_set, (arrive + distances[neighbor], arrive, neighbor))
+
+        self.last_search_expansions = expansions
+        if final_state is None:
+            return None
+
+        # Rebuild the timed route; waits show up as later departure times
+        states = []
+        state = final_state
+        while state is not None:
+            states.append(state)
+            state = parent[state]
+        states.reverse()
+        path, schedule = [], []
+        for (idx, _), (next_idx, arrive) in zip(states, states[1:]):
+            if next_idx != idx:
+                path.append(next_idx)
+                schedule.append(arrive - self.traversal_time(idx, next_idx))
+
+        # Past the window, continue along the static shortest path without waiting
+        current, time = final_state
+        while current != goal_idx:
+            next_idx = targets[min(
+                (edge for edge in range(offsets[current], offsets[current + 1]) if targets[edge] in distances),
+                key=lambda edge: distances[targets[edge]] + costs[edge],
+            )]
+            path.append(next_idx)
+            schedule.append(time)
+            time += self.traversal_time(current, next_idx)
+            current = next_idx
+        return path, schedule
+
+    def _make_way(self, robot, start_idx, goal_idx, standing, destinations, avoid=frozenset()):
+        """
+        Asks the standing robots that lengthen a robot's route from start_idx to goal_idx to
+        make room before it plans: parked robots, and stuck ones of no higher priority. Each
+        one on the route the robot would take without them is sent away (see ``_send_away``);
+        one that cannot go stays, and the route is looked for around it.
+
+        :param standing: Vertex -> the parked or stuck robot on it; robots sent away are removed.
+        :param destinations: Vertices moving robots are on or headed for, where no robot is sent.
+        :param avoid: Vertices where no robot is sent (the routes of the robots it makes way for).
+        """
+        movable = {vertex: other for vertex, other in standing.items()
+                   if other.status != "waiting" or other.priority <= robot.priority}
+        if not movable:
+            return
+        around = self._distances_to(goal_idx, self.reservations.blocked_vertices(robot.id)).get(start_idx, float('inf'))
+        offsets, targets, costs = self.nav_graph.adj_offsets, self.nav_graph.adj_targets, self.nav_graph.adj_costs
+        while movable:
+            distances = self._distances_to(goal_idx, self.reservations.blocked_vertices(robot.id).difference(movable))
+            if start_idx not in distances or around <= distances[start_idx] + 1e-9:
+                return
+
+            # The route the robot would take if the movable robots were gone
+            current = start_idx
+            route = [current]
+            while current != goal_idx:
+                current = targets[min(
+                    (edge for edge in range(offsets[current], offsets[current + 1]) if targets[edge] in distances),
+                    key=lambda edge: distances[targets[edge]] + costs[edge],
+                )]
+                route.append(current)
+            for vertex in route:
+                blocker = movable.pop(vertex, None)
+                # Skip robots sent away meanwhile (or being sent away) for another robot
+                if standing.get(vertex) is blocker is not None and not self._send_away(
+                        blocker, robot, start_idx, avoid.union(route), standing, destinations):
+                    break
+            else:
+                return
+
+    def _send_away(self, robot, asker, asker_idx, avoid, standing, destinations):
+        """
+        Moves a standing robot out of the way of another robot (the asker, about to plan from
+        asker_idx) to the nearest free vertex not in ``avoid`` or ``destinations`` (or, if
+        closer, to one a standing robot can leave), without passing the asker. Robots standing
+        on the way are asked to make way in turn. A parked robot parks again where it arrives,
+        a stuck one plans its route from there; until then, the route is refreshed like a
+        route to a goal.
+
+        :return: True if the robot was given the move.
+        """
+        now = self.clock
+        start_idx = robot.pos_idx
+        del standing[start_idx]
+        barrier = {asker.pos_idx, asker_idx}
+        for target in self._free_vertices_near(robot, avoid.union(destinations), standing, barrier):
+            self._make_way(robot, start_idx, target, standing, destinations, avoid)
+            plan = self._space_time_search(robot.id, start_idx, now, target, frozenset(barrier))
+            if plan:
+                break
+        else:
+            standing[start_idx] = robot
+            return False
+        if robot.status != "waiting":
+            robot.goal_idx = None  # A parked robot has no task to go back to
+        self.reservations.release(robot.id)
+        self._pending_plans.discard(robot.id)
+        self._stuck_robots.discard(robot.id)
+        self._making_way[robot.id] = (target, asker_idx)
+        destinations.add(target)
+        robot.path, robot.schedule = plan
+        robot.plan_time = now
+        robot.status = "waiting"
+        self._reserve_plan(robot.id, start_idx, now, *plan)
+        log_action(self.gui, f"{robot.id} (P:{robot.priority}) makes way for {asker.id} at vertex {target}")
+        self.events.publish(REROUTE, now, f"{robot.id} makes way for {asker.id}", robot.id, path=list(robot.path))
+        return True
+
+    def _free_vertices_near(self, robot, avoid, standing, barrier):
+        """
+        Returns the vertices a standing robot can be sent to, in the order ``_send_away``
+        tries them: the closest free vertex (in travel time) and the closest vertex a robot
+        in ``standing`` stands on, if it is closer. Neither is in ``avoid``, and the way there
+        may pass the robots in ``standing`` but not the ``barrier`` vertices.
+        """
+        blocked = self.reservations.blocked_vertices(robot.id).union(barrier)
+        offsets, targets, costs = self.nav_graph.adj_offsets, self.nav_graph.adj_targets, self.nav_graph.adj_costs
+        distances = {robot.pos_idx: 0.0}
+        heap = [(0.0, robot.pos_idx)]
+        candidates = []
+        while heap:
+            dist, current = heapq.heappop(heap)
+            if dist > distances[current]:
+                continue
+            if current not in avoid:
+                if current not in blocked:
+                    return [current] + candidates
+                if not candidates:
+                    candidates.append(current)
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
+                candidate = dist + costs[edge]
+                passable = neighbor not in blocked or neighbor in standing and neighbor not in barrier
+                if passable and candidate < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, neighbor))
+        return candidates
+
+    def _update_reservations(self, robots):
+        """
+        Reservation-mode traffic update: refreshes plans whose window is running out (and
+        retries robots without a plan) in priority order, then syncs robot statuses.
+        """
+        now = self.clock
+        self.reservations.prune(now)
+        refresh_after = self.reservation_window / 2
+        due = [
+            robot for robot in robots
+            if (robot.goal_idx is not None or robot.id in self._making_way) and robot.status in ["moving", "waiting"] and (
+                robot.id in self._pending_plans or (robot.path and now >= robot.plan_time + refresh_after)
+            )
+        ]
+        # Release first so higher-priority robots plan without the old routes in the way
+        # (stuck robots keep holding the vertex they physically occupy, and every robot keeps
+        # the lane it is on or, if standing, its vertex for the next wait step)
+        for robot in due:
+            if robot.id not in self._stuck_robots:
+                self.reservations.release(robot.id)
+                in_flight = self._in_flight(robot)
+                if in_flight is not None:
+                    self._reserve_traversal(robot.id, *in_flight)
+                else:
+                    self.reservations.reserve_vertex(robot.pos_idx, now, now + self.wait_duration, robot.id)
+        standing = {robot.pos_idx: robot for robot in robots if robot.status in ["idle", "task complete"]
+                    or (robot.id in self._stuck_robots and not robot.path)}
+        destinations = {robot.goal_idx for robot in robots if robot.status in ["moving", "waiting"]}
+        destinations.update(robot.pos_idx for robot in robots
+                            if robot.status in ["moving", "waiting"] and robot.pos_idx not in standing)
+        destinations.update(target for target, _ in self._making_way.values())
+        making_way = set(self._making_way)
+        for robot in sorted(due, key=lambda r: r.priority, reverse=True):
+            if robot.id in making_way:
+                self._plan_robot(robot)
+            elif robot.id not in self._making_way:  # Not sent away by a robot planned before it
+                if standing.get(robot.pos_idx) is robot:
+                    del standing[robot.pos_idx]
+                if standing:
+                    in_flight = self._in_flight(robot)
+                    start_idx = robot.pos_idx if in_flight is None else in_flight[1]
+                    self._make_way(robot, start_idx, robot.goal_idx, standing, destinations)
+                if not self._plan_robot(robot) and not robot.path:
+                    standing[robot.pos_idx] = robot
+
+        for robot in robots:
+            if robot.schedule and robot.status in ["moving", "waiting"]:
+                robot.status = "moving" if robot.schedule[0] <= now else "waiting"
+
+
+instrument(TrafficManager, "find_path", "find_path_seconds")
+instrument(TrafficManager, "update_traffic", "update_traffic_seconds")
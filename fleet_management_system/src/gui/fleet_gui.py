@@ -1,18 +1,35 @@
 import tkinter as tk
-from tkinter import simpledialog, messagebox
+from tkinter import simpledialog, messagebox, filedialog
+import math
 import os
+import statistics
+import time
 from src.models.nav_graph import NavGraph
-from src.controllers.fleet_manager import FleetManager
+from src.controllers.replay_engine import ReplayEngine
+from src.controllers.simulation_engine import SimulationEngine
 from src.controllers.traffic_manager import TrafficManager
+from src.utils.events import EventBatcher, CONFLICT, DEADLOCK, SPAWN_REJECTED
 from src.utils.helpers import log_action
+from src.utils.metrics import metrics, instrument
+from src.utils.checkpoint import CHECKPOINT_SUFFIX
+from src.utils.trace import TRACE_SUFFIX
+from src.gui.viewport import SpatialGrid, Viewport
 
 class FleetGUI:
-    def __init__(self, root, nav_graph, fleet_manager):
+    # Level of detail, by the on-screen length of a typical lane in pixels
+    LABEL_DETAIL = 40  # Vertex names and robot labels
+    VERTEX_DETAIL = 8  # Vertex markers
+    LANE_DETAIL = 4  # Lanes; below it the map is shown as shaded footprint cells
+    FOOTPRINT_SIZE = 12  # Side of a footprint cell in pixels
+    ROBOT_DETAIL = 12  # Robots drawn one by one; below it they are counted per cluster cell
+    CLUSTER_SIZE = 40  # Side of a robot cluster cell in pixels
+    PICK_RADIUS = 15  # Click tolerance in pixels
+    VIEW_MARGIN = 30  # Pixels beyond the canvas edge still drawn, so panning reveals no gaps
+
+    def __init__(self, root, engine):
         self.root = root
         self.root.title("Fleet Management System")
-        self.nav_graph = nav_graph
-        self.fleet_manager = fleet_manager
-        self.fleet_manager.gui = self
+        self.attach_engine(engine)
 
         self.left_frame = tk.Frame(self.root)
         self.left_frame.pack(side=tk.LEFT, padx=10, pady=10)
@@ -30,6 +47,16 @@ class FleetGUI:
         self.selected_graph = tk.StringVar(value=self.graph_files[0] if self.graph_files else "")
         tk.Label(self.control_frame, text="Select Graph:").pack()
         tk.OptionMenu(self.control_frame, self.selected_graph, *self.graph_files, command=self.load_nav_graph).pack(pady=5)
+        # Planning mode takes effect when the graph is (re)loaded
+        self.planning_mode = tk.StringVar(value=engine.traffic_manager.planning_mode)
+        tk.Label(self.control_frame, text="Traffic Mode:").pack()
+        tk.OptionMenu(self.control_frame, self.planning_mode, *TrafficManager.PLANNING_MODES,
+                      command=lambda _: self.load_nav_graph(self.selected_graph.get())).pack(pady=5)
+        # Level shown on the canvas (multi-level graphs); the options are filled per graph
+        self.selected_level = tk.StringVar(value="")
+        tk.Label(self.control_frame, text="Level:").pack()
+        self.level_menu = tk.OptionMenu(self.control_frame, self.selected_level, "")
+        self.level_menu.pack(pady=5)
         
         self.start_button = tk.Button(self.control_frame, text="Start Simulation", command=self.start_simulation, bg="grey", fg="black", state="normal")
         self.start_button.pack(pady=5)
@@ -37,6 +64,23 @@ class FleetGUI:
         self.stop_button.pack(pady=5)
         self.pause_button = tk.Button(self.control_frame, text="Pause", command=self.toggle_pause, bg="yellow", fg="black")
         self.pause_button.pack(pady=5)
+        self.stats_button = tk.Button(self.control_frame, text="Profiling Stats", command=self.open_stats_panel)
+        self.stats_button.pack(pady=5)
+        self.batch_button = tk.Button(self.control_frame, text="Assign Goals...", command=self.assign_batch)
+        self.batch_button.pack(pady=5)
+        self.record_button = tk.Button(self.control_frame, text="Record Trace", command=self.toggle_trace)
+        self.record_button.pack(pady=5)
+        self.record_button_bg = self.record_button.cget("bg")
+        self.replay_button = tk.Button(self.control_frame, text="Replay Trace...", command=self.open_replay)
+        self.replay_button.pack(pady=5)
+        self.closure_button = tk.Button(self.control_frame, text="Close/Open...", command=self.toggle_closure)
+        self.closure_button.pack(pady=5)
+        self.save_button = tk.Button(self.control_frame, text="Save Checkpoint", command=self.save_checkpoint)
+        self.save_button.pack(pady=5)
+        self.restore_button = tk.Button(self.control_frame, text="Restore Checkpoint...", command=self.restore_checkpoint)
+        self.restore_button.pack(pady=5)
+        self.reset_view_button = tk.Button(self.control_frame, text="Reset View", command=self.reset_view)
+        self.reset_view_button.pack(pady=5)
         
         self.graph_label = tk.Label(self.control_frame, text=f"Current Graph: {self.selected_graph.get()}")
         self.graph_label.pack(pady=10)
@@ -50,6 +94,7 @@ class FleetGUI:
             "-> Higher the value, higher the priority\n"
             "-> Click a robot to select it for movement\n"
             "-> Click a destination node for the selected robot\n"
+            "-> Mouse wheel zooms, right-drag pans the map\n"
             "-> Press the 'Start Simulation' button to begin"
         )
         self.instructions_label = tk.Label(self.instructions_frame, text=instructions_text, justify=tk.LEFT, font=("Arial", 10))
@@ -64,6 +109,17 @@ class FleetGUI:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.log_text.config(yscrollcommand=scrollbar.set)
 
+        # Non-modal event panel fed from the engine's event bus (rate-limited per event type)
+        self.event_frame = tk.Frame(self.right_frame)
+        self.event_frame.pack(fill=tk.BOTH, expand=True)
+        tk.Label(self.event_frame, text="Events:").pack()
+        self.event_list = tk.Listbox(self.event_frame, height=8, width=50)
+        self.event_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        event_scrollbar = tk.Scrollbar(self.event_frame, command=self.event_list.yview)
+        event_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.event_list.config(yscrollcommand=event_scrollbar.set)
+        self.max_event_lines = 200
+
         self.dashboard_frame = tk.Frame(self.right_frame)
         self.dashboard_frame.pack(pady=10)
         self.num_robots_label = tk.Label(self.dashboard_frame, text="Number of robots: 0")
@@ -76,14 +132,46 @@ class FleetGUI:
         self.num_waiting_label.pack()
         self.num_completed_label = tk.Label(self.dashboard_frame, text="Task complete: 0")
         self.num_completed_label.pack()
+        self.traffic_stats_label = tk.Label(self.dashboard_frame, text="Replans: 0 | Avg trip: 0.0 s | Deadlocks: 0")
+        self.traffic_stats_label.pack()
+        self.frame_time_label = tk.Label(self.dashboard_frame, text="Frame: 0.0 ms | Canvas items: 0")
+        self.frame_time_label.pack()
 
         self.running = False
         self.paused = False
         self.selected_robot = None
-        self.nodes = {}
+        self.nodes = {}  # vertex -> layout coordinates (the level fitted to the canvas at zoom 1)
         self.lane_tags = {}
+        self.view = Viewport(self.canvas_width, self.canvas_height)
+        self.node_index = SpatialGrid(1)  # Vertices of the level, over layout coordinates
+        self.lane_index = SpatialGrid(1)  # Lanes of the level, over layout coordinates
+        self.lane_length = 1.0  # Median lane length in layout coordinates, the level-of-detail scale
+        self.visible_vertices = set()
+        self.vertex_robots = {}  # vertex -> {robot id: robot}, for picking
+        self.robot_vertex = {}  # robot id -> vertex it is indexed at
+        self.cluster_items = {}  # cluster cell -> (oval, text) canvas ids
+        self.transition_vertices = set()
+        self.show_labels = True
+        self.drag_start = None
+        self.pending_redraw = None  # after() id of a debounced view redraw
+        self.vertex_items = {}  # vertex -> canvas oval id
+        self.lane_items = {}  # (start, end) -> canvas line id
+        self.robot_items = {}  # robot id -> dict of canvas item ids
+        self.robot_states = {}  # robot id -> state drawn last frame
+        self.drawn_occupied_vertices = set()
+        self.drawn_occupied_lanes = set()
+        self.drawn_graph_version = None  # Graph version whose lane closures are drawn
+        self.frame_time_ms = 0.0  # Exponential moving average of the redraw time
+        self.stats_window = None  # Profiling stats panel, while open
+        self.frame_count = 0
         
         self.canvas.bind("<Button-1>", self.handle_click)
+        self.canvas.bind("<MouseWheel>", lambda event: self.zoom(event, 1.25 if event.delta > 0 else 0.8))
+        self.canvas.bind("<Button-4>", lambda event: self.zoom(event, 1.25))  # X11 wheel
+        self.canvas.bind("<Button-5>", lambda event: self.zoom(event, 0.8))
+        self.canvas.bind("<ButtonPress-3>", self.start_pan)
+        self.canvas.bind("<B3-Motion>", self.drag_pan)
+        self.canvas.bind("<ButtonRelease-3>", self.end_pan)
         if self.selected_graph.get():
             self.load_nav_graph(self.selected_graph.get())
 
@@ -93,16 +181,37 @@ class FleetGUI:
             log_action(self, "No graph file selected")
             return
         try:
-            self.nav_graph = NavGraph(os.path.join("data", graph_file))
-            self.fleet_manager = FleetManager(self.nav_graph, TrafficManager(self.nav_graph, self))
-            self.fleet_manager.gui = self
+            self.attach_engine(SimulationEngine(NavGraph.load(os.path.join("data", graph_file)), planning_mode=self.planning_mode.get()))
             log_action(self, f"Loaded {graph_file}")
         except ValueError as e:
             messagebox.showerror("Error", str(e))
             return
+        self.show_graph(graph_file)
+
+    def show_graph(self, label):
+        """
+        Fills the level menu for the engine's graph and draws its current level.
+        """
+        menu = self.level_menu["menu"]
+        menu.delete(0, tk.END)
+        for level in self.nav_graph.level_names:
+            menu.add_command(label=level, command=lambda level=level: self.draw_level(level))
+        self.graph_label.config(text=f"Current Graph: {label}")
+        self.draw_level(self.nav_graph.level)
+
+    def draw_level(self, level):
+        """
+        Lays out one level of the graph (loading it if needed) fitted to the canvas, indexes
+        its vertices and lanes, and draws the part in view; robots elsewhere are hidden.
+        """
+        self.selected_level.set(level)
+        self.nav_graph.load_level(level)
+        self.vertex_robots = {}
+        self.robot_vertex = {}
+        level_vertices = self.nav_graph.level_vertices(level)
 
-        x_values = [x for x, y, _ in self.nav_graph.vertices]
-        y_values = [y for x, y, _ in self.nav_graph.vertices]
+        x_values = [self.nav_graph.coords_x[i] for i in level_vertices]
+        y_values = [self.nav_graph.coords_y[i] for i in level_vertices]
         min_x, max_x = min(x_values, default=0), max(x_values, default=0)
         min_y, max_y = min(y_values, default=0), max(y_values, default=0)
         graph_width = max_x - min_x or 1
@@ -114,101 +223,373 @@ class FleetGUI:
 
         self.nodes = {}
         self.lane_tags = {}
-        for i, (x, y, _) in enumerate(self.nav_graph.vertices):
-            cx, cy = self.convert_coordinates(x, y, x_offset, y_offset, scale)
-            self.nodes[i] = (cx, cy)
-            color = "red" if self.nav_graph.is_charger(i) else "blue"
-            self.canvas.create_oval(cx-5, cy-5, cx+5, cy+5, fill=color, tags=f"vertex_{i}")
-            self.canvas.create_text(cx, cy-15, text=self.nav_graph.get_vertex_name(i), font=("Arial", 10, "bold"))
+        for i, x, y in zip(level_vertices, x_values, y_values):
+            self.nodes[i] = self.convert_coordinates(x, y, x_offset, y_offset, scale)
+
+        # The layout is fixed per level; zoom and pan only change how it maps to the canvas
+        lengths = []
+        for start, end in self.nav_graph.edges():
+            if start not in self.nodes or end not in self.nodes:
+                continue  # Lane on another level, or a transition leaving this one
+            self.lane_tags[(start, end)] = f"lane_{start}_{end}"
+            (x1, y1), (x2, y2) = self.nodes[start], self.nodes[end]
+            lengths.append(math.hypot(x2 - x1, y2 - y1))
+        self.lane_length = max(statistics.median(lengths), 1.0) if lengths else float(self.canvas_width)
+        self.node_index = SpatialGrid(self.lane_length)
+        for i, (x, y) in self.nodes.items():
+            self.node_index.insert(i, x, y)
+        self.lane_index = SpatialGrid(self.lane_length)
+        for start, end in self.lane_tags:
+            self.lane_index.insert_segment((start, end), *self.nodes[start], *self.nodes[end])
+        self.transition_vertices = {v for start, end, _ in self.nav_graph.transitions for v in (start, end)}
+        self.view.reset()
+        self.redraw_view()
+
+    def redraw_view(self):
+        """
+        Recreates the canvas items for the part of the level in view, at the detail the zoom
+        allows: vertex names, then vertex markers, then single lanes are left out as lanes get
+        too short on screen to show them.
+        """
+        self.pending_redraw = None
+        self.canvas.delete("all")
+        self.vertex_items = {}
+        self.lane_items = {}
+        self.robot_items = {}
+        self.robot_states = {}
+        self.cluster_items = {}
+        self.drawn_occupied_vertices = set()
+        self.drawn_occupied_lanes = set()
+        self.drawn_graph_version = None
+
+        box = self.view.visible_box(self.VIEW_MARGIN)
+        self.visible_vertices = self.node_index.query(*box)
+        detail = self.lane_length * self.view.zoom
+        self.show_labels = detail >= self.LABEL_DETAIL
 
-        for start, end, _ in self.nav_graph.lanes:
-            x1, y1 = self.nodes[start]
-            x2, y2 = self.nodes[end]
-            lane_tag = f"lane_{start}_{end}"
-            self.lane_tags[tuple(sorted([start, end]))] = lane_tag
-            self.canvas.create_line(x1, y1, x2, y2, fill="gray", tags=lane_tag)
+        # Lanes first so vertices, paths and robots are drawn on top of them; these items
+        # live until the view changes and are only restyled afterwards
+        if detail < self.LANE_DETAIL:
+            cells = set()
+            for i in self.visible_vertices:
+                x, y = self.screen_coords(i)
+                cells.add((int(x // self.FOOTPRINT_SIZE), int(y // self.FOOTPRINT_SIZE)))
+            size = self.FOOTPRINT_SIZE
+            for column, row in cells:
+                self.canvas.create_rectangle(column * size, row * size, (column + 1) * size, (row + 1) * size,
+                                             fill="gray85", outline="", tags="lane")
+        for start, end in self.lane_index.query(*box) if detail >= self.LANE_DETAIL else ():
+            x1, y1 = self.screen_coords(start)
+            x2, y2 = self.screen_coords(end)
+            # One-way lanes get an arrowhead in their driving direction
+            forward = self.nav_graph.travel_time(start, end) is not None
+            backward = self.nav_graph.travel_time(end, start) is not None
+            arrow = tk.NONE if forward and backward else (tk.LAST if forward else tk.FIRST)
+            self.lane_items[(start, end)] = self.canvas.create_line(x1, y1, x2, y2, fill="gray", arrow=arrow,
+                                                                    tags=("lane", self.lane_tags[(start, end)]))
+
+        if detail >= self.VERTEX_DETAIL:
+            for i in self.visible_vertices:
+                cx, cy = self.screen_coords(i)
+                color = "red" if self.nav_graph.is_charger(i) else "blue"
+                # Transition vertices (lifts) get a thick outline
+                width = 3 if i in self.transition_vertices else 1
+                self.vertex_items[i] = self.canvas.create_oval(cx-5, cy-5, cx+5, cy+5, fill=color, width=width, tags=("vertex", f"vertex_{i}"))
+                if self.show_labels:
+                    self.canvas.create_text(cx, cy-15, text=self.nav_graph.get_vertex_name(i), font=("Arial", 10, "bold"), tags="vertex_name")
 
-        self.graph_label.config(text=f"Current Graph: {graph_file}")
         self.draw_robots()
 
+    def screen_coords(self, vertex):
+        return self.view.to_screen(*self.nodes[vertex])
+
+    def schedule_redraw(self, delay=150):
+        """
+        Redraws the view once the zooming or panning has settled.
+        """
+        if self.pending_redraw is not None:
+            self.root.after_cancel(self.pending_redraw)
+        self.pending_redraw = self.root.after(delay, self.redraw_view)
+
+    def zoom(self, event, factor):
+        """
+        Zooms around the mouse pointer. The drawn items are scaled at once and redrawn at
+        the new level of detail when the wheel stops.
+        """
+        applied = self.view.zoom_at(event.x, event.y, factor)
+        if applied != 1.0:
+            self.canvas.scale("all", event.x, event.y, applied, applied)
+            self.schedule_redraw()
+
+    def start_pan(self, event):
+        self.drag_start = (event.x, event.y)
+
+    def drag_pan(self, event):
+        if self.drag_start is None:
+            return
+        dx, dy = event.x - self.drag_start[0], event.y - self.drag_start[1]
+        self.drag_start = (event.x, event.y)
+        self.view.pan(dx, dy)
+        self.canvas.move("all", dx, dy)
+
+    def end_pan(self, event):
+        self.drag_pan(event)
+        self.drag_start = None
+        self.schedule_redraw(0)
+
+    def reset_view(self):
+        self.view.reset()
+        self.redraw_view()
+
+    def attach_engine(self, engine):
+        """
+        Makes the GUI an observer of the given simulation engine.
+        """
+        old_engine = getattr(self, "engine", None)
+        if old_engine is not None and old_engine is not engine:
+            old_engine.stop_trace()
+            old_engine.close()
+            old_engine.remove_observer(self)
+            old_engine.events.unsubscribe(self.event_batcher)
+            old_engine.gui = None
+        self.engine = engine
+        self.engine.gui = self
+        self.engine.add_observer(self)
+        if old_engine is not engine:
+            self.event_batcher = engine.events.subscribe(EventBatcher())
+        self.nav_graph = engine.nav_graph
+        self.fleet_manager = engine.fleet_manager
+
+    def on_tick(self, engine):
+        """
+        Observer callback from the simulation engine: refreshes the view.
+        """
+        started = time.perf_counter()
+        self.draw_robots()
+        self.update_dashboard()
+        self.update_frame_time(time.perf_counter() - started)
+        self.update_events()
+
+    def update_frame_time(self, seconds):
+        """
+        Tracks the average redraw time and shows it with the canvas item count.
+        """
+        self.frame_time_ms = 0.9 * self.frame_time_ms + 0.1 * seconds * 1000 if self.frame_count else seconds * 1000
+        self.frame_count += 1
+        if self.frame_count % 10 == 0:
+            self.frame_time_label.config(
+                text=f"Frame: {self.frame_time_ms:.2f} ms | Canvas items: {len(self.canvas.find_all())}")
+
+    def update_events(self):
+        """
+        Moves buffered bus events into the event panel, summarizing rate-limited ones.
+        """
+        events, suppressed = self.event_batcher.drain()
+        if not events and not suppressed:
+            return
+        for event in events:
+            self.event_list.insert(tk.END, f"[{event.time:7.2f}s] {event.type}: {event.message}")
+            if event.type in (CONFLICT, DEADLOCK, SPAWN_REJECTED):
+                self.event_list.itemconfig(tk.END, fg="red")
+        for event_type, count in suppressed.items():
+            self.event_list.insert(tk.END, f"... {count} more {event_type} events suppressed")
+        overflow = self.event_list.size() - self.max_event_lines
+        if overflow > 0:
+            self.event_list.delete(0, overflow - 1)
+        self.event_list.see(tk.END)
+
     def convert_coordinates(self, x, y, x_offset, y_offset, scale):
         return int(x * scale + x_offset), int(y * scale + y_offset)
 
     def handle_click(self, event):
-        x, y = event.x, event.y
-        clicked_vertex = next((idx for idx, (vx, vy) in self.nodes.items() if abs(vx - x) < 15 and abs(vy - y) < 15), None)
-        if clicked_vertex is not None:
-            for robot in self.fleet_manager.robots:
-                rx, ry = self.nodes[robot.pos_idx]
-                if abs(rx - x) < 15 and abs(ry - y) < 15:
-                    self.selected_robot = robot
-                    log_action(self, f"Selected robot {robot.id}")
+        x, y = self.view.to_layout(event.x, event.y)
+        nearby = self.node_index.within(x, y, self.PICK_RADIUS / self.view.zoom)
+        if nearby:
+            clicked_vertex = nearby[0]
+            for vertex in nearby:
+                robots = self.vertex_robots.get(vertex)
+                if robots:
+                    self.selected_robot = next(iter(robots.values()))
+                    log_action(self, f"Selected robot {self.selected_robot.id}")
                     return
             if self.selected_robot is None:
-                robot = self.fleet_manager.spawn_robot(clicked_vertex)
+                # Ask the user for the robot's priority (default is 1 if canceled)
+                priority = simpledialog.askinteger(
+                    "Priority", f"Enter priority for R{self.engine.fleet_manager.robot_count + 1} (1-10):",
+                    minvalue=1, maxvalue=10)
+                robot = self.engine.spawn_robot(clicked_vertex, priority)
                 if robot is None:
+                    self.update_events()
                     return
             else:
-                if self.fleet_manager.assign_task(self.selected_robot, clicked_vertex):
+                if self.engine.assign_task(self.selected_robot, clicked_vertex):
                     if self.running:
                         self.update_simulation()
                 self.selected_robot = None
             self.draw_robots()
 
     def draw_robots(self):
-        self.canvas.delete("robot")
-        self.canvas.delete("path")
+        """
+        Updates the persistent canvas items in place. Vertex and lane styles change only when
+        their occupancy changes, and a robot's items are moved or restyled only when its
+        position, progress, status or path differs from the previous frame. Robots out of
+        view get no items; zoomed out, the robots in view are counted per cluster cell.
+        """
+        traffic_manager = self.fleet_manager.traffic_manager
+        if self.nav_graph.version != self.drawn_graph_version:
+            self.draw_closures()
+        occupied_vertices = traffic_manager.occupied_vertices
+        for i in occupied_vertices ^ self.drawn_occupied_vertices:
+            if i not in self.vertex_items:
+                continue
+            cx, cy = self.screen_coords(i)
+            size = 10 if i in occupied_vertices else 5
+            outline = "red" if i in occupied_vertices else "black"
+            self.canvas.coords(self.vertex_items[i], cx-size, cy-size, cx+size, cy+size)
+            self.canvas.itemconfig(self.vertex_items[i], outline=outline)
+        self.drawn_occupied_vertices = set(occupied_vertices)
+
+        occupied_lanes = traffic_manager.occupied_lanes
+        for lane in occupied_lanes ^ self.drawn_occupied_lanes:
+            if lane in self.lane_items:
+                self.canvas.itemconfig(self.lane_items[lane], fill="red" if lane in occupied_lanes else self._lane_color(lane))
+        self.drawn_occupied_lanes = set(occupied_lanes)
+
+        clustered = self.lane_length * self.view.zoom < self.ROBOT_DETAIL
+        visible_vertices = self.visible_vertices
+        robot_vertex = self.robot_vertex
+        seen = set()
+        active = set()
+        clusters = {}
         for robot in self.fleet_manager.robots:
-            if robot.path:
-                path_coords = []
-                if robot.progress > 0 and robot.status == "moving":
-                    x1, y1 = self.nodes[robot.pos_idx]
-                    x2, y2 = self.nodes[robot.path[0]]
-                    cx = x1 + (x2 - x1) * robot.progress
-                    cy = y1 + (y2 - y1) * robot.progress
-                    path_coords.append((cx, cy))
-                    path_coords.append(self.nodes[robot.path[0]])
-                    for i in range(1, len(robot.path)):
-                        path_coords.append(self.nodes[robot.path[i]])
-                else:
-                    path_coords.append(self.nodes[robot.pos_idx])
-                    for idx in robot.path:
-                        path_coords.append(self.nodes[idx])
-                if len(path_coords) > 1:
-                    self.canvas.create_line([coord for point in path_coords for coord in point], fill=robot.color, width=1, dash=(2, 2), tags="path")
-
-        for i in self.nodes:
-            cx, cy = self.nodes[i]
-            size = 10 if i in self.fleet_manager.traffic_manager.occupied_vertices else 5
-            outline = "red" if i in self.fleet_manager.traffic_manager.occupied_vertices else "black"
+            seen.add(robot.id)
+            if robot_vertex.get(robot.id) != robot.pos_idx:
+                self._index_robot(robot)
+            moving = robot.status == "moving" and robot.progress > 0 and bool(robot.path)
+            if robot.pos_idx not in visible_vertices and not (moving and robot.path[0] in visible_vertices):
+                continue
+            if clustered:
+                x, y = self.screen_coords(robot.pos_idx)
+                cell = (int(x // self.CLUSTER_SIZE), int(y // self.CLUSTER_SIZE))
+                count, sum_x, sum_y = clusters.get(cell, (0, 0.0, 0.0))
+                clusters[cell] = (count + 1, sum_x + x, sum_y + y)
+                continue
+            active.add(robot.id)
+            state = (robot.pos_idx, robot.progress if moving else 0, robot.status, robot.priority, tuple(robot.path))
+            if self.robot_states.get(robot.id) == state:
+                continue
+            self.robot_states[robot.id] = state
+            self._draw_robot(robot, moving)
+
+        for robot_id in [rid for rid in self.robot_items if rid not in active]:
+            for item in self.robot_items.pop(robot_id).values():
+                self.canvas.delete(item)
+            self.robot_states.pop(robot_id, None)
+        for robot_id in [rid for rid in robot_vertex if rid not in seen]:
+            vertex = robot_vertex.pop(robot_id)
+            self.vertex_robots[vertex].pop(robot_id, None)
+        self.draw_clusters(clusters)
+
+    def _index_robot(self, robot):
+        # Picking looks robots up by the vertex they stand on
+        old_vertex = self.robot_vertex.get(robot.id)
+        if old_vertex is not None:
+            self.vertex_robots[old_vertex].pop(robot.id, None)
+        self.robot_vertex[robot.id] = robot.pos_idx
+        self.vertex_robots.setdefault(robot.pos_idx, {})[robot.id] = robot
+
+    def draw_clusters(self, clusters):
+        """
+        Draws one marker with the robot count per cluster cell, at the mean robot position.
+        """
+        for cell in [cell for cell in self.cluster_items if cell not in clusters]:
+            for item in self.cluster_items.pop(cell):
+                self.canvas.delete(item)
+        for cell, (count, sum_x, sum_y) in clusters.items():
+            x, y = sum_x / count, sum_y / count
+            radius = min(6 + 2 * math.log2(count), 16)
+            items = self.cluster_items.get(cell)
+            if items is None:
+                items = (self.canvas.create_oval(0, 0, 0, 0, fill="orange", tags="robot_cluster"),
+                         self.canvas.create_text(0, 0, font=("Arial", 8, "bold"), tags="robot_cluster"))
+                self.cluster_items[cell] = items
+            self.canvas.coords(items[0], x-radius, y-radius, x+radius, y+radius)
+            self.canvas.coords(items[1], x, y)
+            self.canvas.itemconfig(items[1], text=str(count))
+
+    def _lane_color(self, lane):
+        start, end = lane
+        return "orange" if self.nav_graph.is_closed(start, end) or self.nav_graph.is_closed(end, start) else "gray"
+
+    def draw_closures(self):
+        """
+        Restyles the drawn lanes and vertices after lanes closed or opened: closed lanes are
+        dashed orange, disabled vertices gray.
+        """
+        self.drawn_graph_version = self.nav_graph.version
+        occupied_lanes = self.fleet_manager.traffic_manager.occupied_lanes
+        for lane, item in self.lane_items.items():
+            closed = self._lane_color(lane) == "orange"
+            self.canvas.itemconfig(item, dash=(4, 2) if closed else "",
+                                   fill="red" if lane in occupied_lanes else self._lane_color(lane))
+        for i, item in self.vertex_items.items():
             color = "red" if self.nav_graph.is_charger(i) else "blue"
-            self.canvas.create_oval(cx-size, cy-size, cx+size, cy+size, fill=color, outline=outline, tags=f"vertex_{i}")
-            self.canvas.create_text(cx, cy-15, text=self.nav_graph.get_vertex_name(i), font=("Arial", 10, "bold"))
+            self.canvas.itemconfig(item, fill="gray" if i in self.nav_graph.disabled_vertices else color)
 
-        for lane in self.lane_tags:
-            color = "red" if lane in self.fleet_manager.traffic_manager.occupied_lanes else "gray"
-            self.canvas.itemconfig(self.lane_tags[lane], fill=color)
+    def _draw_robot(self, robot, moving):
+        if robot.pos_idx not in self.nodes:
+            # The robot is on a level that is not drawn
+            for item in self.robot_items.get(robot.id, {}).values():
+                self.canvas.itemconfig(item, state="hidden")
+            return
+        moving = moving and robot.path[0] in self.nodes
+        if moving:
+            x1, y1 = self.screen_coords(robot.pos_idx)
+            x2, y2 = self.screen_coords(robot.path[0])
+            x = x1 + (x2 - x1) * robot.progress
+            y = y1 + (y2 - y1) * robot.progress
+        else:
+            x, y = self.screen_coords(robot.pos_idx)
+        status_color = {
+            "idle": robot.color,
+            "moving": "green",
+            "waiting": "red",
+            "task complete": "purple"
+        }.get(robot.status, robot.color)
 
-        for robot in self.fleet_manager.robots:
-            if robot.status == "moving" and robot.progress > 0 and robot.path:
-                current_idx = robot.pos_idx
-                next_idx = robot.path[0]
-                x1, y1 = self.nodes[current_idx]
-                x2, y2 = self.nodes[next_idx]
-                x = x1 + (x2 - x1) * robot.progress
-                y = y1 + (y2 - y1) * robot.progress
-            else:
-                x, y = self.nodes[robot.pos_idx]
-            
-            status_color = {
-                "idle": robot.color,
-                "moving": "green",
-                "waiting": "red",
-                "task complete": "purple"
-            }.get(robot.status, robot.color)
-            self.canvas.create_oval(x-8, y-8, x+8, y+8, fill=status_color, tags="robot")
-            self.canvas.create_text(x, y-25, text=f"{robot.id} (P:{robot.priority})", font=("Arial", 8), tags="robot")
-            self.canvas.create_text(x, y+25, text=robot.status, font=("Arial", 8), tags="robot")
+        # Dashed path from the robot's drawn position through the remaining vertices
+        path_coords = [(x, y)]
+        for idx in robot.path:
+            if idx not in self.nodes:
+                break  # The rest of the path continues on another level
+            path_coords.append(self.screen_coords(idx))
+        flat_path = [coord for point in path_coords for coord in point]
+
+        items = self.robot_items.get(robot.id)
+        if items is None:
+            items = {
+                "path": self.canvas.create_line(0, 0, 0, 0, fill=robot.color, width=1, dash=(2, 2), tags="path"),
+                "body": self.canvas.create_oval(x-8, y-8, x+8, y+8, fill=status_color, tags="robot"),
+                "label": self.canvas.create_text(x, y-25, font=("Arial", 8), tags="robot"),
+                "status": self.canvas.create_text(x, y+25, font=("Arial", 8), tags="robot"),
+            }
+            # Paths stay underneath the vertex markers, as lanes do
+            if self.vertex_items:
+                self.canvas.tag_lower(items["path"], "vertex")
+            self.robot_items[robot.id] = items
+
+        if len(path_coords) > 1:
+            self.canvas.coords(items["path"], *flat_path)
+            self.canvas.itemconfig(items["path"], state="normal")
+        else:
+            self.canvas.itemconfig(items["path"], state="hidden")
+        self.canvas.coords(items["body"], x-8, y-8, x+8, y+8)
+        self.canvas.itemconfig(items["body"], fill=status_color, state="normal")
+        self.canvas.coords(items["label"], x, y-25)
+        label_state = "normal" if self.show_labels else "hidden"
+        self.canvas.itemconfig(items["label"], text=f"{robot.id} (P:{robot.priority})", state=label_state)
+        self.canvas.coords(items["status"], x, y+25)
+        self.canvas.itemconfig(items["status"], text=robot.status, state=label_state)
 
     def start_simulation(self):
         if not self.running:
@@ -227,6 +608,8 @@ class FleetGUI:
             self.start_button.config(state="normal", bg="black")
             self.stop_button.config(state="disabled", bg="grey")
             self.pause_button.config(text="Pause", bg="yellow")
+            if self.engine.trace is not None:
+                self.engine.trace.flush()
             log_action(self, "Simulation stopped")
 
     def toggle_pause(self):
@@ -237,43 +620,213 @@ class FleetGUI:
 
     def update_simulation(self):
         if self.running and not self.paused:
-            for robot in self.fleet_manager.robots:
-                if robot.status == "moving" and robot.path:
-                    robot.progress += 0.02
-                    if robot.progress >= 1:
-                        log_action(self, f"{robot.id} (P:{robot.priority}) moved to {robot.path[0]}")
-                        robot.pos_idx = robot.path.pop(0)
-                        robot.progress = 0
-                        if not robot.path:
-                            robot.status = "task complete"
-
-            self.fleet_manager.traffic_manager.update_traffic(self.fleet_manager.robots)
-            self.draw_robots()
-            self.update_dashboard()
-            self.root.after(50, self.update_simulation)
+            # The engine advances one fixed tick and notifies on_tick to redraw
+            self.engine.step(self.engine.tick_interval)
+            self.root.after(int(self.engine.tick_interval * 1000), self.update_simulation)
+
+    def toggle_trace(self):
+        """
+        Starts or stops recording a fleet trace of the running engine into the logs directory.
+        """
+        if isinstance(self.engine, ReplayEngine):
+            log_action(self, "A replay cannot be recorded")
+            return
+        if self.engine.trace is None:
+            path = os.path.join("logs", time.strftime("trace_%Y%m%d_%H%M%S") + TRACE_SUFFIX)
+            self.engine.start_trace(path)
+            self.record_button.config(text="Stop Recording", bg="red")
+            log_action(self, f"Recording trace to {path}")
+        else:
+            path = self.engine.trace.path
+            self.engine.stop_trace()
+            self.record_button.config(text="Record Trace", bg=self.record_button_bg)
+            log_action(self, f"Trace saved to {path}")
+
+    def open_replay(self):
+        """
+        Replaces the simulation with the playback of a recorded trace; Start, Pause and Stop
+        control the playback. Reloading a graph returns to a live simulation.
+        """
+        path = filedialog.askopenfilename(initialdir="logs", title="Replay Trace",
+                                          filetypes=[("Fleet traces", f"*{TRACE_SUFFIX}"), ("All files", "*")])
+        if not path:
+            return
+        speed = simpledialog.askfloat("Replay Speed", "Simulated seconds per second:", initialvalue=1.0, minvalue=0.01)
+        self.stop_simulation()
+        if self.engine.trace is not None:
+            self.toggle_trace()
+        try:
+            self.attach_engine(ReplayEngine(path, speed=speed or 1.0))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+        log_action(self, f"Replaying {path} at {speed or 1.0}x")
+        self.show_graph(f"replay of {os.path.basename(path)}")
+
+    def save_checkpoint(self):
+        """
+        Saves the running simulation into the logs directory. The file is written in the
+        background; the simulation keeps running.
+        """
+        if isinstance(self.engine, ReplayEngine):
+            log_action(self, "A replay cannot be checkpointed")
+            return
+        path = os.path.join("logs", time.strftime("checkpoint_%Y%m%d_%H%M%S") + CHECKPOINT_SUFFIX)
+        self._watch_checkpoint(self.engine.save_checkpoint(path), path)
+
+    def _watch_checkpoint(self, future, path):
+        # Tk must only be touched from this thread: poll the background write
+        if not future.done():
+            self.root.after(100, self._watch_checkpoint, future, path)
+        elif future.exception() is not None:
+            messagebox.showerror("Error", f"Cannot save {path}: {future.exception()}")
+        else:
+            log_action(self, f"Checkpoint saved to {path}")
+
+    def restore_checkpoint(self, path=None):
+        """
+        Replaces the simulation with one restored from a checkpoint, on the map it was saved
+        on (asks for the file when ``path`` is omitted).
+        """
+        if path is None:
+            path = filedialog.askopenfilename(initialdir="logs", title="Restore Checkpoint",
+                                              filetypes=[("Fleet checkpoints", f"*{CHECKPOINT_SUFFIX}"), ("All files", "*")])
+            if not path:
+                return
+        self.stop_simulation()
+        if self.engine.trace is not None:
+            self.toggle_trace()
+        try:
+            engine = SimulationEngine.from_checkpoint(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.canvas.delete("all")
+        self.attach_engine(engine)
+        self.planning_mode.set(engine.traffic_manager.planning_mode)
+        graph_file = os.path.basename(engine.nav_graph.file_path)
+        if graph_file in self.graph_files:
+            self.selected_graph.set(graph_file)
+        log_action(self, f"Restored {path}")
+        self.show_graph(f"{graph_file} ({os.path.basename(path)})")
+
+    def toggle_closure(self):
+        """
+        Asks for a lane (two vertex indices) or a vertex and closes it, or reopens it if it
+        is closed. Robots whose route used it are rerouted.
+        """
+        text = simpledialog.askstring("Close / Open", "Lane (two vertex indices) or vertex index to close or reopen:")
+        if not text:
+            return
+        try:
+            indices = [int(token) for token in text.replace(",", " ").split()]
+        except ValueError:
+            messagebox.showerror("Error", "Enter one or two vertex indices")
+            return
+        try:
+            if len(indices) == 2:
+                a, b = indices
+                closed = (a, b) in self.nav_graph.closed_lanes or (b, a) in self.nav_graph.closed_lanes
+                repaired = (self.engine.open_lane if closed else self.engine.close_lane)(a, b)
+            elif len(indices) == 1:
+                disabled = indices[0] in self.nav_graph.disabled_vertices
+                repaired = (self.engine.enable_vertex if disabled else self.engine.disable_vertex)(indices[0])
+            else:
+                messagebox.showerror("Error", "Enter one or two vertex indices")
+                return
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if repaired:
+            log_action(self, f"Repaired the routes of {', '.join(robot.id for robot in repaired)}")
+        self.draw_robots()
+
+    def open_stats_panel(self):
+        """
+        Opens the profiling panel: toggles the metrics registry, shows rolling timer and
+        counter summaries (refreshed every second) and exports them to the logs directory.
+        """
+        if self.stats_window is not None:
+            self.stats_window.lift()
+            return
+        self.stats_window = tk.Toplevel(self.root)
+        self.stats_window.title("Profiling Stats")
+        self.stats_window.protocol("WM_DELETE_WINDOW", self.close_stats_panel)
+        self.profiling_enabled = tk.BooleanVar(value=metrics.enabled)
+        tk.Checkbutton(self.stats_window, text="Enable profiling", variable=self.profiling_enabled,
+                       command=lambda: metrics.enable(self.profiling_enabled.get())).pack(anchor=tk.W)
+        self.stats_text = tk.Text(self.stats_window, height=16, width=90, font=("Courier", 9))
+        self.stats_text.pack(fill=tk.BOTH, expand=True)
+        buttons = tk.Frame(self.stats_window)
+        buttons.pack(pady=5)
+        tk.Button(buttons, text="Export Prometheus", command=lambda: self.export_metrics("metrics.prom")).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Export JSON", command=lambda: self.export_metrics("metrics.json")).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Reset", command=metrics.reset).pack(side=tk.LEFT, padx=5)
+        self.refresh_stats_panel()
+
+    def close_stats_panel(self):
+        self.stats_window.destroy()
+        self.stats_window = None
+
+    def refresh_stats_panel(self):
+        if self.stats_window is None:
+            return
+        lines = [f"{'metric':<28}{'count':>9}{'mean':>11}{'p50':>11}{'p99':>11}{'max':>11}"]
+        for name, summary in metrics.snapshot()["histograms"].items():
+            # Durations are shown in milliseconds
+            scale, unit = (1000, " ms") if name.endswith("_seconds") else (1, "")
+            values = "".join(f"{summary[key] * scale:>11.3f}" for key in ("mean", "p50", "p99", "max"))
+            lines.append(f"{name:<28}{summary['count']:>9}{values}{unit}")
+        for name, value in sorted(metrics.counters.items()):
+            lines.append(f"{name + ' (total)':<28}{value:>9}")
+        self.stats_text.delete("1.0", tk.END)
+        self.stats_text.insert(tk.END, "\n".join(lines))
+        self.root.after(1000, self.refresh_stats_panel)
+
+    def export_metrics(self, file_name):
+        path = metrics.dump(os.path.join("logs", file_name))
+        log_action(self, f"Metrics exported to {path}")
 
     def update_dashboard(self):
-        num_robots = len(self.fleet_manager.robots)
-        num_idle = sum(1 for r in self.fleet_manager.robots if r.status == "idle")
-        num_moving = sum(1 for r in self.fleet_manager.robots if r.status == "moving")
-        num_waiting = sum(1 for r in self.fleet_manager.robots if r.status == "waiting")
-        num_completed = sum(1 for r in self.fleet_manager.robots if r.status == "task complete")
-        self.num_robots_label.config(text=f"Number of robots: {num_robots}")
-        self.num_idle_label.config(text=f"Idle: {num_idle}")
-        self.num_moving_label.config(text=f"Moving: {num_moving}")
-        self.num_waiting_label.config(text=f"Waiting: {num_waiting}")
-        self.num_completed_label.config(text=f"Task complete: {num_completed}")
+        counts = self.fleet_manager.status_counts()
+        self.num_robots_label.config(text=f"Number of robots: {len(self.fleet_manager.robots)}")
+        self.num_idle_label.config(text=f"Idle: {counts['idle']}")
+        self.num_moving_label.config(text=f"Moving: {counts['moving']}")
+        self.num_waiting_label.config(text=f"Waiting: {counts['waiting']}")
+        self.num_completed_label.config(text=f"Task complete: {counts['task complete']}")
+        stats = self.fleet_manager.traffic_manager.traffic_stats()
+        self.traffic_stats_label.config(text=f"Replans: {stats['replans']} | Avg trip: {stats['average_trip_time']:.1f} s"
+                                             f" | Deadlocks: {stats['deadlocks']}")
 
     def assign_to_highest(self):
         idle_robots = [r for r in self.fleet_manager.robots if r.status == "idle"]
         if not idle_robots:
             messagebox.showinfo("Info", "No idle robots available")
             return
-        highest_priority_robot = max(idle_robots, key=lambda r: r.priority)
         goal_idx = simpledialog.askinteger("Goal Vertex", "Enter goal vertex index:", minvalue=0, maxvalue=len(self.nav_graph.vertices)-1)
         if goal_idx is not None:
-            self.fleet_manager.assign_task(highest_priority_robot, goal_idx)
+            # The highest-priority idle robot gets the goal; the nearest one among equals
+            self.engine.assign_tasks([goal_idx], idle_robots)
             self.draw_robots()
+
+    def assign_batch(self):
+        """
+        Asks for a list of goal vertices and assigns them to the idle robots in one batch.
+        """
+        text = simpledialog.askstring("Assign Goals", "Goal vertex indices (comma or space separated):")
+        if not text:
+            return
+        try:
+            goals = [int(token) for token in text.replace(",", " ").split()]
+        except ValueError:
+            messagebox.showerror("Error", "Goals must be vertex indices")
+            return
+        invalid = [g for g in goals if not 0 <= g < len(self.nav_graph.vertices)]
+        if invalid:
+            messagebox.showerror("Error", f"Unknown vertices: {invalid}")
+            return
+        self.engine.assign_tasks(goals)
+        self.draw_robots()
     
     def update_gui(self):
         self.canvas.delete("all")
@@ -290,11 +843,12 @@ class FleetGUI:
     def main():
         root = tk.Tk()
         nav_graph = NavGraph("data/nav_graph_1.json")
-        traffic_manager = TrafficManager(nav_graph, None)
-        fleet_manager = FleetManager(nav_graph, traffic_manager)
-        fleet_gui = FleetGUI(root, nav_graph, fleet_manager)
+        fleet_gui = FleetGUI(root, SimulationEngine(nav_graph))
         fleet_gui.update_gui()
         root.mainloop()
 
+instrument(FleetGUI, "draw_robots", "draw_robots_seconds")
+instrument(FleetGUI, "update_simulation", "update_simulation_seconds")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
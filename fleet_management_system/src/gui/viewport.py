@@ -0,0 +1,142 @@
+import math
+
+
+class SpatialGrid:
+    def __init__(self, cell_size):
+        """
+        Uniform grid over 2D layout coordinates, for picking and viewport queries on large maps.
+
+        :param cell_size: Side of a grid cell; about the spacing of the indexed points keeps
+                          a handful of entries per cell.
+        """
+        self.cell_size = float(cell_size)
+        self.cells = {}  # (column, row) -> list of keys
+        self.points = {}  # key -> (x, y) for point entries
+        self.bounds = None  # Occupied (min_column, min_row, max_column, max_row)
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def _add(self, key, c1, r1, c2, r2):
+        for column in range(c1, c2 + 1):
+            for row in range(r1, r2 + 1):
+                self.cells.setdefault((column, row), []).append(key)
+        if self.bounds is None:
+            self.bounds = (c1, r1, c2, r2)
+        else:
+            b = self.bounds
+            self.bounds = (min(b[0], c1), min(b[1], r1), max(b[2], c2), max(b[3], r2))
+
+    def insert(self, key, x, y):
+        """
+        Adds a point entry.
+        """
+        self.points[key] = (x, y)
+        column, row = self._cell(x, y)
+        self._add(key, column, row, column, row)
+
+    def insert_segment(self, key, x1, y1, x2, y2):
+        """
+        Adds a segment entry to every cell its bounding box covers.
+        """
+        c1, r1 = self._cell(min(x1, x2), min(y1, y2))
+        c2, r2 = self._cell(max(x1, x2), max(y1, y2))
+        self._add(key, c1, r1, c2, r2)
+
+    def query(self, x1, y1, x2, y2):
+        """
+        Returns the keys whose cells intersect the box. Point entries are filtered to the
+        box; segments are returned when their bounding box may cross it.
+        """
+        if self.bounds is None:
+            return set()
+        c1, r1 = self._cell(x1, y1)
+        c2, r2 = self._cell(x2, y2)
+        c1, r1 = max(c1, self.bounds[0]), max(r1, self.bounds[1])
+        c2, r2 = min(c2, self.bounds[2]), min(r2, self.bounds[3])
+        if c1 > c2 or r1 > r2:
+            return set()
+        found = set()
+        if (c2 - c1 + 1) * (r2 - r1 + 1) > len(self.cells):
+            # A box covering most of the map: walking the occupied cells is cheaper
+            for (column, row), keys in self.cells.items():
+                if c1 <= column <= c2 and r1 <= row <= r2:
+                    found.update(keys)
+        else:
+            cells = self.cells
+            for column in range(c1, c2 + 1):
+                for row in range(r1, r2 + 1):
+                    keys = cells.get((column, row))
+                    if keys:
+                        found.update(keys)
+        points = self.points
+        return {key for key in found
+                if key not in points or (x1 <= points[key][0] <= x2 and y1 <= points[key][1] <= y2)}
+
+    def within(self, x, y, radius):
+        """
+        Returns the point keys within ``radius`` of (x, y) on both axes, nearest first.
+        """
+        points = self.points
+        hits = [key for key in self.query(x - radius, y - radius, x + radius, y + radius) if key in points]
+        return sorted(hits, key=lambda key: (points[key][0] - x) ** 2 + (points[key][1] - y) ** 2)
+
+    def nearest(self, x, y, radius):
+        """
+        Returns the nearest point key within ``radius`` of (x, y), or None.
+        """
+        hits = self.within(x, y, radius)
+        return hits[0] if hits else None
+
+
+class Viewport:
+    MIN_ZOOM = 0.5
+    MAX_ZOOM = 64.0
+
+    def __init__(self, width, height):
+        """
+        Zoom and pan of the canvas over the layout coordinates (the level fitted to the
+        canvas at zoom 1): screen = layout * zoom + pan.
+
+        :param width: Canvas width in pixels.
+        :param height: Canvas height in pixels.
+        """
+        self.width = width
+        self.height = height
+        self.reset()
+
+    def reset(self):
+        self.zoom = 1.0
+        self.pan_x = 0.0
+        self.pan_y = 0.0
+
+    def to_screen(self, x, y):
+        return x * self.zoom + self.pan_x, y * self.zoom + self.pan_y
+
+    def to_layout(self, sx, sy):
+        return (sx - self.pan_x) / self.zoom, (sy - self.pan_y) / self.zoom
+
+    def zoom_at(self, sx, sy, factor):
+        """
+        Zooms by ``factor`` keeping the layout point under (sx, sy) in place.
+
+        :return: The factor actually applied after clamping to the zoom limits.
+        """
+        zoom = min(max(self.zoom * factor, self.MIN_ZOOM), self.MAX_ZOOM)
+        applied = zoom / self.zoom
+        self.pan_x = sx - (sx - self.pan_x) * applied
+        self.pan_y = sy - (sy - self.pan_y) * applied
+        self.zoom = zoom
+        return applied
+
+    def pan(self, dx, dy):
+        self.pan_x += dx
+        self.pan_y += dy
+
+    def visible_box(self, margin=0):
+        """
+        Returns the layout box (x1, y1, x2, y2) shown on the canvas, grown by ``margin`` pixels.
+        """
+        x1, y1 = self.to_layout(-margin, -margin)
+        x2, y2 = self.to_layout(self.width + margin, self.height + margin)
+        return x1, y1, x2, y2
@@ -0,0 +1,366 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only the array-backed store needs it
+    np = None
+
+# Integer status codes used by the array store (index into STATUS_NAMES)
+STATUS_IDLE = 0
+STATUS_MOVING = 1
+STATUS_WAITING = 2
+STATUS_COMPLETE = 3
+STATUS_NAMES = ("idle", "moving", "waiting", "task complete")
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+NO_VERTEX = -1  # Stored in place of None for previous_pos_idx and goal_idx
+
+# Progress within this of 1 counts as arrived: summing a lane's steps tick by tick and
+# jumping over them at once then arrive on the same tick despite float rounding
+ARRIVAL_TOLERANCE = 1e-9
+
+
+class FleetStore:
+    def __init__(self, capacity=1024, path_capacity=16384):
+        """
+        Struct-of-arrays storage for large fleets.
+
+        Positions, progress, priorities and integer status codes live in NumPy arrays, and all
+        paths share one ragged int buffer: robot ``i`` still has to visit
+        ``path_buffer[path_cursor[i]:path_end[i]]``. Popping the next vertex only advances the
+        cursor. A new path is appended at the tail of the buffer, and dead segments are
+        compacted away when the buffer fills up.
+
+        ``RobotView`` objects returned by ``add_robot`` expose the same attributes as
+        ``Robot``, so existing callers keep working.
+
+        :param capacity: Initial number of robot slots (grows as needed).
+        :param path_capacity: Initial size of the shared path buffer (grows as needed).
+        """
+        if np is None:
+            raise ImportError("FleetStore requires NumPy (pip install numpy)")
+        self.size = 0
+        self.pos = np.zeros(capacity, dtype=np.int32)
+        self.previous_pos = np.full(capacity, NO_VERTEX, dtype=np.int32)
+        self.goal = np.full(capacity, NO_VERTEX, dtype=np.int32)
+        self.progress = np.zeros(capacity, dtype=np.float64)
+        self.priority = np.zeros(capacity, dtype=np.int32)
+        self.status = np.zeros(capacity, dtype=np.int8)
+        self.path_cursor = np.zeros(capacity, dtype=np.int64)
+        # Progress per second on the current lane, valid for the lane rate_from -> rate_to
+        self.rate = np.zeros(capacity, dtype=np.float64)
+        self.rate_from = np.full(capacity, NO_VERTEX, dtype=np.int32)
+        self.rate_to = np.full(capacity, NO_VERTEX, dtype=np.int32)
+        self.path_end = np.zeros(capacity, dtype=np.int64)
+        self.path_buffer = np.zeros(path_capacity, dtype=np.int32)
+        self.path_used = 0  # Buffer slots handed out so far (live or dead)
+
+        # Rarely touched per-robot fields stay in Python lists
+        self.ids = []
+        self.colors = []
+        self.schedules = []
+        self.plan_times = []
+        self.task_started = []
+        self.views = []
+        self.index = {}  # robot id -> slot
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return iter(self.views)
+
+    def __getitem__(self, slot):
+        return self.views[slot]
+
+    def add_robot(self, id, pos_idx, color, priority):
+        """
+        Adds a robot and returns its Robot-compatible view.
+        """
+        if self.size == len(self.pos):
+            self._grow(2 * len(self.pos))
+        slot = self.size
+        self.size += 1
+        self.pos[slot] = pos_idx
+        self.previous_pos[slot] = NO_VERTEX
+        self.goal[slot] = NO_VERTEX
+        self.progress[slot] = 0
+        self.priority[slot] = priority
+        self.status[slot] = STATUS_IDLE
+        self.path_cursor[slot] = self.path_end[slot] = 0
+        self.rate_from[slot] = self.rate_to[slot] = NO_VERTEX
+        self.ids.append(id)
+        self.colors.append(color)
+        self.schedules.append([])
+        self.plan_times.append(0.0)
+        self.task_started.append(None)
+        view = RobotView(self, slot)
+        self.views.append(view)
+        self.index[id] = slot
+        return view
+
+    def _grow(self, capacity):
+        for name in ("pos", "previous_pos", "goal", "progress", "priority", "status", "path_cursor", "path_end",
+                     "rate", "rate_from", "rate_to"):
+            old = getattr(self, name)
+            new = np.full(capacity, NO_VERTEX if name in ("previous_pos", "goal", "rate_from", "rate_to") else 0,
+                          dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def path_length(self, slot):
+        return int(self.path_end[slot] - self.path_cursor[slot])
+
+    def get_path(self, slot):
+        """
+        Returns the remaining path of a robot as a list of vertex indices.
+        """
+        return self.path_buffer[self.path_cursor[slot]:self.path_end[slot]].tolist()
+
+    def set_path(self, slot, path):
+        """
+        Replaces a robot's remaining path. The old segment becomes dead space.
+        """
+        length = len(path)
+        if self.path_used + length > len(self.path_buffer):
+            self._compact(length)
+        start = self.path_used
+        if length:
+            self.path_buffer[start:start + length] = path
+        self.path_cursor[slot] = start
+        self.path_end[slot] = start + length
+        self.path_used = start + length
+
+    def _compact(self, extra):
+        """
+        Copies the live path segments to the front of a (possibly larger) buffer.
+        """
+        n = self.size
+        cursor = self.path_cursor[:n]
+        lengths = self.path_end[:n] - cursor
+        live = int(lengths.sum())
+        capacity = len(self.path_buffer)
+        while live + extra > capacity // 2:
+            capacity *= 2
+        new_start = np.cumsum(lengths) - lengths
+        # Source index of every live element: its segment's cursor plus its offset in the segment
+        source = np.repeat(cursor - new_start, lengths) + np.arange(live)
+        buffer = np.zeros(capacity, dtype=np.int32)
+        buffer[:live] = self.path_buffer[source]
+        self.path_buffer = buffer
+        self.path_cursor[:n] = new_start
+        self.path_end[:n] = new_start + lengths
+        self.path_used = live
+
+    def advance(self, dt, lane_time):
+        """
+        Moves every robot that is moving along its path by ``dt`` seconds (vectorized).
+
+        A robot's progress rate is ``1 / lane_time(pos, next vertex)``. Rates are cached per
+        robot and only looked up again (in Python) for robots that started a new lane.
+        Robots that reach their next vertex pop it from their path. Robots whose path becomes
+        empty are set to "task complete".
+
+        :param dt: Elapsed seconds.
+        :param lane_time: Callable (from, to) -> seconds to drive that lane (0 arrives at once).
+        :return: Tuple (slots that arrived at a vertex, boolean mask of slots that completed).
+        """
+        n = self.size
+        status = self.status[:n]
+        cursor = self.path_cursor[:n]
+        end = self.path_end[:n]
+        progress = self.progress[:n]
+        moving = (status == STATUS_MOVING) & (cursor < end)
+        slots = np.flatnonzero(moving)
+        pos = self.pos[slots]
+        next_pos = self.path_buffer[cursor[slots]]
+        stale = slots[(self.rate_from[slots] != pos) | (self.rate_to[slots] != next_pos)]
+        if stale.size:
+            rate = self.rate
+            for slot, start, target in zip(stale.tolist(), self.pos[stale].tolist(),
+                                           self.path_buffer[cursor[stale]].tolist()):
+                seconds = lane_time(start, target)
+                rate[slot] = 1.0 / seconds if seconds else np.inf
+            self.rate_from[stale] = self.pos[stale]
+            self.rate_to[stale] = self.path_buffer[cursor[stale]]
+        progress[slots] += dt * self.rate[slots]
+        arrived = np.flatnonzero(moving & (progress >= 1 - ARRIVAL_TOLERANCE))
+        if arrived.size:
+            self.previous_pos[arrived] = self.pos[arrived]
+            self.pos[arrived] = self.path_buffer[cursor[arrived]]
+            cursor[arrived] += 1
+            progress[arrived] = 0
+        completed = np.zeros(n, dtype=bool)
+        completed[arrived] = cursor[arrived] == end[arrived]
+        status[completed] = STATUS_COMPLETE
+        return arrived, completed
+
+    def status_counts(self):
+        """
+        Returns the number of robots per status name.
+        """
+        counts = np.bincount(self.status[:self.size], minlength=len(STATUS_NAMES))
+        return {name: int(counts[code]) for code, name in enumerate(STATUS_NAMES)}
+
+
+class PathView:
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store, slot):
+        """
+        List-like view of a robot's remaining path inside the shared path buffer.
+        ``pop(0)`` advances the cursor instead of shifting a list.
+        """
+        self.store = store
+        self.slot = slot
+
+    def __len__(self):
+        return self.store.path_length(self.slot)
+
+    def __iter__(self):
+        return iter(self.store.get_path(self.slot))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.store.get_path(self.slot)[index]
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("path index out of range")
+        return int(self.store.path_buffer[self.store.path_cursor[self.slot] + index])
+
+    def pop(self, index=-1):
+        store, slot = self.store, self.slot
+        length = len(self)
+        if not length:
+            raise IndexError("pop from empty path")
+        if index == 0 or index == -length:
+            value = int(store.path_buffer[store.path_cursor[slot]])
+            store.path_cursor[slot] += 1
+            return value
+        if index == -1 or index == length - 1:
+            store.path_end[slot] -= 1
+            return int(store.path_buffer[store.path_end[slot]])
+        path = store.get_path(slot)
+        value = path.pop(index)
+        store.set_path(slot, path)
+        return value
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class RobotView:
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store, slot):
+        """
+        Robot-compatible accessor for one slot of a FleetStore.
+        """
+        self.store = store
+        self.slot = slot
+
+    @property
+    def id(self):
+        return self.store.ids[self.slot]
+
+    @property
+    def color(self):
+        return self.store.colors[self.slot]
+
+    @color.setter
+    def color(self, value):
+        self.store.colors[self.slot] = value
+
+    @property
+    def pos_idx(self):
+        return int(self.store.pos[self.slot])
+
+    @pos_idx.setter
+    def pos_idx(self, value):
+        self.store.pos[self.slot] = value
+
+    @property
+    def previous_pos_idx(self):
+        value = int(self.store.previous_pos[self.slot])
+        return None if value == NO_VERTEX else value
+
+    @previous_pos_idx.setter
+    def previous_pos_idx(self, value):
+        self.store.previous_pos[self.slot] = NO_VERTEX if value is None else value
+
+    @property
+    def goal_idx(self):
+        value = int(self.store.goal[self.slot])
+        return None if value == NO_VERTEX else value
+
+    @goal_idx.setter
+    def goal_idx(self, value):
+        self.store.goal[self.slot] = NO_VERTEX if value is None else value
+
+    @property
+    def path(self):
+        return PathView(self.store, self.slot)
+
+    @path.setter
+    def path(self, value):
+        self.store.set_path(self.slot, list(value))
+
+    @property
+    def priority(self):
+        return int(self.store.priority[self.slot])
+
+    @priority.setter
+    def priority(self, value):
+        self.store.priority[self.slot] = value
+
+    @property
+    def status(self):
+        return STATUS_NAMES[self.store.status[self.slot]]
+
+    @status.setter
+    def status(self, value):
+        self.store.status[self.slot] = STATUS_CODES[value]
+
+    @property
+    def progress(self):
+        return float(self.store.progress[self.slot])
+
+    @progress.setter
+    def progress(self, value):
+        self.store.progress[self.slot] = value
+
+    @property
+    def schedule(self):
+        return self.store.schedules[self.slot]
+
+    @schedule.setter
+    def schedule(self, value):
+        self.store.schedules[self.slot] = value
+
+    @property
+    def plan_time(self):
+        return self.store.plan_times[self.slot]
+
+    @plan_time.setter
+    def plan_time(self, value):
+        self.store.plan_times[self.slot] = value
+
+    @property
+    def task_started_at(self):
+        return self.store.task_started[self.slot]
+
+    @task_started_at.setter
+    def task_started_at(self, value):
+        self.store.task_started[self.slot] = value
+
+    def __repr__(self):
+        return f"RobotView({self.id!r}, pos={self.pos_idx}, status={self.status!r})"
@@ -1,40 +1,919 @@
+import bisect
+import heapq
 import json
+from array import array
+from src.models.nav_graph_cache import cache_path_for, open_cache, write_cache
+
+# Bit flags stored per vertex in the compiled cache
+FLAG_CHARGER = 1
+
+
+INF = float('inf')
+
+# Travel speed (map units per second) on lanes whose speed_limit is 0 or missing
+DEFAULT_SPEED = 1.0
+
+# Arrays of one directed CSR index: out-edges ("adj_") and in-edges ("rev_")
+ADJACENCY_KEYS = ("adj_offsets", "adj_targets", "adj_costs", "adj_lane_ids",
+                  "rev_offsets", "rev_targets", "rev_costs", "rev_lane_ids")
+
+
+def lane_speed(attrs, default_speed=DEFAULT_SPEED):
+    """
+    Returns the travel speed on a lane: its speed_limit, or the default when it is 0/missing.
+    """
+    return float(attrs.get("speed_limit", 0) or 0) or default_speed
+
+
+def _build_csr(num_vertices, rows):
+    """
+    Packs per-vertex {neighbor: (cost, lane_id)} dicts into CSR lists sorted by neighbor.
+    """
+    offsets = [0] * (num_vertices + 1)
+    targets, costs, lane_ids = [], [], []
+    for idx in range(num_vertices):
+        row = rows[idx]
+        for neighbor in sorted(row):
+            cost, lane_id = row[neighbor]
+            targets.append(neighbor)
+            costs.append(cost)
+            lane_ids.append(lane_id)
+        offsets[idx + 1] = len(targets)
+    return offsets, targets, costs, lane_ids
+
+
+def build_adjacency(vertices, lanes, default_speed=DEFAULT_SPEED):
+    """
+    Builds directed CSR neighbor indexes over the lanes, costed in travel time.
+
+    Each lane ``[start, end, attrs]`` can be driven from start to end only; two-way aisles
+    are listed once per direction. The cost of an edge is the lane's Euclidean length
+    divided by its speed (see ``lane_speed``). For vertex ``v`` the lanes leaving it live in
+    ``adj_targets[adj_offsets[v]:adj_offsets[v + 1]]`` (with ``adj_costs`` and
+    ``adj_lane_ids``), and the lanes entering it in the matching ``rev_`` arrays, both sorted
+    by neighbor. If several lanes join the same ordered pair, the fastest is kept.
+
+    :return: Dict with coords_x, coords_y, the ADJACENCY_KEYS lists and max_speed.
+    """
+    num_vertices = len(vertices)
+    coords_x = [float(v[0]) for v in vertices]
+    coords_y = [float(v[1]) for v in vertices]
+
+    out_rows = [{} for _ in range(num_vertices)]
+    in_rows = [{} for _ in range(num_vertices)]
+    max_speed = default_speed
+    for lane_id, (start, end, attrs) in enumerate(lanes):
+        if not (0 <= start < num_vertices and 0 <= end < num_vertices):
+            raise ValueError(f"Lane {lane_id} references an unknown vertex")
+        if start == end:
+            continue
+        speed = lane_speed(attrs, default_speed)
+        max_speed = max(max_speed, speed)
+        dx = coords_x[start] - coords_x[end]
+        dy = coords_y[start] - coords_y[end]
+        cost = (dx * dx + dy * dy) ** 0.5 / speed
+        if end not in out_rows[start] or cost < out_rows[start][end][0]:
+            out_rows[start][end] = (cost, lane_id)
+            in_rows[end][start] = (cost, lane_id)
+
+    data = {"coords_x": coords_x, "coords_y": coords_y, "max_speed": max_speed}
+    data.update(zip(ADJACENCY_KEYS[:4], _build_csr(num_vertices, out_rows)))
+    data.update(zip(ADJACENCY_KEYS[4:], _build_csr(num_vertices, in_rows)))
+    return data
+
+
+class CompiledVertices:
+    def __init__(self, sections, strings):
+        """
+        Read-only sequence of (x, y, attributes) over a compiled level; attribute dicts are
+        decoded on first access and shared between vertices with identical attributes.
+        """
+        self._x = sections["coords_x"]
+        self._y = sections["coords_y"]
+        self._attrs = sections["vertex_attrs"]
+        self._strings = strings
+        self._decoded = {}
+
+    def __len__(self):
+        return len(self._x)
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self._x)
+        attr_id = self._attrs[idx]
+        attrs = self._decoded.get(attr_id)
+        if attrs is None:
+            attrs = self._decoded[attr_id] = json.loads(self._strings[attr_id])
+        return self._x[idx], self._y[idx], attrs
+
+    def __iter__(self):
+        for idx in range(len(self._x)):
+            yield self[idx]
+
+
+class CompiledLanes:
+    def __init__(self, sections, strings):
+        """
+        Read-only sequence of (start, end, attributes) over a compiled level.
+        """
+        self._start = sections["lane_start"]
+        self._end = sections["lane_end"]
+        self._attrs = sections["lane_attrs"]
+        self._strings = strings
+        self._decoded = {}
+
+    def __len__(self):
+        return len(self._start)
+
+    def __getitem__(self, lane_id):
+        if lane_id < 0:
+            lane_id += len(self._start)
+        attr_id = self._attrs[lane_id]
+        attrs = self._decoded.get(attr_id)
+        if attrs is None:
+            attrs = self._decoded[attr_id] = json.loads(self._strings[attr_id])
+        return self._start[lane_id], self._end[lane_id], attrs
+
+    def __iter__(self):
+        for lane_id in range(len(self._start)):
+            yield self[lane_id]
+
+
+class LevelSequence:
+    def __init__(self, graph, kind):
+        """
+        Read-only sequence over the vertices or lanes of every level, in global index order.
+        Items are read from the level sources without building their adjacency; vertex
+        references in lanes are translated to global indices.
+
+        :param graph: Owning NavGraph.
+        :param kind: "vertices" or "lanes".
+        """
+        self._graph = graph
+        self._kind = kind
+
+    def __len__(self):
+        return self._graph.vertex_count if self._kind == "vertices" else self._graph.lane_count
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"{self._kind} index out of range")
+        graph = self._graph
+        if self._kind == "vertices":
+            level, local = graph.locate(idx)
+            return graph._level_source(level)[0][local]
+        if idx >= graph.level_lane_count:
+            start, end, attrs = graph.transitions[idx - graph.level_lane_count]
+            return start, end, attrs
+        position = bisect.bisect_right(graph._lane_bases, idx) - 1
+        level = graph.level_names[position]
+        base = graph.level_offsets[level]
+        start, end, attrs = graph._level_source(level)[1][idx - graph._lane_bases[position]]
+        return start + base, end + base, attrs
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
 
 class NavGraph:
     def __init__(self, file_path):
         """
         Initializes the navigation graph by loading data from a JSON file.
 
+        Every level in the file is exposed. Vertices of all levels share one global index
+        space (level by level, in file order), but a level's coordinates and adjacency are
+        only materialized when it is first used (see ``load_level``). Use ``NavGraph.load``
+        to go through the compiled binary cache instead.
+
+        Optional top-level ``"transitions"`` entries connect levels, e.g. lifts:
+        ``[level_a, vertex_a, level_b, vertex_b, {"cost": 20.0, "name": "lift 1"}]`` with
+        level-local vertex indices. Transitions are traversable in both directions.
+
         :param file_path: Path to the JSON file containing the navigation graph.
         """
+        self.file_path = file_path
+        self.compiled = None  # CompiledGraph when loaded from the binary cache
         try:
-            with open(file_path, "r") as f:
-                data = json.load(f)  # Load JSON data from file
-            
+            data = self._read_json(file_path)
             self.levels = data.get("levels", {})  # Extract levels from the JSON data
-
-            # Ensure the JSON file contains at least one level
-            if not self.levels:
-                raise ValueError("No levels found in nav_graph")
-
-            # Get the first level's key (assuming a single-level structure)
-            level_key = next(iter(self.levels), None)
-            if not level_key:
-                raise ValueError("No valid level key in nav_graph")
-
-            # Extract vertices (points) and lanes (connections) from the level
-            level = self.levels[level_key]
-            self.vertices = level.get("vertices", [])
-            self.lanes = level.get("lanes", [])
+            self.level = self._first_level(self.levels)
+            self.building_name = data.get("building_name")
 
             # Ensure both vertices and lanes exist
-            if not self.vertices or not self.lanes:
+            level = self.levels[self.level]
+            if not level.get("vertices", []) or not level.get("lanes", []):
                 raise ValueError("Vertices or lanes missing in nav_graph")
 
-        except (json.JSONDecodeError, IOError, ValueError) as e:
+            sizes = {name: (len(lvl.get("vertices", [])), len(lvl.get("lanes", []))) for name, lvl in self.levels.items()}
+            self._setup_levels(sizes, data.get("transitions", []))
+
+            # Precompute the neighbor index used by path search and drawing
+            self.load_level(self.level)
+
+        except ValueError as e:
             # Handle invalid JSON format, file errors, or missing data
             raise ValueError(f"Invalid nav_graph file {file_path}: {str(e)}")
 
+    @staticmethod
+    def _read_json(file_path):
+        try:
+            with open(file_path, "r") as f:
+                return json.load(f)  # Load JSON data from file
+        except (json.JSONDecodeError, IOError) as e:
+            raise ValueError(str(e))
+
+    @staticmethod
+    def _first_level(levels):
+        # Ensure the JSON file contains at least one level
+        if not levels:
+            raise ValueError("No levels found in nav_graph")
+
+        # The first level is the default one (drawn first, loaded eagerly)
+        level_key = next(iter(levels), None)
+        if not level_key:
+            raise ValueError("No valid level key in nav_graph")
+        return level_key
+
+    def _setup_levels(self, sizes, raw_transitions):
+        """
+        Assigns global index ranges to the levels and resolves the declared transitions.
+
+        :param sizes: Dict of level name -> (vertex count, lane count), in file order.
+        :param raw_transitions: Transition entries as declared in the file.
+        """
+        self.level_names = list(sizes)
+        self.level_offsets = {}  # level -> global index of its first vertex
+        self.level_sizes = {}  # level -> number of vertices
+        self._vertex_bases = []
+        self._lane_bases = []
+        vertex_count = lane_count = 0
+        for name, (num_vertices, num_lanes) in sizes.items():
+            self.level_offsets[name] = vertex_count
+            self.level_sizes[name] = num_vertices
+            self._vertex_bases.append(vertex_count)
+            self._lane_bases.append(lane_count)
+            vertex_count += num_vertices
+            lane_count += num_lanes
+        self.vertex_count = vertex_count
+        self.level_lane_count = lane_count
+
+        # Transitions become extra lanes after every level lane, with global vertex indices
+        self.transitions = []
+        self.level_links = {name: set() for name in self.level_names}
+        for entry in raw_transitions:
+            level_a, vertex_a, level_b, vertex_b = entry[:4]
+            attrs = entry[4] if len(entry) > 4 else {}
+            for level, vertex in ((level_a, vertex_a), (level_b, vertex_b)):
+                if level not in self.level_sizes or not 0 <= vertex < self.level_sizes[level]:
+                    raise ValueError(f"Transition {entry[:4]} references an unknown vertex")
+            self.transitions.append((self.level_offsets[level_a] + vertex_a, self.level_offsets[level_b] + vertex_b, attrs))
+            self.level_links[level_a].add(level_b)
+            self.level_links[level_b].add(level_a)
+        self.lane_count = lane_count + len(self.transitions)
+
+        self.loaded_levels = set()
+        self._level_data = {}  # level -> build_adjacency-style dict with level-local indices
+        self.version = 0  # Bumped whenever a level is loaded and the global index changes
+        self._components = None  # (version, label per vertex)
+        self._landmarks = None  # (version, count, landmark vertices per slot, (from, to) tables per slot)
+        self.closed_lanes = set()  # Directed (from, to) lanes closed at runtime
+        self.disabled_vertices = set()  # Vertices taken out of service at runtime
+        self._open_costs = {}  # Impassable directed lane -> its travel time when open
+        if len(self.level_names) == 1 and not self.transitions:
+            # Single-level maps expose the level's own sequences (no index translation needed)
+            self.vertices, self.lanes = self._level_source(self.level_names[0])
+        else:
+            self.vertices = LevelSequence(self, "vertices")
+            self.lanes = LevelSequence(self, "lanes")
+
+    def _level_source(self, level):
+        """
+        Returns the raw (vertices, lanes) sequences of a level with level-local indices.
+        """
+        source = self.levels[level]
+        return source.get("vertices", []), source.get("lanes", [])
+
+    def locate(self, idx):
+        """
+        Maps a global vertex index to its level.
+
+        :return: Tuple (level name, level-local vertex index).
+        """
+        position = bisect.bisect_right(self._vertex_bases, idx) - 1
+        level = self.level_names[position]
+        return level, idx - self._vertex_bases[position]
+
+    def level_of(self, idx):
+        return self.locate(idx)[0]
+
+    def level_vertices(self, level):
+        """
+        Returns the global vertex indices of a level.
+        """
+        base = self.level_offsets[level]
+        return range(base, base + self.level_sizes[level])
+
+    def load_level(self, level):
+        """
+        Materializes a level's coordinates and adjacency and links its transitions.
+
+        :return: True if the level was loaded by this call, False if it already was.
+        """
+        if level in self.loaded_levels:
+            return False
+        if self.compiled is not None:
+            sections = self.compiled.levels[level]
+            data = {key: sections[key] for key in ("coords_x", "coords_y") + ADJACENCY_KEYS}
+            data["max_speed"] = self.compiled.meta["max_speed"][level]
+        else:
+            vertices, lanes = self._level_source(level)
+            if not vertices or not lanes:
+                raise ValueError(f"Vertices or lanes missing in level {level}")
+            data = build_adjacency(vertices, lanes)
+        self._level_data[level] = data
+        self.loaded_levels.add(level)
+        self._rebuild_index()
+        if self.closed_lanes or self.disabled_vertices:
+            # The rebuilt index holds the original costs again
+            self._open_costs.clear()
+            self._update_lanes(self._closure_lanes())
+        self.version += 1
+        return True
+
+    def ensure_vertex(self, idx):
+        """
+        Loads the level of a vertex if needed; returns True if a level was loaded.
+        """
+        if len(self.loaded_levels) == len(self.level_names):
+            return False
+        return self.load_level(self.level_of(idx))
+
+    def ensure_route_levels(self, start_idx, goal_idx):
+        """
+        Loads the levels a route between two vertices may use: the start and goal levels
+        and every level on a shortest chain of transitions between them.
+
+        :return: True if any level was loaded (search indexes built before are stale).
+        """
+        if len(self.loaded_levels) == len(self.level_names):
+            return False
+        start_level, goal_level = self.level_of(start_idx), self.level_of(goal_idx)
+        chain = {start_level: None}
+        frontier = [start_level]
+        while frontier and goal_level not in chain:
+            next_frontier = []
+            for level in frontier:
+                for linked in sorted(self.level_links[level]):
+                    if linked not in chain:
+                        chain[linked] = level
+                        next_frontier.append(linked)
+            frontier = next_frontier
+        loaded = self.load_level(start_level)
+        level = goal_level if goal_level in chain else None
+        while level is not None:
+            loaded = self.load_level(level) or loaded
+            level = chain[level]
+        return self.load_level(goal_level) or loaded
+
+    def _rebuild_index(self):
+        """
+        Builds the global coordinate arrays and CSR indexes over the loaded levels.
+
+        Unloaded levels keep empty adjacency rows; a transition is linked (both ways) once
+        both of its levels are loaded. Its cost is the declared "cost" in seconds or the
+        planar distance at the top speed, whichever is larger, so the straight-line
+        heuristic stays admissible.
+        """
+        self.max_speed = max(self._level_data[level]["max_speed"] for level in self.loaded_levels)
+        if len(self.level_names) == 1 and not self.transitions:
+            data = self._level_data[self.level_names[0]]
+            for key in ("coords_x", "coords_y") + ADJACENCY_KEYS:
+                setattr(self, key, data[key])
+            return
+
+        coords_x = [0.0] * self.vertex_count
+        coords_y = [0.0] * self.vertex_count
+        for level in self.loaded_levels:
+            base = self.level_offsets[level]
+            coords_x[base:base + self.level_sizes[level]] = list(self._level_data[level]["coords_x"])
+            coords_y[base:base + self.level_sizes[level]] = list(self._level_data[level]["coords_y"])
+
+        extra = {}  # global vertex -> transition edges (neighbor, cost, lane_id), same both ways
+        for transition_id, (start, end, attrs) in enumerate(self.transitions):
+            if self.level_of(start) not in self.loaded_levels or self.level_of(end) not in self.loaded_levels:
+                continue
+            planar = ((coords_x[start] - coords_x[end]) ** 2 + (coords_y[start] - coords_y[end]) ** 2) ** 0.5
+            cost = max(float(attrs.get("cost", 0.0)), planar / self.max_speed)
+            lane_id = self.level_lane_count + transition_id
+            extra.setdefault(start, []).append((end, cost, lane_id))
+            extra.setdefault(end, []).append((start, cost, lane_id))
+
+        self.coords_x, self.coords_y = coords_x, coords_y
+        for prefix in ("adj_", "rev_"):
+            offsets = [0] * (self.vertex_count + 1)
+            targets, costs, lane_ids = [], [], []
+            for position, level in enumerate(self.level_names):
+                base = self.level_offsets[level]
+                size = self.level_sizes[level]
+                if level not in self.loaded_levels:
+                    offsets[base + 1:base + size + 1] = [len(targets)] * size
+                    continue
+                data = self._level_data[level]
+                level_offsets, level_targets = data[prefix + "offsets"], data[prefix + "targets"]
+                level_costs, level_lanes = data[prefix + "costs"], data[prefix + "lane_ids"]
+                lane_base = self._lane_bases[position]
+                for local in range(size):
+                    idx = base + local
+                    lo, hi = level_offsets[local], level_offsets[local + 1]
+                    if idx in extra:
+                        row = sorted([(level_targets[e] + base, level_costs[e], level_lanes[e] + lane_base) for e in range(lo, hi)]
+                                     + extra[idx])
+                        targets.extend(r[0] for r in row)
+                        costs.extend(r[1] for r in row)
+                        lane_ids.extend(r[2] for r in row)
+                    else:
+                        targets.extend(level_targets[e] + base for e in range(lo, hi))
+                        costs.extend(level_costs[lo:hi])
+                        lane_ids.extend(level_lanes[e] + lane_base for e in range(lo, hi))
+                    offsets[idx + 1] = len(targets)
+            setattr(self, prefix + "offsets", offsets)
+            setattr(self, prefix + "targets", targets)
+            setattr(self, prefix + "costs", costs)
+            setattr(self, prefix + "lane_ids", lane_ids)
+
+    @classmethod
+    def load(cls, file_path, use_cache=True):
+        """
+        Loads a navigation graph, preferring the compiled cache next to the JSON file.
+
+        A missing or stale cache is rebuilt from the JSON. If it cannot be written (e.g. a
+        read-only data directory), the JSON is parsed directly.
+
+        :param file_path: Path to the nav_graph JSON file.
+        :param use_cache: Set to False to always parse the JSON.
+        """
+        if not use_cache:
+            return cls(file_path)
+        cache_path = cache_path_for(file_path)
+        compiled = open_cache(cache_path, file_path)
+        if compiled is not None and compiled.meta.get("default_speed") != DEFAULT_SPEED:
+            compiled = None  # Travel-time costs were compiled for another default speed
+        if compiled is None:
+            try:
+                cls.compile(file_path, cache_path)
+            except OSError:
+                return cls(file_path)
+            compiled = open_cache(cache_path, file_path)
+            if compiled is None:
+                return cls(file_path)
+        return cls._from_compiled(compiled, file_path)
+
+    @classmethod
+    def compile(cls, file_path, cache_path=None):
+        """
+        Parses a nav_graph JSON file and writes its compiled binary form.
+
+        Every level is compiled into typed arrays: coordinates, the directed CSR indexes
+        (travel-time costs), lane endpoints and speed limits, plus interned vertex names and attribute dicts.
+        Transitions are kept in the directory.
+
+        :param file_path: Path to the nav_graph JSON file.
+        :param cache_path: Output path (defaults to the JSON path with a .navbin suffix).
+        :return: Path of the written cache.
+        """
+        if cache_path is None:
+            cache_path = cache_path_for(file_path)
+        try:
+            data = cls._read_json(file_path)
+            levels = data.get("levels", {})
+            cls._first_level(levels)
+            strings, interned = [], {}
+
+            def intern(value):
+                index = interned.get(value)
+                if index is None:
+                    index = interned[value] = len(strings)
+                    strings.append(value)
+                return index
+
+            compiled_levels, max_speeds = {}, {}
+            for name, level in levels.items():
+                vertices = level.get("vertices", [])
+                lanes = level.get("lanes", [])
+                if not vertices or not lanes:
+                    raise ValueError(f"Vertices or lanes missing in level {name}")
+                adjacency = build_adjacency(vertices, lanes)
+                max_speeds[name] = adjacency["max_speed"]
+                vertex_attrs = [v[2] if len(v) > 2 else {} for v in vertices]
+                lane_attrs = [lane[2] if len(lane) > 2 else {} for lane in lanes]
+                compiled_levels[name] = {
+                    "coords_x": array("d", adjacency["coords_x"]),
+                    "coords_y": array("d", adjacency["coords_y"]),
+                    "vertex_name": array("i", [intern(a["name"]) if "name" in a else -1 for a in vertex_attrs]),
+                    "vertex_flags": array("b", [FLAG_CHARGER if a.get("is_charger") else 0 for a in vertex_attrs]),
+                    "vertex_attrs": array("i", [intern(json.dumps(a, sort_keys=True)) for a in vertex_attrs]),
+                    "lane_start": array("i", [lane[0] for lane in lanes]),
+                    "lane_end": array("i", [lane[1] for lane in lanes]),
+                    "lane_speed": array("d", [float(a.get("speed_limit", 0) or 0) for a in lane_attrs]),
+                    "lane_attrs": array("i", [intern(json.dumps(a, sort_keys=True)) for a in lane_attrs]),
+                }
+                for prefix in ("adj_", "rev_"):
+                    compiled_levels[name].update({
+                        prefix + "offsets": array("q", adjacency[prefix + "offsets"]),
+                        prefix + "targets": array("i", adjacency[prefix + "targets"]),
+                        prefix + "costs": array("d", adjacency[prefix + "costs"]),
+                        prefix + "lane_ids": array("i", adjacency[prefix + "lane_ids"]),
+                    })
+        except ValueError as e:
+            raise ValueError(f"Invalid nav_graph file {file_path}: {str(e)}")
+        meta = {"building_name": data.get("building_name"), "level_order": list(levels),
+                "transitions": data.get("transitions", []), "default_speed": DEFAULT_SPEED, "max_speed": max_speeds}
+        write_cache(cache_path, file_path, compiled_levels, strings, meta)
+        return cache_path
+
+    @classmethod
+    def _from_compiled(cls, compiled, file_path):
+        graph = cls.__new__(cls)
+        graph.file_path = file_path
+        graph.compiled = compiled
+        graph.building_name = compiled.meta.get("building_name")
+        level_order = compiled.meta.get("level_order") or list(compiled.levels)
+        graph.levels = {
+            name: {"vertices": CompiledVertices(compiled.levels[name], compiled.strings),
+                   "lanes": CompiledLanes(compiled.levels[name], compiled.strings)}
+            for name in level_order
+        }
+        graph.level = level_order[0]
+        sizes = {name: (len(compiled.levels[name]["coords_x"]), len(compiled.levels[name]["lane_start"]))
+                 for name in level_order}
+        try:
+            graph._setup_levels(sizes, compiled.meta.get("transitions", []))
+        except ValueError as e:
+            raise ValueError(f"Invalid nav_graph file {file_path}: {str(e)}")
+        graph.load_level(graph.level)
+        return graph
+
+    def components(self):
+        """
+        Returns the connected-component label of every vertex (over the loaded levels).
+
+        Components are weakly connected: lanes count in both directions, so a one-way loop
+        is a single component. Labels are computed once per graph version with an iterative
+        flood fill; vertices of unloaded levels are isolated until their level is loaded.
+
+        :return: List with one component label per global vertex index.
+        """
+        if self._components is not None and self._components[0] == self.version:
+            return self._components[1]
+        indexes = ((self.adj_offsets, self.adj_targets), (self.rev_offsets, self.rev_targets))
+        labels = [-1] * self.vertex_count
+        label = 0
+        for root in range(self.vertex_count):
+            if labels[root] != -1:
+                continue
+            labels[root] = label
+            stack = [root]
+            while stack:
+                current = stack.pop()
+                for offsets, targets in indexes:
+                    for edge in range(offsets[current], offsets[current + 1]):
+                        neighbor = targets[edge]
+                        if labels[neighbor] == -1:
+                            labels[neighbor] = label
+                            stack.append(neighbor)
+            label += 1
+        self._components = (self.version, labels)
+        return labels
+
+    def connected(self, idx1, idx2):
+        """
+        Checks in O(1) (after the first call) whether two vertices share a component.
+
+        With one-way lanes this is necessary but not sufficient for a route to exist.
+        """
+        labels = self.components()
+        return labels[idx1] == labels[idx2]
+
+    def travel_times_to(self, goal_idx, needed=None, limit=None):
+        """
+        Travel time from every loaded vertex to ``goal_idx`` along the lanes' driving
+        direction (one reverse Dijkstra), as a list (inf where unreachable).
+
+        :param needed: Optional vertices whose times are needed; the search stops once they
+                       are all final; farther vertices may then hold an upper bound or inf.
+        :param limit: Stop once this many of ``needed`` are final instead (the nearest ones).
+        """
+        return self._multi_source_distances([goal_idx], reverse=True, needed=needed, limit=limit)
+
+    def travel_times_from(self, start_idx, needed=None, limit=None):
+        """
+        Travel time from ``start_idx`` to every loaded vertex (one Dijkstra); the
+        counterpart of ``travel_times_to``, with the same early stop.
+        """
+        return self._multi_source_distances([start_idx], needed=needed, limit=limit)
+
+    def _multi_source_distances(self, sources, reverse=False, needed=None, limit=None):
+        """
+        Dijkstra over the out-edges from several sources at once.
+
+        :param reverse: Walk the in-edges instead, giving the travel time *to* the nearest source.
+        :param needed: Optional vertices to stop at: the search ends once all of them are settled.
+        :param limit: End once this many of ``needed`` are settled instead.
+        :return: List of the travel time from each vertex's nearest source (inf if none).
+        """
+        if reverse:
+            offsets, targets, costs = self.rev_offsets, self.rev_targets, self.rev_costs
+        else:
+            offsets, targets, costs = self.adj_offsets, self.adj_targets, self.adj_costs
+        distances = [float('inf')] * self.vertex_count
+        remaining = set(needed) if needed is not None else None
+        # Needed vertices that may be left unsettled
+        spare = max(len(remaining) - limit, 0) if remaining is not None and limit is not None else 0
+        heap = []
+        for source in sources:
+            distances[source] = 0.0
+            heap.append((0.0, source))
+        heapq.heapify(heap)
+        while heap:
+            distance, current = heapq.heappop(heap)
+            if distance > distances[current]:
+                continue
+            if remaining is not None:
+                remaining.discard(current)
+                if len(remaining) <= spare:
+                    break
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
+                candidate = distance + costs[edge]
+                if candidate < distances[neighbor]:
+                    distances[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, neighbor))
+        return distances
+
+    def landmarks(self, count=4):
+        """
+        Returns landmark travel-time tables for the ALT (A*, landmarks, triangle inequality)
+        heuristic over the loaded levels.
+
+        Every component gets ``count`` landmarks chosen by farthest-point selection. Slot
+        ``j`` holds the j-th landmark ``L`` of every component; ``from_tables[j][v]`` is the
+        travel time from ``L`` to ``v`` and ``to_tables[j][v]`` the travel time from ``v`` to
+        ``L``. Since lanes may be one-way, the lower bound on the time from ``u`` to ``v`` is
+        ``max(from[v] - from[u], to[u] - to[v])`` (infinite or NaN terms mean no bound).
+        This needs ``2 * count + 1`` multi-source Dijkstra runs per graph version.
+
+        :param count: Number of landmark slots.
+        :return: Tuple (landmark vertices per slot, list of (from_table, to_table) per slot).
+        """
+        if self._landmarks is not None and self._landmarks[:2] == (self.version, count):
+            return self._landmarks[2], self._landmarks[3]
+        labels = self.components()
+        members = {}
+        for idx, label in enumerate(labels):
+            members.setdefault(label, []).append(idx)
+        # Components without edges gain nothing from landmarks
+        offsets, rev_offsets = self.adj_offsets, self.rev_offsets
+        components = [vertices for vertices in members.values()
+                      if len(vertices) > 1 or offsets[vertices[0]] != offsets[vertices[0] + 1]
+                      or rev_offsets[vertices[0]] != rev_offsets[vertices[0] + 1]]
+
+        chosen, tables = [], []
+        if count > 0 and components:
+            # Seed with the vertex farthest from an arbitrary member of each component
+            nearest = self._multi_source_distances([vertices[0] for vertices in components])
+            for _ in range(count):
+                # Unreachable vertices (inf) are only picked if nothing else is left
+                slot = [max(vertices, key=lambda v: (nearest[v] != float('inf'), nearest[v])) for vertices in components]
+                from_table = self._multi_source_distances(slot)
+                to_table = self._multi_source_distances(slot, reverse=True)
+                chosen.append(slot)
+                tables.append((from_table, to_table))
+                spread = [min(a, b) for a, b in zip(from_table, to_table)]
+                nearest = spread if len(tables) == 1 else [min(a, b) for a, b in zip(nearest, spread)]
+        self._landmarks = (self.version, count, chosen, tables)
+        return chosen, tables
+
+    def neighbors(self, idx):
+        """
+        Returns the vertices reachable from a vertex over one lane, from the precomputed index.
+        Closed lanes are left out.
+
+        :param idx: Index of the vertex.
+        :return: List of (neighbor, travel_time, lane_id) tuples.
+        """
+        self.ensure_vertex(idx)
+        lo, hi = self.adj_offsets[idx], self.adj_offsets[idx + 1]
+        return [(target, cost, lane_id)
+                for target, cost, lane_id in zip(self.adj_targets[lo:hi], self.adj_costs[lo:hi], self.adj_lane_ids[lo:hi])
+                if cost != INF]
+
+    def close_lane(self, idx1, idx2, both_ways=True):
+        """
+        Closes the lane from idx1 to idx2 at runtime (e.g. a spill), and the lane back from
+        idx2 to idx1 too if there is one and ``both_ways`` is set.
+
+        The adjacency index is updated in place: a closed lane keeps its slot, with an
+        infinite cost, so every search skips it. ``travel_time`` still reports its normal
+        time, since a robot already on the lane drives it to the end.
+
+        :return: Directed (from, to) lanes that became impassable.
+        :raises ValueError: If there is no lane between the vertices.
+        """
+        lanes = self._lanes_between(idx1, idx2, both_ways)
+        self.closed_lanes.update(lanes)
+        return self._changed(self._update_lanes(lanes), opened=False)
+
+    def open_lane(self, idx1, idx2, both_ways=True):
+        """
+        Reopens a lane closed with ``close_lane``. A lane touching a disabled vertex stays
+        impassable until the vertex is enabled again.
+
+        :return: Directed (from, to) lanes that became passable.
+        :raises ValueError: If there is no lane between the vertices.
+        """
+        lanes = self._lanes_between(idx1, idx2, both_ways)
+        self.closed_lanes.difference_update(lanes)
+        return self._changed(self._update_lanes(lanes), opened=True)
+
+    def disable_vertex(self, idx):
+        """
+        Takes a vertex out of service: every lane entering or leaving it becomes impassable.
+
+        :return: Directed (from, to) lanes that became impassable.
+        """
+        self._check_vertex(idx)
+        self.disabled_vertices.add(idx)
+        return self._changed(self._update_lanes(self._vertex_lanes(idx)), opened=False)
+
+    def enable_vertex(self, idx):
+        """
+        Puts a disabled vertex back in service; its lanes reopen unless they were closed.
+
+        :return: Directed (from, to) lanes that became passable.
+        """
+        self._check_vertex(idx)
+        self.disabled_vertices.discard(idx)
+        return self._changed(self._update_lanes(self._vertex_lanes(idx)), opened=True)
+
+    def set_closures(self, closed_lanes, disabled_vertices):
+        """
+        Replaces every closure at once, e.g. to bring a freshly loaded copy of the graph to
+        the closures of another one.
+
+        :param closed_lanes: Directed (from, to) lanes to close.
+        :param disabled_vertices: Vertices to take out of service.
+        :return: Directed lanes whose passability changed.
+        """
+        closed_lanes = {(idx1, idx2) for idx1, idx2 in closed_lanes}
+        for idx in set(disabled_vertices).union(*closed_lanes):
+            self._check_vertex(idx)
+        previous = self._closure_lanes()
+        self.closed_lanes.clear()
+        self.closed_lanes.update(closed_lanes)
+        self.disabled_vertices.clear()
+        self.disabled_vertices.update(disabled_vertices)
+        changed = self._update_lanes(previous | self._closure_lanes())
+        return self._changed(changed, opened=any(lane not in self._open_costs for lane in changed))
+
+    def is_closed(self, idx1, idx2):
+        """
+        Checks whether the lane from idx1 to idx2 exists but is closed (by itself or because
+        one of its vertices is disabled).
+        """
+        return (idx1, idx2) in self._open_costs
+
+    def _check_vertex(self, idx):
+        if not 0 <= idx < self.vertex_count:
+            raise ValueError(f"Unknown vertex {idx}")
+        self.ensure_vertex(idx)
+
+    def _lanes_between(self, idx1, idx2, both_ways):
+        self._check_vertex(idx1)
+        self._check_vertex(idx2)
+        lanes = [(a, b) for a, b in ((idx1, idx2), (idx2, idx1))[:2 if both_ways else 1]
+                 if self._find_edge(a, b) is not None]
+        if not lanes:
+            raise ValueError(f"No lane from {idx1} to {idx2}")
+        return lanes
+
+    def _vertex_lanes(self, idx):
+        """
+        Returns the directed lanes leaving and entering a vertex.
+        """
+        out_lanes = [(idx, self.adj_targets[edge]) for edge in range(self.adj_offsets[idx], self.adj_offsets[idx + 1])]
+        in_lanes = [(self.rev_targets[edge], idx) for edge in range(self.rev_offsets[idx], self.rev_offsets[idx + 1])]
+        return out_lanes + in_lanes
+
+    def _closure_lanes(self):
+        """
+        Returns every directed lane that must be impassable under the current closures.
+        """
+        lanes = set(lane for lane in self.closed_lanes if self._find_edge(*lane) is not None)
+        for idx in self.disabled_vertices:
+            lanes.update(self._vertex_lanes(idx))
+        return lanes
+
+    def _update_lanes(self, lanes):
+        """
+        Sets the cost of each directed lane in both CSR indexes to infinity if it is closed
+        or touches a disabled vertex, or back to its travel time otherwise.
+
+        :return: The lanes whose passability changed.
+        """
+        if not isinstance(self.adj_costs, (list, array)):
+            # Costs from the compiled cache are read-only views of the file
+            self.adj_costs = array('d', self.adj_costs)
+            self.rev_costs = array('d', self.rev_costs)
+        changed = []
+        for lane in lanes:
+            idx1, idx2 = lane
+            closed = lane in self.closed_lanes or idx1 in self.disabled_vertices or idx2 in self.disabled_vertices
+            if closed == (lane in self._open_costs):
+                continue
+            edge = self._find_edge(idx1, idx2)
+            lo, hi = self.rev_offsets[idx2], self.rev_offsets[idx2 + 1]
+            rev_edge = bisect.bisect_left(self.rev_targets, idx1, lo, hi)
+            if closed:
+                self._open_costs[lane] = self.adj_costs[edge]
+                cost = INF
+            else:
+                cost = self._open_costs.pop(lane)
+            self.adj_costs[edge] = cost
+            self.rev_costs[rev_edge] = cost
+            changed.append(lane)
+        return changed
+
+    def _changed(self, lanes, opened):
+        """
+        Bumps the version after lanes closed or opened so searches cached by other objects
+        are dropped. Closing lanes only makes routes longer, so the landmark tables remain
+        valid lower bounds and are kept; components ignore costs and are always kept.
+        """
+        if not lanes:
+            return lanes
+        previous = self.version
+        self.version += 1
+        if self._components is not None and self._components[0] == previous:
+            self._components = (self.version, self._components[1])
+        if not opened and self._landmarks is not None and self._landmarks[0] == previous:
+            self._landmarks = (self.version,) + self._landmarks[1:]
+        return lanes
+
+    def edges(self):
+        """
+        Returns every connected vertex pair among the loaded levels exactly once, whichever
+        way its lanes run.
+
+        :return: List of (a, b) vertex pairs with a < b.
+        """
+        offsets, targets = self.adj_offsets, self.adj_targets
+        return sorted({
+            (min(idx, targets[edge]), max(idx, targets[edge]))
+            for idx in range(len(offsets) - 1)
+            for edge in range(offsets[idx], offsets[idx + 1])
+        })
+
+    def _find_edge(self, idx1, idx2):
+        """
+        Returns the position of the lane from idx1 to idx2 in the out-edge arrays, or None.
+        """
+        if not 0 <= idx1 < len(self.adj_offsets) - 1:
+            return None
+        # Each adjacency row is sorted by neighbor index
+        lo, hi = self.adj_offsets[idx1], self.adj_offsets[idx1 + 1]
+        edge = bisect.bisect_left(self.adj_targets, idx2, lo, hi)
+        if edge < hi and self.adj_targets[edge] == idx2:
+            return edge
+        return None
+
+    def get_lane_id(self, idx1, idx2):
+        """
+        Returns the id of the lane connecting two vertices, in either direction.
+
+        :param idx1: Index of the first vertex.
+        :param idx2: Index of the second vertex.
+        :return: Lane id, or None if the vertices are not connected.
+        """
+        edge = self._find_edge(idx1, idx2)
+        if edge is None:
+            edge = self._find_edge(idx2, idx1)
+        return None if edge is None else self.adj_lane_ids[edge]
+
+    def travel_time(self, idx1, idx2):
+        """
+        Returns the time to drive the lane from idx1 to idx2 (its length over its speed).
+
+        :return: Travel time in seconds, or None if there is no lane in that direction.
+        """
+        edge = self._find_edge(idx1, idx2)
+        if edge is None:
+            return None
+        cost = self.adj_costs[edge]
+        return cost if cost != INF else self._open_costs[(idx1, idx2)]
+
     def get_vertex_coords(self, idx):
         """
         Returns the (x, y) coordinates of a vertex if it exists.
@@ -42,8 +921,9 @@ class NavGraph:
         :param idx: Index of the vertex.
         :return: Tuple (x, y) representing the vertex coordinates, or (0, 0) if invalid index.
         """
-        if 0 <= idx < len(self.vertices):
-            return self.vertices[idx][0], self.vertices[idx][1]
+        if 0 <= idx < self.vertex_count:
+            self.ensure_vertex(idx)
+            return self.coords_x[idx], self.coords_y[idx]
         return 0, 0  # Default to (0,0) if the index is out of bounds
 
     def get_vertex_name(self, idx):
@@ -53,6 +933,10 @@ class NavGraph:
         :param idx: Index of the vertex.
         :return: Name of the vertex or a default name like "V{idx}".
         """
+        if self.compiled is not None and 0 <= idx < self.vertex_count:
+            level, local = self.locate(idx)
+            name_id = self.compiled.levels[level]["vertex_name"][local]
+            return self.compiled.strings[name_id] if name_id >= 0 else f"V{idx}"
         if 0 <= idx < len(self.vertices) and len(self.vertices[idx]) > 2:
             return self.vertices[idx][2].get("name", f"V{idx}")
         return f"V{idx}"  # Default to "V{idx}" if no name is provided
@@ -64,6 +948,9 @@ class NavGraph:
         :param idx: Index of the vertex.
         :return: True if the vertex is a charger, otherwise False.
         """
+        if self.compiled is not None and 0 <= idx < self.vertex_count:
+            level, local = self.locate(idx)
+            return bool(self.compiled.levels[level]["vertex_flags"][local] & FLAG_CHARGER)
         if 0 <= idx < len(self.vertices) and len(self.vertices[idx]) > 2:
             return self.vertices[idx][2].get("is_charger", False)
         return False  # Default to False if the index is invalid or the property is missing
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+# Compiled nav-graph cache: a fixed header, 8-byte aligned typed arrays, then a small JSON
+# directory describing where each array lives. Arrays are read back as memoryviews over a
+# read-only memory map, so loading does not parse or copy the graph.
+MAGIC = b"FLNG"
+VERSION = 2
+CACHE_SUFFIX = ".navbin"
+# magic, version, source mtime (ns), source size, source sha256, directory offset, directory length
+_HEADER = struct.Struct("<4sIqq32sQQ")
+
+
+def cache_path_for(source_path):
+    """
+    Returns the cache file path stored next to a nav_graph JSON file.
+    """
+    return os.path.splitext(source_path)[0] + CACHE_SUFFIX
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def write_cache(cache_path, source_path, levels, strings, meta=None):
+    """
+    Writes a compiled cache for ``source_path``.
+
+    :param cache_path: Destination file (written atomically via a temporary file).
+    :param source_path: JSON file the cache was built from (its mtime, size and hash are recorded).
+    :param levels: Dict of level name -> dict of section name -> array.array.
+    :param strings: List of interned strings referenced by index from the sections.
+    :param meta: Optional JSON-serializable dict stored in the directory.
+    """
+    stat = os.stat(source_path)
+    sha = file_sha256(source_path)
+    encoded = [s.encode("utf-8") for s in strings]
+    string_offsets = [0]
+    for raw in encoded:
+        string_offsets.append(string_offsets[-1] + len(raw))
+
+    directory = {"byteorder": sys.byteorder, "meta": meta or {}, "levels": {}, "strings": None}
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(b"\0" * _HEADER.size)
+
+            def write_section(data, typecode):
+                f.write(b"\0" * (-f.tell() % 8))
+                offset = f.tell()
+                f.write(data)
+                return [offset, typecode, len(data) // struct.calcsize(typecode)]
+
+            directory["strings"] = {
+                "offsets": write_section(array("q", string_offsets).tobytes(), "q"),
+                "blob": write_section(b"".join(encoded), "B"),
+            }
+            for level_name, sections in levels.items():
+                directory["levels"][level_name] = {
+                    name: write_section(values.tobytes(), values.typecode) for name, values in sections.items()
+                }
+
+            raw_directory = json.dumps(directory).encode("utf-8")
+            directory_offset = f.tell()
+            f.write(raw_directory)
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, VERSION, stat.st_mtime_ns, stat.st_size, sha,
+                                 directory_offset, len(raw_directory)))
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        # Never leave a half-written file behind
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _restamp(cache_path, header):
+    """
+    Rewrites a cache header in place; a cache that cannot be written keeps the old stamp.
+    """
+    try:
+        with open(cache_path, "r+b") as f:
+            f.write(header)
+    except OSError:
+        pass
+
+
+class StringTable:
+    def __init__(self, offsets, blob):
+        """
+        Interned strings decoded on first access.
+        """
+        self._offsets = offsets
+        self._blob = blob
+        self._decoded = {}
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        value = self._decoded.get(index)
+        if value is None:
+            value = bytes(self._blob[self._offsets[index]:self._offsets[index + 1]]).decode("utf-8")
+            self._decoded[index] = value
+        return value
+
+
+class CompiledGraph:
+    def __init__(self, cache_path, header, directory, mapped):
+        """
+        Memory-mapped view of a compiled nav-graph cache; use ``open_cache`` to create one.
+
+        :ivar levels: Dict of level name -> dict of section name -> memoryview.
+        :ivar strings: StringTable of the interned strings.
+        :ivar meta: Extra metadata stored at compile time.
+        """
+        self.path = cache_path
+        self.header = header
+        self.meta = directory.get("meta", {})
+        self._mmap = mapped
+        buffer = memoryview(mapped)
+
+        def section(entry):
+            offset, typecode, count = entry
+            return buffer[offset:offset + count * struct.calcsize(typecode)].cast(typecode)
+
+        self.strings = StringTable(section(directory["strings"]["offsets"]), section(directory["strings"]["blob"]))
+        self.levels = {
+            name: {key: section(entry) for key, entry in sections.items()}
+            for name, sections in directory["levels"].items()
+        }
+
+
+def open_cache(cache_path, source_path):
+    """
+    Memory-maps a compiled cache if it is still valid for ``source_path``.
+
+    The cache is valid when it was written by this version on a machine with the same byte
+    order, and the source file has the recorded mtime and size. If only the mtime or size
+    differs, the source content hash decides: a touched but unchanged file keeps its cache,
+    and its new mtime and size are written to the header so the next load skips the hash.
+
+    :return: CompiledGraph, or None if the cache is missing, stale or unreadable.
+    """
+    try:
+        with open(cache_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    magic, version, mtime_ns, size, sha, directory_offset, directory_length = _HEADER.unpack_from(mapped, 0)
+    try:
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("unknown cache format")
+        stat = os.stat(source_path)
+        touched = (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size)
+        if touched and file_sha256(source_path) != sha:
+            raise ValueError("source changed")
+        directory = json.loads(bytes(mapped[directory_offset:directory_offset + directory_length]))
+        if directory.get("byteorder") != sys.byteorder:
+            raise ValueError("byte order mismatch")
+        if touched:
+            mtime_ns, size = stat.st_mtime_ns, stat.st_size
+            _restamp(cache_path, _HEADER.pack(magic, version, mtime_ns, size, sha, directory_offset, directory_length))
+        header = {"mtime_ns": mtime_ns, "size": size, "sha256": sha.hex()}
+        return CompiledGraph(cache_path, header, directory, mapped)
+    except (OSError, ValueError, KeyError):
+        mapped.close()
+        return None
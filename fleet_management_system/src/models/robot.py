@@ -8,4 +8,7 @@ class Robot:
         self.color = color
         self.priority = priority
         self.status = "idle"
-        self.progress = 0
\ No newline at end of file
+        self.progress = 0
+        self.schedule = []  # Departure time for each path step (reservation planning only)
+        self.plan_time = 0.0  # When the current space-time plan was made
+        self.task_started_at = None  # Simulated time the current task was assigned
@@ -0,0 +1,79 @@
+import heapq
+
+INF = float('inf')
+
+
+def solve_sparse_assignment(candidates, column_count):
+    """
+    Minimum-cost assignment restricted to candidate pairs: the Hungarian method with each
+    shortest augmenting path found by Dijkstra over the candidate pairs alone, after a
+    greedy start that gives every row its cheapest column if still free.
+
+    :param candidates: For each row, a list of (column, cost) pairs with finite costs; the
+                       pairs not listed cannot be matched.
+    :param column_count: Number of columns.
+    :return: List of (row, column) pairs. As many rows (or, with more rows than columns,
+             columns) are matched as the candidate pairs allow, at minimum total cost.
+    """
+    if len(candidates) > column_count:
+        transposed = [[] for _ in range(column_count)]
+        for row, pairs in enumerate(candidates):
+            for column, cost in pairs:
+                transposed[column].append((row, cost))
+        return [(row, column) for column, row in solve_sparse_assignment(transposed, len(candidates))]
+
+    # Each row also gets a private column costing more than any matching without one, so
+    # every row is matched (as in a dense matrix with an "unreachable" cost): the rows left
+    # on their own column are the ones the candidate pairs cannot serve
+    unmatched = (max((cost for pairs in candidates for _, cost in pairs), default=0.0) + 1) * (len(candidates) + 1)
+    candidates = [pairs + [(column_count + row, unmatched)] for row, pairs in enumerate(candidates)]
+    # Potentials u (rows) and v (columns) keep every reduced cost cost - u - v non-negative
+    # and zero on matched pairs
+    u = [0.0] * len(candidates)
+    v = [0.0] * (column_count + len(candidates))
+    row_of = [-1] * len(v)
+    column_of = [-1] * len(candidates)
+    for row, pairs in enumerate(candidates):
+        column, cost = min(pairs, key=lambda pair: pair[1])
+        u[row] = cost
+        if row_of[column] < 0:
+            row_of[column], column_of[row] = row, column
+
+    for root in range(len(candidates)):
+        if column_of[root] >= 0:
+            continue
+        # Dijkstra from the root row: a settled column leads on to the row matched to it
+        distances = {}  # column -> reduced distance from the root
+        way = {}  # column -> row it was reached from
+        settled = []
+        heap = []
+        row, row_distance = root, 0.0
+        while True:
+            ur = u[row]
+            for column, cost in candidates[row]:
+                candidate = row_distance + cost - ur - v[column]
+                if candidate < distances.get(column, INF):
+                    distances[column] = candidate
+                    way[column] = row
+                    heapq.heappush(heap, (candidate, column))
+            while heap[0][0] > distances[heap[0][1]]:
+                heapq.heappop(heap)  # Stale entry
+            row_distance, column = heapq.heappop(heap)
+            distances[column] = -INF  # Settled; never relaxed again
+            settled.append((column, row_distance))
+            if row_of[column] < 0:
+                break
+            row = row_of[column]
+        # Update the potentials so the augmenting path is tight, then flip it
+        delta = row_distance
+        u[root] += delta
+        for column, distance in settled:
+            v[column] -= delta - distance
+            if row_of[column] >= 0:
+                u[row_of[column]] += delta - distance
+        while column >= 0:
+            row = way[column]
+            previous = column_of[row]
+            row_of[column], column_of[row] = row, column
+            column = previous if row != root else -1
+    return [(row, column) for row, column in enumerate(column_of) if column < column_count]
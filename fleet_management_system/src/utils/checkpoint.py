@@ -0,0 +1,467 @@
+import json
+import math
+import os
+import struct
+import sys
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from src.models.fleet_store import STATUS_CODES, STATUS_NAMES
+from src.models.nav_graph_cache import file_sha256
+from src.models.robot import Robot
+
+# Fleet checkpoint: the complete state of a SimulationEngine between two ticks, to continue a
+# simulation later exactly where it stopped. The file is a short header followed by a
+# zlib-compressed body of length-prefixed sections:
+#   META     JSON dict: byte order, map identity and closures, engine clocks and settings,
+#            traffic counters, the caller's RNG state and caller data
+#   NAMES    robot ids and colors; the other sections refer to robots by their index here
+#   ROBOTS   one typed array per robot field, with every path and schedule concatenated
+#   TRAFFIC  occupancy, wait-for edges, open deadlocks, reservations, trip and deadlock times
+#   PATHS    the traffic manager's path cache
+# Sections are sequences of typed arrays in the writer's byte order (recorded in META).
+# Unknown sections are skipped on read.
+MAGIC = b"FLCK"
+VERSION = 2
+CHECKPOINT_SUFFIX = ".flckpt"
+_HEADER = struct.Struct("<4sH")  # magic, version
+_SECTION = struct.Struct("<BI")  # section type, length
+_COUNT = struct.Struct("<I")
+
+# Section types
+META = 1
+NAMES = 2
+ROBOTS = 3
+TRAFFIC = 4
+PATHS = 5
+
+NONE = -1  # Stored in place of None in integer arrays
+COMPRESSION_LEVEL = 1  # Paths compress well even at the fastest level
+
+_writer = None  # Single background thread, so checkpoints are written in the order taken
+_source_hashes = {}  # (path, mtime, size) -> sha256 hex digest of a nav graph file
+
+
+class _Packer:
+    def __init__(self):
+        self.parts = []
+
+    def add(self, typecode, values):
+        data = array(typecode, values)
+        self.parts.append(_COUNT.pack(len(data)))
+        self.parts.append(data.tobytes())
+
+    def add_text(self, values):
+        self.add("B", "\0".join(values).encode("utf-8"))
+
+    def data(self):
+        return b"".join(self.parts)
+
+
+class _Unpacker:
+    def __init__(self, data, swap):
+        self._data = data
+        self._offset = 0
+        self._swap = swap
+
+    def next(self, typecode):
+        count = _COUNT.unpack_from(self._data, self._offset)[0]
+        start = self._offset + _COUNT.size
+        values = array(typecode)
+        self._offset = start + count * values.itemsize
+        values.frombytes(self._data[start:self._offset])
+        if self._swap:
+            values.byteswap()
+        return values
+
+    def next_text(self, count):
+        text = self.next("B").tobytes().decode("utf-8")
+        return text.split("\0") if count else []
+
+
+def map_identity(nav_graph):
+    """
+    Describes a navigation graph well enough to check that a checkpoint is restored onto
+    the graph it was taken on: its file and content hash, its size and levels.
+    """
+    path = getattr(nav_graph, "file_path", None)
+    digest = None
+    if path and os.path.exists(path):
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        digest = _source_hashes.get(key)
+        if digest is None:
+            digest = _source_hashes[key] = file_sha256(path).hex()
+    return {"graph": os.path.abspath(path) if path else None, "sha256": digest,
+            "vertices": nav_graph.vertex_count, "lanes": nav_graph.lane_count, "levels": list(nav_graph.level_names)}
+
+
+def check_map(nav_graph, identity):
+    """
+    :raises ValueError: If the graph is not the one described by ``identity``.
+    """
+    current = map_identity(nav_graph)
+    for key in ("vertices", "lanes", "levels"):
+        if current[key] != identity[key]:
+            raise ValueError(f"Checkpoint was taken on another map ({key} differ: {identity[key]} vs {current[key]})")
+    if current["sha256"] and identity["sha256"] and current["sha256"] != identity["sha256"]:
+        raise ValueError(f"Checkpoint was taken on another version of {identity['graph']}")
+
+
+def capture_state(engine, rng=None, extra=None):
+    """
+    Copies everything a checkpoint holds out of the engine. Only this step has to run
+    between two ticks; encoding and writing the copy can happen in the background.
+
+    :param rng: Optional random.Random of the caller (e.g. the task generator of a
+                scenario) whose state is saved along.
+    :param extra: Optional JSON-serializable dict stored as is (caller bookkeeping).
+    :return: State dict for ``write_checkpoint`` or ``restore_state``.
+    """
+    nav_graph = engine.nav_graph
+    traffic_manager = engine.traffic_manager
+    fleet_manager = engine.fleet_manager
+    robots = [(r.id, r.color, r.pos_idx, r.previous_pos_idx, r.goal_idx, r.priority, r.status, r.progress,
+               r.plan_time, r.task_started_at, tuple(r.path), tuple(r.schedule)) for r in fleet_manager.robots]
+    identity = map_identity(nav_graph)
+    identity.update(loaded_levels=[level for level in nav_graph.level_names if level in nav_graph.loaded_levels],
+                    closed_lanes=sorted(nav_graph.closed_lanes), disabled_vertices=sorted(nav_graph.disabled_vertices))
+    meta = {
+        "byteorder": sys.byteorder,
+        "map": identity,
+        "engine": {
+            "time": engine.time, "ticks": engine.ticks, "wait_time": engine.wait_time,
+            "accumulator": engine._accumulator, "event_count": engine.event_count,
+            "tick_interval": engine.tick_interval, "scheduler": engine.scheduler,
+            "planning_mode": traffic_manager.planning_mode, "array_store": engine.fleet_store is not None,
+            "robot_count": fleet_manager.robot_count,
+        },
+        "rng": rng.getstate() if rng is not None else None,
+        "extra": extra or {},
+    }
+    return {"meta": meta, "robots": robots, "traffic": traffic_manager.checkpoint_state()}
+
+
+def pack_state(state):
+    """
+    Serializes a captured state into the uncompressed checkpoint body (see ``encode_state``).
+    """
+    names = [robot[0] for robot in state["robots"]]
+    index = {name: i for i, name in enumerate(names)}
+
+    def name_index(name):
+        i = index.get(name)
+        if i is None:  # A table refers to a robot that is not in the fleet
+            i = index[name] = len(names)
+            names.append(name)
+        return i
+
+    robots = state["robots"]
+    columns = list(zip(*robots)) if robots else [()] * 12
+    ids, colors, pos, previous, goal, priority, status, progress, plan_time, started, paths, schedules = columns
+    packer = _Packer()
+    packer.add("i", pos)
+    packer.add("i", [NONE if idx is None else idx for idx in previous])
+    packer.add("i", [NONE if idx is None else idx for idx in goal])
+    packer.add("i", priority)
+    packer.add("b", [STATUS_CODES[name] for name in status])
+    packer.add("d", progress)
+    packer.add("d", plan_time)
+    packer.add("d", [math.nan if at is None else at for at in started])
+    packer.add("I", [len(path) for path in paths])
+    packer.add("i", [idx for path in paths for idx in path])
+    packer.add("I", [len(schedule) for schedule in schedules])
+    packer.add("d", [at for schedule in schedules for at in schedule])
+    robot_section = packer.data()
+
+    traffic = state["traffic"]
+    packer = _Packer()
+    packer.add("i", traffic["occupied_vertices"])
+    packer.add("i", [idx for lane in traffic["occupied_lanes"] for idx in lane])
+    packer.add("i", [name_index(robot_id) for robot_id, _ in traffic["wait_for"]])
+    packer.add("I", [len(blockers) for _, blockers in traffic["wait_for"]])
+    packer.add("i", [name_index(blocker) for _, blockers in traffic["wait_for"] for blocker in blockers])
+    packer.add("I", [len(members) for members, _ in traffic["open_deadlocks"]])
+    packer.add("i", [name_index(robot_id) for members, _ in traffic["open_deadlocks"] for robot_id in members])
+    packer.add("d", [detected for _, detected in traffic["open_deadlocks"]])
+    for key in ("stranded", "stuck", "pending_plans"):
+        packer.add("i", [name_index(robot_id) for robot_id in traffic[key]])
+    packer.add("i", [name_index(robot_id) for robot_id, _, _ in traffic["making_way"]])
+    packer.add("i", [idx for _, target, asker_idx in traffic["making_way"] for idx in (target, asker_idx)])
+    vertex_reservations = traffic["vertex_reservations"]
+    packer.add("i", [vertex for vertex, _, _, _ in vertex_reservations])
+    packer.add("d", [at for _, start, end, _ in vertex_reservations for at in (start, end)])
+    packer.add("i", [name_index(owner) for _, _, _, owner in vertex_reservations])
+    lane_reservations = traffic["lane_reservations"]
+    packer.add("i", [idx for lane, _, _, _ in lane_reservations for idx in lane])
+    packer.add("d", [at for _, start, end, _ in lane_reservations for at in (start, end)])
+    packer.add("i", [name_index(owner) for _, _, _, owner in lane_reservations])
+    packer.add("d", traffic["trip_times"])
+    packer.add("d", traffic["deadlock_resolution_times"])
+    traffic_section = packer.data()
+
+    # Path cache entries as one integer stream: start, goal, avoided vertex, avoided lane
+    # set (NONE: the occupied lanes), occupancy version, path length (NONE: no path) and
+    # path. Entries cached in the same tick share their lane set, so each is stored once.
+    lane_sets = {}
+    stream = []
+    for (start_idx, goal_idx, avoid_vertex, avoid_lanes), version, path in traffic["path_cache"]:
+        if avoid_lanes is not None:
+            avoid_lanes = lane_sets.setdefault(avoid_lanes, len(lane_sets))
+        stream += (start_idx, goal_idx, NONE if avoid_vertex is None else avoid_vertex,
+                   NONE if avoid_lanes is None else avoid_lanes, version)
+        if path is None:
+            stream.append(NONE)
+        else:
+            stream.append(len(path))
+            stream.extend(path)
+    packer = _Packer()
+    packer.add("I", [len(lanes) for lanes in lane_sets])
+    packer.add("i", [idx for lanes in lane_sets for lane in lanes for idx in lane])
+    packer.add("q", stream)
+    path_section = packer.data()
+
+    packer = _Packer()
+    packer.add_text(names)
+    packer.add_text(colors)
+    name_section = _COUNT.pack(len(names)) + _COUNT.pack(len(colors)) + packer.data()
+
+    meta = dict(state["meta"])
+    meta["traffic"] = {"clock": traffic["clock"], "counters": traffic["counters"]}
+    body = bytearray()
+    for section_type, payload in ((META, json.dumps(meta).encode("utf-8")), (NAMES, name_section),
+                                  (ROBOTS, robot_section), (TRAFFIC, traffic_section), (PATHS, path_section)):
+        body += _SECTION.pack(section_type, len(payload))
+        body += payload
+    return bytes(body)
+
+
+def encode_state(state):
+    """
+    Serializes a captured state into the checkpoint file format.
+    """
+    return _compress(pack_state(state))
+
+
+def _compress(body):
+    return _HEADER.pack(MAGIC, VERSION) + zlib.compress(body, COMPRESSION_LEVEL)
+
+
+def decode_state(data, source="checkpoint"):
+    """
+    Parses checkpoint file contents back into a state dict (see ``capture_state``).
+
+    :raises ValueError: If the data is not a checkpoint of a supported version.
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{source} is not a fleet checkpoint")
+    magic, version = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{source} is not a fleet checkpoint of version {VERSION}")
+    try:
+        body = zlib.decompress(data[_HEADER.size:])
+    except zlib.error as e:
+        raise ValueError(f"{source} is damaged ({e})")
+    sections = {}
+    offset = 0
+    while offset + _SECTION.size <= len(body):
+        section_type, length = _SECTION.unpack_from(body, offset)
+        offset += _SECTION.size
+        sections[section_type] = memoryview(body)[offset:offset + length]
+        offset += length
+    if any(section not in sections for section in (META, NAMES, ROBOTS, TRAFFIC, PATHS)):
+        raise ValueError(f"{source} is incomplete")
+
+    meta = json.loads(bytes(sections[META]))
+    swap = meta.pop("byteorder") != sys.byteorder
+    traffic_meta = meta.pop("traffic")
+    name_count, color_count = _COUNT.unpack_from(sections[NAMES], 0)[0], _COUNT.unpack_from(sections[NAMES], 4)[0]
+    reader = _Unpacker(sections[NAMES][8:], swap)
+    names, colors = reader.next_text(name_count), reader.next_text(color_count)
+
+    reader = _Unpacker(sections[ROBOTS], swap)
+    pos, previous, goal, priority = (reader.next("i").tolist() for _ in range(4))
+    status = reader.next("b").tolist()
+    progress, plan_time, started = (reader.next("d").tolist() for _ in range(3))
+    path_lengths, path_values = reader.next("I").tolist(), reader.next("i").tolist()
+    schedule_lengths, schedule_values = reader.next("I").tolist(), reader.next("d").tolist()
+    robots = []
+    path_at = schedule_at = 0
+    for i, color in enumerate(colors):
+        path_end, schedule_end = path_at + path_lengths[i], schedule_at + schedule_lengths[i]
+        robots.append((names[i], color, pos[i], None if previous[i] == NONE else previous[i],
+                       None if goal[i] == NONE else goal[i], priority[i], STATUS_NAMES[status[i]], progress[i],
+                       plan_time[i], None if math.isnan(started[i]) else started[i],
+                       path_values[path_at:path_end], schedule_values[schedule_at:schedule_end]))
+        path_at, schedule_at = path_end, schedule_end
+
+    def pairs(values):
+        return list(zip(values[::2], values[1::2]))
+
+    def groups(lengths, values):
+        result, at = [], 0
+        for length in lengths:
+            result.append([names[i] for i in values[at:at + length]])
+            at += length
+        return result
+
+    reader = _Unpacker(sections[TRAFFIC], swap)
+    occupied_vertices = reader.next("i").tolist()
+    occupied_lanes = pairs(reader.next("i").tolist())
+    waiting = [names[i] for i in reader.next("i")]
+    blockers = groups(reader.next("I").tolist(), reader.next("i").tolist())
+    members = groups(reader.next("I").tolist(), reader.next("i").tolist())
+    detected = reader.next("d").tolist()
+    stranded, stuck, pending = ([names[i] for i in reader.next("i")] for _ in range(3))
+    making_way = [(names[i], target, asker_idx)
+                  for i, (target, asker_idx) in zip(reader.next("i"), pairs(reader.next("i").tolist()))]
+    vertex_keys, vertex_times, vertex_owners = reader.next("i").tolist(), pairs(reader.next("d").tolist()), reader.next("i")
+    lane_keys, lane_times, lane_owners = pairs(reader.next("i").tolist()), pairs(reader.next("d").tolist()), reader.next("i")
+    traffic = dict(traffic_meta)
+    traffic.update({
+        "occupied_vertices": occupied_vertices,
+        "occupied_lanes": occupied_lanes,
+        "wait_for": list(zip(waiting, blockers)),
+        "open_deadlocks": list(zip(members, detected)),
+        "stranded": stranded,
+        "stuck": stuck,
+        "pending_plans": pending,
+        "making_way": making_way,
+        "vertex_reservations": [(key, start, end, names[owner])
+                                for key, (start, end), owner in zip(vertex_keys, vertex_times, vertex_owners)],
+        "lane_reservations": [(key, start, end, names[owner])
+                              for key, (start, end), owner in zip(lane_keys, lane_times, lane_owners)],
+        "trip_times": reader.next("d").tolist(),
+        "deadlock_resolution_times": reader.next("d").tolist(),
+    })
+
+    reader = _Unpacker(sections[PATHS], swap)
+    set_lengths, lane_values = reader.next("I").tolist(), reader.next("i").tolist()
+    lane_sets = []
+    at = 0
+    for length in set_lengths:
+        lane_sets.append(frozenset(pairs(lane_values[at:at + 2 * length])))
+        at += 2 * length
+    stream = reader.next("q").tolist()
+    path_cache = []
+    at = 0
+    while at < len(stream):
+        start_idx, goal_idx, avoid_vertex, lane_set, version, length = stream[at:at + 6]
+        at += 6
+        path = None
+        if length != NONE:
+            path = tuple(stream[at:at + length])
+            at += length
+        path_cache.append(((start_idx, goal_idx, None if avoid_vertex == NONE else avoid_vertex,
+                            None if lane_set == NONE else lane_sets[lane_set]), version, path))
+    traffic["path_cache"] = path_cache
+
+    if meta["rng"] is not None:
+        version, internal, gauss_next = meta["rng"]
+        meta["rng"] = (version, tuple(internal), gauss_next)
+    return {"meta": meta, "robots": robots, "traffic": traffic}
+
+
+def write_checkpoint(path, state):
+    """
+    Encodes a captured state and writes it to ``path`` (atomically, through a temporary
+    file, so an interrupted write never replaces a good checkpoint).
+
+    :return: The path.
+    """
+    return _write_file(path, encode_state(state))
+
+
+def _write_file(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _write_body(path, body):
+    return _write_file(path, _compress(body))
+
+
+def write_checkpoint_async(path, state):
+    """
+    Packs a captured state on the calling thread, then compresses and writes it on a
+    background thread. Packing is pure Python and would hold the GIL against the tick loop,
+    so only compression and file I/O, which release it, are left to the thread. Checkpoints
+    are written one at a time, in the order they were taken.
+
+    :return: Future resolving to the path (or raising the write error).
+    """
+    global _writer
+    body = pack_state(state)
+    if _writer is None:
+        _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fleet-checkpoint")
+    return _writer.submit(_write_body, path, body)
+
+
+def read_checkpoint(path):
+    """
+    Reads a checkpoint file.
+
+    :raises ValueError: If the file is not a checkpoint of a supported version.
+    """
+    with open(path, "rb") as f:
+        return decode_state(f.read(), path)
+
+
+def restore_state(engine, state, rng=None):
+    """
+    Puts a captured or decoded state into an engine that has no robots yet: the graph gets
+    the checkpoint's loaded levels and closures, then the robots, clocks and traffic tables
+    are restored. The event queue of the event scheduler is rebuilt from the robots.
+
+    :param rng: Optional random.Random that receives the saved RNG state.
+    :return: The caller data stored with the checkpoint.
+    :raises ValueError: If the engine runs on another map or already has robots.
+    """
+    meta = state["meta"]
+    identity = meta["map"]
+    nav_graph = engine.nav_graph
+    check_map(nav_graph, identity)
+    fleet_manager = engine.fleet_manager
+    if meta["engine"]["planning_mode"] != engine.traffic_manager.planning_mode:
+        raise ValueError(f"Checkpoint was saved in {meta['engine']['planning_mode']} planning mode")
+    if fleet_manager.robots:
+        raise ValueError("A checkpoint can only be restored into an engine without robots")
+    for level in identity["loaded_levels"]:
+        nav_graph.load_level(level)
+    nav_graph.set_closures(identity["closed_lanes"], identity["disabled_vertices"])
+
+    store = engine.fleet_store
+    for (robot_id, color, pos_idx, previous_pos_idx, goal_idx, priority, status, progress, plan_time,
+         task_started_at, path, schedule) in state["robots"]:
+        robot = (store.add_robot(robot_id, pos_idx, color, priority) if store is not None
+                 else Robot(robot_id, pos_idx, color, priority))
+        robot.previous_pos_idx = previous_pos_idx
+        robot.goal_idx = goal_idx
+        robot.path = list(path)
+        robot.status = status
+        robot.progress = progress
+        robot.schedule = list(schedule)
+        robot.plan_time = plan_time
+        robot.task_started_at = task_started_at
+        fleet_manager.robots.append(robot)
+
+    settings = meta["engine"]
+    fleet_manager.robot_count = settings["robot_count"]
+    engine.time = settings["time"]
+    engine.ticks = settings["ticks"]
+    engine.wait_time = settings["wait_time"]
+    engine._accumulator = settings["accumulator"]
+    engine.event_count = settings["event_count"]
+    engine._event_queue.clear()
+    engine._event_times.clear()
+    engine.traffic_manager.restore_checkpoint_state(state["traffic"])
+    engine.traffic_manager.track_robot_vertices(fleet_manager.robots)
+    if rng is not None and meta["rng"] is not None:
+        rng.setstate(meta["rng"])
+    return meta["extra"]
+
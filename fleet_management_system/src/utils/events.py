@@ -0,0 +1,113 @@
+import time
+from collections import deque
+
+# Event types published by the traffic and fleet managers
+CONFLICT = "conflict"
+REROUTE = "reroute"
+DEADLOCK = "deadlock"
+SPAWN_REJECTED = "spawn_rejected"
+TASK_COMPLETE = "task_complete"
+EVENT_TYPES = (CONFLICT, REROUTE, DEADLOCK, SPAWN_REJECTED, TASK_COMPLETE)
+
+
+class FleetEvent:
+    __slots__ = ("type", "time", "message", "robot_id", "data")
+
+    def __init__(self, type, time, message, robot_id=None, data=None):
+        """
+        A single notification from the simulation.
+
+        :param type: One of the event type constants (e.g. CONFLICT).
+        :param time: Simulated time in seconds when the event happened.
+        :param message: Human-readable description.
+        :param robot_id: Id of the robot the event is about, if any.
+        :param data: Dict of extra structured fields.
+        """
+        self.type = type
+        self.time = time
+        self.message = message
+        self.robot_id = robot_id
+        self.data = data or {}
+
+    def __repr__(self):
+        return f"FleetEvent({self.type!r}, t={self.time:.2f}, {self.message!r})"
+
+
+class EventBus:
+    def __init__(self):
+        """
+        In-process publish/subscribe bus. Publishing only calls the subscribers' callbacks,
+        which are expected to return quickly (buffer, count, or log); nothing here waits on
+        user interaction.
+        """
+        self._subscribers = []  # list of (callback, set of event types or None for all)
+        self.published = 0
+
+    def subscribe(self, callback, event_types=None):
+        """
+        Registers ``callback(event)`` for the given event types (all types if None).
+
+        :return: The callback, usable as a token for unsubscribe.
+        """
+        self._subscribers.append((callback, set(event_types) if event_types is not None else None))
+        return callback
+
+    def unsubscribe(self, callback):
+        self._subscribers = [(cb, types) for cb, types in self._subscribers if cb is not callback]
+
+    def publish(self, event_type, time, message, robot_id=None, **data):
+        """
+        Creates an event and delivers it to matching subscribers.
+        """
+        self.published += 1
+        if not self._subscribers:
+            return None
+        event = FleetEvent(event_type, time, message, robot_id, data)
+        for callback, types in self._subscribers:
+            if types is None or event_type in types:
+                callback(event)
+        return event
+
+
+class EventBatcher:
+    def __init__(self, max_per_interval=20, interval=1.0, max_buffer=1000, clock=time.monotonic):
+        """
+        Subscriber that buffers events for periodic draining, rate-limited per event type.
+
+        At most ``max_per_interval`` events of each type are kept per ``interval`` seconds
+        (measured with ``clock``); the rest are counted as suppressed.
+
+        :param max_per_interval: Events kept per type and interval.
+        :param interval: Length of the rate-limit window in seconds.
+        :param max_buffer: Maximum number of buffered events (oldest are discarded).
+        :param clock: Time source for the rate limit.
+        """
+        self.max_per_interval = max_per_interval
+        self.interval = interval
+        self.clock = clock
+        self._buffer = deque(maxlen=max_buffer)
+        self._window_start = {}  # event type -> start of its current window
+        self._window_count = {}  # event type -> events kept in the current window
+        self._suppressed = {}  # event type -> events dropped since the last drain
+
+    def __call__(self, event):
+        now = self.clock()
+        if now - self._window_start.get(event.type, float('-inf')) >= self.interval:
+            self._window_start[event.type] = now
+            self._window_count[event.type] = 0
+        if self._window_count[event.type] >= self.max_per_interval:
+            self._suppressed[event.type] = self._suppressed.get(event.type, 0) + 1
+            return
+        self._window_count[event.type] += 1
+        self._buffer.append(event)
+
+    def drain(self):
+        """
+        Returns and clears the buffered events and the suppressed counts.
+
+        :return: Tuple (list of events, dict of event type -> suppressed count).
+        """
+        events = list(self._buffer)
+        self._buffer.clear()
+        suppressed, self._suppressed = self._suppressed, {}
+        return events, suppressed
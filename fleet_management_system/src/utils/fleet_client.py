@@ -0,0 +1,110 @@
+import asyncio
+import itertools
+import json
+
+
+class CommandError(Exception):
+    """
+    Raised when the command server answers a request with an error.
+    """
+
+
+class FleetClient:
+    def __init__(self, reader, writer):
+        """
+        Asyncio client of the CommandServer line protocol; use ``FleetClient.connect``.
+
+        Requests may be pipelined: each call sends its line at once and waits for the reply
+        with the same id, so many requests can be in flight on one connection. Diff
+        messages of a subscription are put on ``diffs`` (an asyncio.Queue).
+        """
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._waiting = {}  # request id -> future
+        self.diffs = asyncio.Queue()
+        self._read_task = asyncio.ensure_future(self._read_loop())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765):
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 24)
+        return cls(reader, writer)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message.get("event") == "diff":
+                    self.diffs.put_nowait(message)
+                    continue
+                future = self._waiting.pop(message.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if message.get("ok"):
+                    future.set_result(message.get("result"))
+                else:
+                    future.set_exception(CommandError(message.get("error")))
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("connection closed"))
+            self._waiting.clear()
+
+    async def request(self, op, **params):
+        """
+        Sends one request and returns its result.
+
+        :raises CommandError: If the server rejected or could not apply the command.
+        """
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        params.update(id=request_id, op=op)
+        self._writer.write(json.dumps(params).encode("utf-8") + b"\n")
+        if self._writer.transport.get_write_buffer_size() > 1 << 20:
+            await self._writer.drain()
+        return await future
+
+    async def spawn(self, vertex, priority=1):
+        return await self.request("spawn", vertex=vertex, priority=priority)
+
+    async def assign(self, robot_id, goal):
+        return await self.request("assign", robot=robot_id, goal=goal)
+
+    async def assign_batch(self, goals, robots=None):
+        return await self.request("assign_batch", goals=list(goals), robots=robots)
+
+    async def close_lane(self, a, b, both_ways=True):
+        return await self.request("close_lane", a=a, b=b, both_ways=both_ways)
+
+    async def open_lane(self, a, b, both_ways=True):
+        return await self.request("open_lane", a=a, b=b, both_ways=both_ways)
+
+    async def disable_vertex(self, vertex):
+        return await self.request("disable_vertex", vertex=vertex)
+
+    async def enable_vertex(self, vertex):
+        return await self.request("enable_vertex", vertex=vertex)
+
+    async def state(self):
+        return await self.request("state")
+
+    async def stats(self):
+        return await self.request("stats")
+
+    async def subscribe(self):
+        return await self.request("subscribe")
+
+    async def unsubscribe(self):
+        return await self.request("unsubscribe")
+
+    async def close(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self._read_task
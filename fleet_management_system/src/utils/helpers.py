@@ -1,43 +1,40 @@
-import tkinter as tk
-from tkinter import messagebox
-from datetime import datetime
-import os
+import time
+from src.utils.logger import DEBUG, INFO, WARNING, ERROR, get_logger
+from src.utils.metrics import metrics
 
-def log_action(gui, message):
+def log_enabled(level):
     """
-    Logs an action message with a timestamp.
-    
-    - Displays the log message in the GUI.
-    - Prints it to the console.
-    - Saves it to a log file.
-
-    :param gui: Reference to the GUI application where logs are displayed.
-    :param message: The message to log.
-    """
-    timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")  # Generate current timestamp
-    log_message = f"{timestamp} {message}"  # Format the log entry
-
-    print(log_message)  # Print log to console (useful for debugging)
+    Checks whether messages at the given level are recorded.
 
-    # Append the log message to the GUI text widget
-    gui.log_text.insert(tk.END, log_message + "\n")
-    gui.log_text.see(tk.END)  # Auto-scroll to the latest log entry
+    Hot paths use this to skip building a message that would be discarded anyway:
+    ``if log_enabled(DEBUG): log_action(gui, f"...", DEBUG)``.
 
-    # Define the log file path (located three directories up inside 'logs' folder)
-    log_file_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs', 'fleet_logs.txt')
-
-    # Ensure the logs directory exists before writing the file
-    os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
-
-    # Open the log file in append mode and write the log entry
-    with open(log_file_path, 'a') as log_file:
-        log_file.write(log_message + "\n")
+    :param level: Log level (DEBUG, INFO, WARNING or ERROR).
+    """
+    return get_logger().enabled(level)
 
-def notify_user(gui, message):
+def log_action(gui, message, level=INFO):
     """
-    Displays a warning message to the user via a popup alert.
+    Logs an action message with a timestamp.
     
-    :param gui: Reference to the GUI application.
-    :param message: The message to be displayed in the warning alert.
+    - Displays the log message in the GUI.
+    - Queues it for the background writer, which prints it to the console and
+      appends it to the log file in batches.
+
+    :param gui: Reference to the GUI application where logs are displayed, or None when headless.
+    :param message: The message to log.
+    :param level: Log level of the message (INFO by default).
     """
-    messagebox.showwarning("Occupancy Alert", message)  # Show a warning popup
+    logger = get_logger()
+    if not logger.enabled(level):
+        return
+    started = time.perf_counter() if metrics.enabled else None
+    logger.log(message, level)
+
+    # Append the log message to the GUI text widget (skipped when running headless)
+    if gui is not None:
+        gui.log_text.insert("end", logger.format_line(time.time(), message) + "\n")
+        gui.log_text.see("end")  # Auto-scroll to the latest log entry
+    if started is not None:
+        metrics.observe("log_action_seconds", time.perf_counter() - started)
+        metrics.count("log_lines")
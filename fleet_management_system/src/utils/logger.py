@@ -0,0 +1,244 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Log levels (same values as the standard logging module)
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+# Default log file: fleet_management_system/logs/fleet_logs.txt
+DEFAULT_LOG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs', 'fleet_logs.txt')
+
+
+class FleetLogger:
+    def __init__(self, path=DEFAULT_LOG_PATH, level=INFO, console=True, jsonl_path=None,
+                 max_bytes=5 * 1024 * 1024, backup_count=3, queue_size=100000, batch_size=512, flush_interval=0.2):
+        """
+        Buffered logger that moves formatting and file I/O off the simulation thread.
+
+        Messages are put on a bounded queue; a background writer thread drains it in batches,
+        formats timestamps, writes the text log (and optionally a JSONL sink and the console)
+        and rotates the text log when it grows past ``max_bytes``. If the queue is full, the
+        message is dropped and counted instead of stalling the caller.
+
+        :param path: Text log file path, or None to disable the file sink.
+        :param level: Minimum level that is recorded.
+        :param console: Whether to echo log lines to stdout.
+        :param jsonl_path: Optional path of a structured JSON-lines sink.
+        :param max_bytes: Size at which the text log is rotated (0 disables rotation).
+        :param backup_count: Number of rotated files to keep (fleet_logs.txt.1, .2, ...).
+        :param queue_size: Maximum number of pending records.
+        :param batch_size: Maximum number of records written per batch.
+        :param flush_interval: Seconds the writer waits for more records before flushing.
+        """
+        self.path = path
+        self.level = level
+        self.console = console
+        self.jsonl_path = jsonl_path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0  # Records discarded because the queue was full
+        self.written = 0  # Records written by the writer thread
+        self._reported_dropped = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pid = os.getpid()
+        self._closed = False
+        self._file = None
+        self._jsonl_file = None
+        self._thread = threading.Thread(target=self._run, name="fleet-log-writer", daemon=True)
+        self._thread.start()
+
+    def enabled(self, level):
+        """
+        Returns True if messages at ``level`` are recorded. Hot paths check this before
+        building their message so disabled levels cost a single comparison.
+        """
+        return level >= self.level
+
+    def log(self, message, level=INFO, **fields):
+        """
+        Queues a message for the writer thread.
+
+        :param message: Text of the log entry.
+        :param level: Level of the entry.
+        :param fields: Extra structured fields, written to the JSONL sink only.
+        """
+        if level < self.level or self._closed:
+            return
+        try:
+            self._queue.put_nowait((time.time(), level, message, fields))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=5.0):
+        """
+        Blocks until every queued record has been written (or the timeout expires).
+        """
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self):
+        """
+        Flushes pending records and stops the writer thread.
+        """
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5.0)
+
+    @staticmethod
+    def format_line(timestamp, message):
+        return f"{datetime.fromtimestamp(timestamp).strftime('[%Y-%m-%d %H:%M:%S]')} {message}"
+
+    def _run(self):
+        pending = []
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # Drain whatever else is already queued into the same batch
+            stop = False
+            events = []
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    pending.append(item)
+                if len(pending) >= self.batch_size:
+                    self._write_batch(pending)
+                    pending = []
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if pending:
+                self._write_batch(pending)
+                pending = []
+            self._flush_files()
+            for event in events:
+                event.set()
+            if stop:
+                self._close_files()
+                return
+
+    def _write_batch(self, records):
+        if self.dropped != self._reported_dropped:
+            # Leave a trace in the log when the queue overflowed
+            records = records + [(time.time(), WARNING, f"Log queue full: dropped {self.dropped - self._reported_dropped} messages", {})]
+            self._reported_dropped = self.dropped
+        # Format timestamps once per second rather than once per record
+        last_second = None
+        prefix = ""
+        lines = []
+        for timestamp, _, message, _ in records:
+            second = int(timestamp)
+            if second != last_second:
+                last_second = second
+                prefix = datetime.fromtimestamp(second).strftime("[%Y-%m-%d %H:%M:%S]")
+            lines.append(f"{prefix} {message}\n")
+        text = "".join(lines)
+
+        if self.console:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        if self.path:
+            self._open_text_log().write(text)
+            self._maybe_rotate()
+        if self.jsonl_path:
+            if self._jsonl_file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.jsonl_path)), exist_ok=True)
+                self._jsonl_file = open(self.jsonl_path, 'a')
+            self._jsonl_file.write("".join(
+                json.dumps({"ts": timestamp, "level": LEVEL_NAMES.get(level, str(level)), "message": message, **fields}) + "\n"
+                for timestamp, level, message, fields in records
+            ))
+        self.written += len(records)
+
+    def _open_text_log(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, 'a')
+        return self._file
+
+    def _maybe_rotate(self):
+        if not self.max_bytes or self._file.tell() < self.max_bytes:
+            return
+        self._file.close()
+        self._file = None
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            open(self.path, 'w').close()
+
+    def _flush_files(self):
+        for f in (self._file, self._jsonl_file):
+            if f is not None:
+                f.flush()
+
+    def _close_files(self):
+        for f in (self._file, self._jsonl_file):
+            if f is not None:
+                f.close()
+        self._file = None
+        self._jsonl_file = None
+
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def get_logger():
+    """
+    Returns the process-wide logger, creating it on first use (and again after a fork, since
+    the writer thread does not survive into child processes).
+    """
+    global _logger
+    if _logger is None or _logger._pid != os.getpid():
+        with _logger_lock:
+            if _logger is None or _logger._pid != os.getpid():
+                _logger = FleetLogger()
+    return _logger
+
+
+def configure_logging(**kwargs):
+    """
+    Replaces the process-wide logger; accepts the same arguments as FleetLogger.
+    """
+    global _logger
+    with _logger_lock:
+        if _logger is not None and _logger._pid == os.getpid():
+            _logger.close()
+        _logger = FleetLogger(**kwargs)
+    return _logger
+
+
+def _close_at_exit():
+    if _logger is not None and _logger._pid == os.getpid():
+        _logger.close()
+
+
+atexit.register(_close_at_exit)
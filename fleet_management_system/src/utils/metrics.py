@@ -0,0 +1,205 @@
+import bisect
+import functools
+import json
+import os
+import time
+from collections import deque
+
+# Bucket upper bounds for durations (seconds) and for per-call or per-tick counts
+TIME_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+# Help text of the built-in metrics (shown in the Prometheus dump)
+DESCRIPTIONS = {
+    "tick_seconds": "Duration of one simulation tick (progress update and traffic resolution)",
+    "update_simulation_seconds": "Duration of one GUI simulation step, including the redraw",
+    "update_traffic_seconds": "Duration of TrafficManager.update_traffic",
+    "find_path_seconds": "Duration of TrafficManager.find_path (cache hits included)",
+    "draw_robots_seconds": "Duration of FleetGUI.draw_robots",
+    "log_action_seconds": "Duration of log_action",
+    "astar_expansions": "Vertices expanded per path search (cache misses only)",
+    "reroutes_per_tick": "Route recomputations per tick",
+    "log_lines_per_tick": "Log lines recorded per tick",
+    "path_searches_per_tick": "find_path calls per tick",
+}
+
+# Counters whose per-tick totals are also recorded as <name>_per_tick histograms
+PER_TICK_COUNTERS = ("reroutes", "log_lines", "path_searches")
+
+
+class RollingHistogram:
+    __slots__ = ("buckets", "counts", "count", "sum", "recent")
+
+    def __init__(self, buckets, window=1000):
+        """
+        Histogram with fixed buckets plus a window of the most recent samples.
+
+        Bucket counts, count and sum cover everything since the last reset (Prometheus
+        style); percentiles and the maximum are computed over the last ``window`` samples.
+
+        :param buckets: Sorted bucket upper bounds (an implicit +Inf bucket is added).
+        :param window: Number of recent samples kept for the rolling statistics.
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentile(self, q):
+        """
+        Returns the q-th percentile (0-100) of the recent samples, or 0.0 if there are none.
+        """
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    def snapshot(self):
+        recent = self.recent
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": max(recent) if recent else 0.0,
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class Metrics:
+    def __init__(self, window=1000):
+        """
+        Registry of timers and counters for the simulation hot paths.
+
+        Methods registered with ``instrument`` are only wrapped with timers while the
+        registry is enabled, and inline counters check ``enabled`` first, so a disabled
+        registry costs at most one attribute lookup per call. Histograms are created on
+        first use: names ending in ``_seconds`` get TIME_BUCKETS, all others COUNT_BUCKETS.
+
+        :param window: Number of recent samples each histogram keeps for its percentiles.
+        """
+        self.enabled = False
+        self.window = window
+        self.histograms = {}
+        self.counters = {}
+        self._tick_counts = dict.fromkeys(PER_TICK_COUNTERS, 0)
+
+    def enable(self, enabled=True):
+        """
+        Turns recording on or off, installing or removing the timers of instrumented methods.
+        """
+        self.enabled = enabled
+        for owner, attribute, name, original in _instrumented:
+            setattr(owner, attribute, _timed(original, name) if enabled else original)
+
+    def reset(self):
+        self.histograms.clear()
+        self.counters.clear()
+        self._tick_counts = dict.fromkeys(PER_TICK_COUNTERS, 0)
+
+    def observe(self, name, value):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            buckets = TIME_BUCKETS if name.endswith("_seconds") else COUNT_BUCKETS
+            histogram = self.histograms[name] = RollingHistogram(buckets, self.window)
+        histogram.observe(value)
+
+    def count(self, name, amount=1):
+        """
+        Adds to a counter (and to its per-tick total if it is one of PER_TICK_COUNTERS).
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+        if name in self._tick_counts:
+            self._tick_counts[name] += amount
+
+    def end_tick(self):
+        """
+        Records the per-tick counter totals as <name>_per_tick samples and starts a new tick.
+        """
+        for name, value in self._tick_counts.items():
+            self.observe(f"{name}_per_tick", value)
+            self._tick_counts[name] = 0
+
+    def snapshot(self):
+        """
+        Returns all counters and histogram summaries as a JSON-serializable dict.
+        """
+        return {
+            "time": time.time(),
+            "counters": dict(self.counters),
+            "histograms": {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())},
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix="fleet_"):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            metric = f"{prefix}{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, histogram in sorted(self.histograms.items()):
+            metric = f"{prefix}{name}"
+            if name in DESCRIPTIONS:
+                lines.append(f"# HELP {metric} {DESCRIPTIONS[name]}")
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum {histogram.sum}")
+            lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """
+        Writes the metrics to a local file: JSON for a ``.json`` path, Prometheus text otherwise.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+
+# Process-wide registry used by the instrumented code
+metrics = Metrics()
+
+
+_instrumented = []  # (owner, attribute, histogram name, original function)
+
+
+def _timed(func, name):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.observe(name, time.perf_counter() - started)
+    return wrapper
+
+
+def instrument(owner, attribute, name):
+    """
+    Registers ``owner.attribute`` (a method) to have each call timed into the ``name``
+    histogram. The timer is only installed while metrics are enabled, so instrumented
+    methods run unwrapped otherwise.
+    """
+    original = getattr(owner, attribute)
+    _instrumented.append((owner, attribute, name, original))
+    if metrics.enabled:
+        setattr(owner, attribute, _timed(original, name))
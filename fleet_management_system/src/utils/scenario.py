@@ -0,0 +1,198 @@
+import csv
+import itertools
+import json
+import os
+import random
+import time
+
+# Settings a scenario file may define; "sweep" lists alternative values for any of them
+DEFAULTS = {
+    "name": "scenario",
+    "map": os.path.join("data", "nav_graph_1.json"),
+    "planning_mode": "reactive",
+    "scheduler": "event",
+    "tick_interval": 0.05,
+    "array_store": False,
+    "duration": 600.0,  # Simulated seconds
+    "seed": 0,
+    "robots": 0,  # Robots spawned at random free vertices at time 0 (besides "spawns")
+    "priority_mix": {"1": 1.0},  # Priority -> weight for generated robots
+    "spawns": [],  # [{"time": s, "vertex": v, "priority": p}, ...]
+    "tasks": [],  # [{"time": s, "robot": "R1", "goal": v}, ...]
+    "task_stream": None,  # {"interval": s, "start": s} random goals for idle robots
+    "trace": None,  # Fleet trace file to record (see src.utils.trace)
+    "warm_start": None,  # Checkpoint to continue from instead of an empty fleet at time 0
+    "checkpoint": None,  # Checkpoint file written at the end of the run (see src.utils.checkpoint)
+}
+
+# Columns of the CSV report, in order
+REPORT_FIELDS = (
+    "name", "map", "planning_mode", "scheduler", "robots", "duration", "seed",
+    "tasks_assigned", "tasks_rejected", "tasks_completed", "throughput_per_hour",
+    "mean_trip_time", "p99_trip_time", "wait_time", "mean_wait_per_task",
+    "reroutes", "deadlocks", "events", "wall_seconds", "error",
+)
+
+
+def load_scenarios(path):
+    """
+    Reads a scenario file and expands it into the runs it describes.
+
+    The file holds one scenario object or a list of them. A scenario's "sweep" maps setting
+    names to lists of values; one run is produced per combination, named after the values,
+    e.g. ``{"robots": [10, 20], "planning_mode": ["reactive", "reservation"]}`` gives four.
+
+    :return: List of complete scenario dicts (DEFAULTS filled in).
+    :raises ValueError: On unknown settings.
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    runs = []
+    for entry in data if isinstance(data, list) else [data]:
+        sweep = entry.get("sweep", {})
+        unknown = (set(entry) | set(sweep)) - set(DEFAULTS) - {"sweep"}
+        if unknown:
+            raise ValueError(f"Unknown scenario settings in {path}: {', '.join(sorted(unknown))}")
+        keys = sorted(sweep)
+        for values in itertools.product(*(sweep[key] for key in keys)):
+            scenario = dict(DEFAULTS)
+            scenario.update({key: value for key, value in entry.items() if key != "sweep"})
+            scenario.update(zip(keys, values))
+            if keys:
+                scenario["name"] = scenario["name"] + "[" + ",".join(f"{k}={v}" for k, v in zip(keys, values)) + "]"
+            for key in ("map", "warm_start"):
+                if scenario[key] and not os.path.exists(scenario[key]) and os.path.exists(os.path.join(base_dir, scenario[key])):
+                    scenario[key] = os.path.join(base_dir, scenario[key])
+            runs.append(scenario)
+    return runs
+
+
+def percentile(values, q):
+    """
+    Returns the q-th percentile (0-100) of a list of numbers, or 0.0 if it is empty.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def _timeline(scenario, nav_graph, rng):
+    """
+    Returns the scenario's actions as a time-sorted list of (time, kind, data). At the same
+    instant spawns come before tasks; otherwise the file order is kept.
+    """
+    actions = [(float(spawn.get("time", 0.0)), "spawn", (spawn["vertex"], spawn.get("priority", 1)))
+               for spawn in scenario["spawns"]]
+    mix = scenario["priority_mix"]
+    priorities, weights = [int(p) for p in mix], list(mix.values())
+    taken = {spawn["vertex"] for spawn in scenario["spawns"]}
+    free = [v for v in range(len(nav_graph.vertices)) if v not in taken]
+    if scenario["robots"] > len(free):
+        raise ValueError(f"{scenario['name']}: {scenario['robots']} robots do not fit on {len(free)} free vertices")
+    for vertex in rng.sample(free, scenario["robots"]):
+        actions.append((0.0, "spawn", (vertex, rng.choices(priorities, weights)[0])))
+    actions.extend((float(task["time"]), "task", (task["robot"], task["goal"])) for task in scenario["tasks"])
+    stream = scenario["task_stream"]
+    if stream:
+        interval = float(stream["interval"])
+        at = float(stream.get("start", 0.0))
+        while at < scenario["duration"]:
+            actions.append((at, "stream", None))
+            at += interval
+    # sorted() is stable, so equal keys keep their file order
+    return sorted(actions, key=lambda action: (action[0], action[1] != "spawn"))
+
+
+def run_scenario(scenario):
+    """
+    Runs one scenario headlessly and returns its report row (a dict with REPORT_FIELDS).
+    Errors are reported in the row instead of raised, so one bad run does not stop a sweep.
+    """
+    # Imported here so worker processes only load the simulation when they run something
+    from src.controllers.simulation_engine import SimulationEngine
+    from src.models.nav_graph import NavGraph
+    from src.utils.logger import configure_logging
+
+    row = dict.fromkeys(REPORT_FIELDS, 0)
+    row.update({key: scenario[key] for key in ("name", "map", "planning_mode", "scheduler", "duration", "seed")})
+    row["error"] = ""
+    started = time.perf_counter()
+    try:
+        configure_logging(path=None, console=False)
+        nav_graph = NavGraph.load(scenario["map"])
+        engine = SimulationEngine(nav_graph, tick_interval=scenario["tick_interval"],
+                                  planning_mode=scenario["planning_mode"], array_store=scenario["array_store"],
+                                  scheduler=scenario["scheduler"])
+        rng = random.Random(scenario["seed"])
+        timeline = _timeline(scenario, nav_graph, rng)
+        assigned = rejected = 0
+        if scenario["warm_start"]:
+            # Robots, clocks and the task generator continue from the checkpoint; only the
+            # actions still ahead of it are played
+            extra = engine.restore_checkpoint(scenario["warm_start"], rng)
+            assigned, rejected = extra.get("tasks_assigned", 0), extra.get("tasks_rejected", 0)
+            timeline = [action for action in timeline if action[0] >= engine.time]
+        if scenario["trace"]:
+            engine.start_trace(scenario["trace"])
+        vertex_count = len(nav_graph.vertices)
+        for at, kind, data in timeline:
+            if at > scenario["duration"]:
+                break
+            engine.run(until=at)
+            if kind == "spawn":
+                engine.spawn_robot(*data)
+            elif kind == "task":
+                ok = engine.assign_task(*data)
+                assigned, rejected = assigned + ok, rejected + (not ok)
+            else:
+                for robot in engine.fleet_manager.robots:
+                    if robot.status in ("idle", "task complete"):
+                        goal = rng.randrange(vertex_count)
+                        if goal != robot.pos_idx:
+                            ok = engine.assign_task(robot, goal)
+                            assigned, rejected = assigned + ok, rejected + (not ok)
+        engine.run(until=scenario["duration"])
+        engine.stop_trace()
+        engine.close()
+        if scenario["checkpoint"]:
+            engine.save_checkpoint(scenario["checkpoint"], rng, {"tasks_assigned": assigned, "tasks_rejected": rejected},
+                                   background=False)
+
+        traffic_manager = engine.traffic_manager
+        trips = traffic_manager.trip_times
+        row.update({
+            "robots": len(engine.fleet_manager.robots),
+            "tasks_assigned": assigned,
+            "tasks_rejected": rejected,
+            "tasks_completed": len(trips),
+            "throughput_per_hour": len(trips) / scenario["duration"] * 3600 if scenario["duration"] else 0.0,
+            "mean_trip_time": sum(trips) / len(trips) if trips else 0.0,
+            "p99_trip_time": percentile(trips, 99),
+            "wait_time": engine.wait_time,
+            "mean_wait_per_task": engine.wait_time / assigned if assigned else 0.0,
+            "reroutes": traffic_manager.replan_count,
+            "deadlocks": traffic_manager.deadlock_count,
+            "events": engine.event_count if scenario["scheduler"] == "event" else engine.ticks,
+        })
+    except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["wall_seconds"] = time.perf_counter() - started
+    return row
+
+
+def write_report(rows, path):
+    """
+    Writes the report rows as JSON (``.json`` path) or CSV (any other path).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(rows, f, indent=2)
+        return path
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
@@ -0,0 +1,368 @@
+import json
+import os
+import struct
+
+from src.models.fleet_store import STATUS_CODES, STATUS_NAMES
+
+# Fleet trace: an append-only binary log of what happened in a simulation run. The file
+# starts with a short header, followed by length-prefixed records:
+#   META     JSON dict describing the run (graph file, tick interval, planning mode, ...)
+#   COMMAND  f64 simulated time + JSON dict (spawn_robot / assign_task and their outcome)
+#   TICK     f64 simulated time, u32 delta count, then one delta per robot that changed
+# A delta is the robot's slot (index in the fleet, in spawn order), a field mask and the
+# changed fields only. A truncated last record (e.g. after a crash) is ignored on read.
+MAGIC = b"FLTR"
+VERSION = 1
+TRACE_SUFFIX = ".fltrace"
+_HEADER = struct.Struct("<4sH")  # magic, version
+_RECORD = struct.Struct("<BI")  # record type, payload length
+_TIME = struct.Struct("<d")
+_TICK = struct.Struct("<dI")  # time, delta count
+_DELTA = struct.Struct("<IB")  # slot, field mask
+_POS = struct.Struct("<i")
+_PROGRESS = struct.Struct("<f")
+_STATUS = struct.Struct("<B")
+_PATH_LENGTH = struct.Struct("<I")
+
+# Record types
+META = 1
+COMMAND = 2
+TICK = 3
+
+# Delta field mask bits
+POS = 1
+PROGRESS = 2
+STATUS = 4
+PATH = 8  # Full path follows
+PATH_POP = 16  # The path lost its first vertex (the robot reached it); no payload
+
+_F32 = struct.Struct("<f")
+
+
+def _f32(value):
+    """
+    Rounds a float to the single precision progress is stored with.
+    """
+    return _F32.unpack(_F32.pack(value))[0]
+
+
+class RobotState:
+    __slots__ = ("id", "pos_idx", "progress", "status", "path", "priority", "color", "goal_idx")
+
+    def __init__(self, id, pos_idx, priority, color):
+        """
+        Position, progress, status and path of one robot as recorded in a trace.
+        """
+        self.id = id
+        self.pos_idx = pos_idx
+        self.priority = priority
+        self.color = color
+        self.goal_idx = None
+        self.progress = 0.0
+        self.status = "idle"
+        self.path = ()
+
+    def key(self):
+        return self.pos_idx, self.progress, self.status, self.path
+
+    def __repr__(self):
+        return f"RobotState({self.id!r}, pos={self.pos_idx}, {self.status!r}, progress={self.progress:.3f})"
+
+
+class TraceWriter:
+    def __init__(self, path, meta=None, flush_every=100):
+        """
+        Appends a fleet trace to ``path``. Records are buffered and written every
+        ``flush_every`` ticks and on ``close``, so tracing does not add a write per tick.
+
+        :param path: Trace file; an existing file is replaced.
+        :param meta: JSON-serializable dict written as the META record.
+        :param flush_every: Ticks between flushes of the write buffer.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.flush_every = flush_every
+        self.ticks = 0
+        self.commands = 0
+        self._file = open(path, "wb")
+        self._buffer = bytearray(_HEADER.pack(MAGIC, VERSION))
+        self._states = []  # slot -> (pos, progress, status code, path tuple) last written
+        self._append(META, json.dumps(meta or {}).encode("utf-8"))
+
+    def _append(self, record_type, payload):
+        self._buffer += _RECORD.pack(record_type, len(payload))
+        self._buffer += payload
+
+    def record_command(self, time, command, **fields):
+        """
+        Records a command issued to the fleet, e.g.
+        ``record_command(t, "spawn", robot_id="R1", pos=3, priority=2, color="green", ok=True)``.
+        A successful spawn starts tracking a new robot slot.
+        """
+        fields["command"] = command
+        self._append(COMMAND, _TIME.pack(time) + json.dumps(fields).encode("utf-8"))
+        self.commands += 1
+        if command == "spawn" and fields.get("ok"):
+            self._states.append((fields["pos"], 0.0, STATUS_CODES["idle"], ()))
+
+    def record_tick(self, time, robots):
+        """
+        Records the robots (in spawn order) whose position, progress, status or path changed
+        since the previous tick.
+        """
+        parts = []
+        count = 0
+        states = self._states
+        for slot, robot in enumerate(robots):
+            path = tuple(robot.path)
+            state = (robot.pos_idx, _f32(robot.progress), STATUS_CODES[robot.status], path)
+            last = states[slot]
+            if state == last:
+                continue
+            states[slot] = state
+            mask = 0
+            fields = []
+            if state[0] != last[0]:
+                mask |= POS
+                fields.append(_POS.pack(state[0]))
+            if state[1] != last[1]:
+                mask |= PROGRESS
+                fields.append(_PROGRESS.pack(state[1]))
+            if state[2] != last[2]:
+                mask |= STATUS
+                fields.append(_STATUS.pack(state[2]))
+            if path != last[3]:
+                if path == last[3][1:]:
+                    mask |= PATH_POP
+                else:
+                    mask |= PATH
+                    fields.append(_PATH_LENGTH.pack(len(path)) + struct.pack(f"<{len(path)}i", *path))
+            parts.append(_DELTA.pack(slot, mask))
+            parts.extend(fields)
+            count += 1
+        self._append(TICK, _TICK.pack(time, count) + b"".join(parts))
+        self.ticks += 1
+        if self.ticks % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._buffer = bytearray()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+
+class TraceReader:
+    def __init__(self, path):
+        """
+        Reads a fleet trace written by TraceWriter.
+
+        :ivar meta: Dict from the META record.
+        :raises ValueError: If the file is not a fleet trace of a supported version.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._data = f.read()
+        if len(self._data) < _HEADER.size:
+            raise ValueError(f"{path} is not a fleet trace")
+        magic, version = _HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a fleet trace of version {VERSION}")
+        self.meta = {}
+        for record_type, payload in self._raw_records():
+            if record_type == META:
+                self.meta = json.loads(bytes(payload))
+            break
+
+    def _raw_records(self):
+        data = self._data
+        offset = _HEADER.size
+        while offset + _RECORD.size <= len(data):
+            record_type, length = _RECORD.unpack_from(data, offset)
+            start = offset + _RECORD.size
+            if start + length > len(data):
+                return  # Truncated tail
+            yield record_type, memoryview(data)[start:start + length]
+            offset = start + length
+
+    def records(self):
+        """
+        Yields the decoded records after META:
+        ``(COMMAND, time, fields dict)`` and ``(TICK, time, [(slot, changes dict), ...])``
+        where changes holds the new values of "pos", "progress", "status" and "path".
+        """
+        for record_type, payload in self._raw_records():
+            if record_type == COMMAND:
+                yield COMMAND, _TIME.unpack_from(payload, 0)[0], json.loads(bytes(payload[_TIME.size:]))
+            elif record_type == TICK:
+                time, count = _TICK.unpack_from(payload, 0)
+                yield TICK, time, self._decode_deltas(payload, _TICK.size, count)
+
+    @staticmethod
+    def _decode_deltas(payload, offset, count):
+        deltas = []
+        for _ in range(count):
+            slot, mask = _DELTA.unpack_from(payload, offset)
+            offset += _DELTA.size
+            changes = {}
+            if mask & POS:
+                changes["pos"] = _POS.unpack_from(payload, offset)[0]
+                offset += _POS.size
+            if mask & PROGRESS:
+                changes["progress"] = _PROGRESS.unpack_from(payload, offset)[0]
+                offset += _PROGRESS.size
+            if mask & STATUS:
+                changes["status"] = STATUS_NAMES[_STATUS.unpack_from(payload, offset)[0]]
+                offset += _STATUS.size
+            if mask & PATH:
+                length = _PATH_LENGTH.unpack_from(payload, offset)[0]
+                offset += _PATH_LENGTH.size
+                changes["path"] = struct.unpack_from(f"<{length}i", payload, offset)
+                offset += 4 * length
+            elif mask & PATH_POP:
+                changes["path_pop"] = True
+            deltas.append((slot, changes))
+        return deltas
+
+    def states(self):
+        """
+        Replays the trace, yielding ``(time, robots)`` after every tick, where robots is the
+        list of RobotState objects in spawn order (the same list, updated in place).
+        """
+        robots = []
+        for record_type, time, data in self.records():
+            if record_type == COMMAND:
+                apply_command(robots, data)
+            else:
+                apply_deltas(robots, data)
+                yield time, robots
+
+
+def apply_command(robots, command):
+    """
+    Applies a recorded command to a list of RobotState-like objects. Only the outcome is
+    replayed: a successful spawn adds a robot, a successful assignment sets its goal.
+    """
+    if not command.get("ok"):
+        return None
+    if command["command"] == "spawn":
+        robot = RobotState(command["robot_id"], command["pos"], command["priority"], command["color"])
+        robots.append(robot)
+        return robot
+    if command["command"] == "assign":
+        robot = next((r for r in robots if r.id == command["robot_id"]), None)
+        if robot is not None:
+            robot.goal_idx = command["goal"]
+        return robot
+    return None
+
+
+# Commands that close or reopen parts of the nav graph (see SimulationEngine.close_lane)
+LANE_COMMANDS = ("close_lane", "open_lane", "disable_vertex", "enable_vertex")
+
+
+def apply_lane_command(nav_graph, command):
+    """
+    Applies a recorded lane closure or opening to a NavGraph.
+
+    :return: The directed lanes whose passability changed.
+    """
+    name = command["command"]
+    if name in ("disable_vertex", "enable_vertex"):
+        return getattr(nav_graph, name)(command["vertex"])
+    return getattr(nav_graph, name)(command["a"], command["b"], command.get("both_ways", True))
+
+
+def apply_deltas(robots, deltas):
+    """
+    Applies the deltas of one TICK record to robots in spawn order.
+    """
+    for slot, changes in deltas:
+        robot = robots[slot]
+        for field, value in changes.items():
+            if field == "pos":
+                robot.pos_idx = value
+            elif field == "progress":
+                robot.progress = value
+            elif field == "status":
+                robot.status = value
+            elif field == "path":
+                robot.path = list(value) if isinstance(robot.path, list) else tuple(value)
+            else:
+                robot.path = robot.path[1:]
+
+
+def first_divergence(path_a, path_b):
+    """
+    Compares two traces tick by tick (for example the same scenario run by two versions of
+    the traffic manager) and returns where they first differ, or None if they are identical.
+
+    :return: Dict with the tick number, both times and a description of the difference.
+    """
+    states_a = TraceReader(path_a).states()
+    states_b = TraceReader(path_b).states()
+    tick = 0
+    while True:
+        a = next(states_a, None)
+        b = next(states_b, None)
+        if a is None or b is None:
+            if a is b:
+                return None
+            return {"tick": tick, "time_a": a and a[0], "time_b": b and b[0],
+                    "difference": f"trace {'b' if b is None else 'a'} ends first"}
+        (time_a, robots_a), (time_b, robots_b) = a, b
+        if time_a != time_b:
+            return {"tick": tick, "time_a": time_a, "time_b": time_b, "difference": "tick times differ"}
+        if len(robots_a) != len(robots_b):
+            return {"tick": tick, "time_a": time_a, "time_b": time_b,
+                    "difference": f"{len(robots_a)} robots vs {len(robots_b)}"}
+        for robot_a, robot_b in zip(robots_a, robots_b):
+            if robot_a.id != robot_b.id or robot_a.key() != robot_b.key():
+                return {"tick": tick, "time_a": time_a, "time_b": time_b, "robot": robot_a.id,
+                        "difference": f"{robot_a!r} vs {robot_b!r}", "path_a": list(robot_a.path),
+                        "path_b": list(robot_b.path)}
+        tick += 1
+
+
+def check_trace(path):
+    """
+    Replays a trace headlessly and summarizes it: ticks, commands, robots, final statuses,
+    completed tasks, and vertex collisions (two moving or waiting robots standing on the same
+    vertex at the end of a tick), which a correct traffic manager never produces.
+    """
+    reader = TraceReader(path)
+    summary = {"meta": reader.meta, "ticks": 0, "commands": 0, "rejected_commands": 0,
+               "start_time": None, "end_time": None, "completed_tasks": 0, "collisions": []}
+    robots = []
+    for record_type, time, data in reader.records():
+        if summary["start_time"] is None:
+            summary["start_time"] = time
+        summary["end_time"] = time
+        if record_type == COMMAND:
+            summary["commands"] += 1
+            if not data.get("ok"):
+                summary["rejected_commands"] += 1
+            apply_command(robots, data)
+            continue
+        summary["ticks"] += 1
+        for slot, changes in data:
+            if changes.get("status") == "task complete":
+                summary["completed_tasks"] += 1
+        apply_deltas(robots, data)
+        standing = {}
+        for robot in robots:
+            if robot.status in ("moving", "waiting") and robot.progress == 0:
+                other = standing.setdefault(robot.pos_idx, robot.id)
+                if other != robot.id:
+                    summary["collisions"].append({"time": time, "vertex": robot.pos_idx, "robots": [other, robot.id]})
+    summary["robots"] = len(robots)
+    summary["statuses"] = {}
+    for robot in robots:
+        summary["statuses"][robot.status] = summary["statuses"].get(robot.status, 0) + 1
+    return summary
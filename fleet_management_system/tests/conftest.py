@@ -0,0 +1,47 @@
+import os
+import random
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.models.nav_graph import NavGraph  # noqa: E402
+from src.utils.logger import configure_logging  # noqa: E402
+
+BUNDLED_MAPS = (1, 2, 3)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def quiet_logging():
+    # Keep the test runs out of logs/fleet_logs.txt and off the console
+    configure_logging(path=None, console=False)
+
+
+@pytest.fixture
+def load_map(tmp_path):
+    """
+    Loads a bundled nav_graph from a copy, so the binary cache is written to tmp_path.
+    """
+    def load(number):
+        path = tmp_path / f"nav_graph_{number}.json"
+        if not path.exists():
+            shutil.copy(os.path.join(ROOT, "data", f"nav_graph_{number}.json"), path)
+        return NavGraph.load(str(path))
+    return load
+
+
+def populate(engine, seed, robots=6):
+    """
+    Spawns up to ``robots`` robots at random vertices and sends each to a random goal.
+    """
+    rng = random.Random(seed)
+    vertex_count = engine.nav_graph.vertex_count
+    for _ in range(robots):
+        robot = engine.spawn_robot(rng.randrange(vertex_count))
+        goal_idx = rng.randrange(vertex_count)
+        if robot is not None:
+            engine.assign_task(robot, goal_idx)
+    return engine
@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+from conftest import BUNDLED_MAPS
+from src.controllers.simulation_engine import SimulationEngine
+from src.utils.assignment import INF, solve_sparse_assignment
+
+UNREACHABLE = 1e9
+
+
+def solve_assignment(cost):
+    """
+    Reference solver: dense minimum-cost assignment (Hungarian method, shortest augmenting
+    path form, O(n^2 m)).
+
+    :param cost: Rectangular matrix (list of rows) of finite costs.
+    :return: List of (row, column) pairs; every row is matched if there are at least as many
+             columns as rows, otherwise every column is.
+    """
+    if not cost or not cost[0]:
+        return []
+    if len(cost) > len(cost[0]):
+        transposed = [list(column) for column in zip(*cost)]
+        return [(row, column) for column, row in solve_assignment(transposed)]
+
+    n, m = len(cost), len(cost[0])
+    # Potentials u (rows) and v (columns); p[j] is the row matched to column j (1-based, 0 = none)
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    columns = range(1, m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [INF] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            delta, j1 = INF, 0
+            for j in columns:
+                if not used[j]:
+                    reduced = row[j - 1] - ui0 - v[j]
+                    if reduced < minv[j]:
+                        minv[j] = reduced
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    return [(p[j] - 1, j - 1) for j in columns if p[j]]
+
+
+def test_sparse_assignment_matches_dense():
+    for seed in range(500):
+        rng = random.Random(seed)
+        rows, columns = rng.randint(1, 8), rng.randint(1, 8)
+        density = rng.choice((1.0, 0.6, 0.3))
+        cost = [[rng.uniform(0, 20) if rng.random() < density else None for _ in range(columns)] for _ in range(rows)]
+        sparse = solve_sparse_assignment([[(j, c) for j, c in enumerate(row) if c is not None] for row in cost], columns)
+        dense = solve_assignment([[UNREACHABLE if c is None else c for c in row] for row in cost])
+        dense = [(i, j) for i, j in dense if cost[i][j] is not None]
+        assert len({i for i, _ in sparse}) == len({j for _, j in sparse}) == len(sparse) == len(dense), f"seed {seed}"
+        assert sum(cost[i][j] for i, j in sparse) == pytest.approx(sum(cost[i][j] for i, j in dense)), f"seed {seed}"
+
+
+@pytest.mark.parametrize("map_number", BUNDLED_MAPS)
+def test_nearest_candidates_serve_the_same_priorities(load_map, map_number):
+    nav_graph = load_map(map_number)
+    vertex_count = nav_graph.vertex_count
+    for seed in range(10):
+        served = []
+        for candidates in (1, 2, vertex_count):
+            rng = random.Random(seed)
+            engine = SimulationEngine(nav_graph)
+            spawns = rng.sample(range(vertex_count), vertex_count // 2)
+            for pos_idx in spawns:
+                engine.spawn_robot(pos_idx, rng.randint(1, 3))
+            goals = rng.sample([v for v in range(vertex_count) if v not in spawns], rng.randint(1, vertex_count // 3))
+            assigned = engine.fleet_manager.assign_tasks(goals, candidates=candidates)
+            served.append(sorted(robot.priority for robot, _ in assigned))
+        assert served[0] == served[1] == served[2], f"seed {seed}"
+
+
+@pytest.mark.parametrize("map_number", BUNDLED_MAPS)
+def test_batch_routes_avoid_occupied_vertices_and_lanes(load_map, map_number):
+    nav_graph = load_map(map_number)
+    vertex_count = nav_graph.vertex_count
+    for seed in range(10):
+        rng = random.Random(seed)
+        engine = SimulationEngine(nav_graph)
+        traffic_manager = engine.traffic_manager
+        for pos_idx in rng.sample(range(vertex_count), vertex_count // 2):
+            engine.spawn_robot(pos_idx)
+        for robot in engine.fleet_manager.robots[::2]:
+            engine.assign_task(robot, rng.randrange(vertex_count))
+        engine.tick()
+        occupied_vertices = set(traffic_manager.occupied_vertices)
+        occupied_lanes = set(traffic_manager.occupied_lanes)
+        for robot, _ in engine.assign_tasks(range(vertex_count)):
+            route = [robot.pos_idx] + robot.path
+            assert not occupied_vertices & set(robot.path)
+            assert not occupied_lanes & {traffic_manager._lane_key(a, b) for a, b in zip(route, route[1:])}
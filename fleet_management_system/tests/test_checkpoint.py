@@ -0,0 +1,20 @@
+from conftest import populate
+from src.controllers.simulation_engine import SimulationEngine
+from src.utils.checkpoint import read_checkpoint
+
+
+def test_background_write_matches_foreground_write(load_map, tmp_path):
+    engine = populate(SimulationEngine(load_map(1)), 3)
+    for _ in range(40):
+        engine.tick()
+    background, foreground = tmp_path / "background.flckpt", tmp_path / "foreground.flckpt"
+    future = engine.save_checkpoint(str(background))
+    engine.tick()  # The state was packed before the call returned
+    engine.save_checkpoint(str(foreground), background=False)
+    assert future.result() == str(background)
+    assert read_checkpoint(str(background))["robots"] != read_checkpoint(str(foreground))["robots"]
+
+    restored = SimulationEngine.from_checkpoint(str(background), nav_graph=engine.nav_graph)
+    restored.tick()
+    restored.save_checkpoint(str(background), background=False)
+    assert background.read_bytes() == foreground.read_bytes()
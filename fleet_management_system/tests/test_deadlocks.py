@@ -0,0 +1,72 @@
+import math
+
+import pytest
+
+from conftest import BUNDLED_MAPS, populate
+from src.controllers.simulation_engine import SimulationEngine
+
+
+def position(nav_graph, robot):
+    x, y = nav_graph.coords_x[robot.pos_idx], nav_graph.coords_y[robot.pos_idx]
+    if robot.progress > 0 and robot.path:
+        next_idx = robot.path[0]
+        x += (nav_graph.coords_x[next_idx] - x) * robot.progress
+        y += (nav_graph.coords_y[next_idx] - y) * robot.progress
+    return x, y
+
+
+@pytest.mark.parametrize("scheduler", SimulationEngine.SCHEDULERS)
+@pytest.mark.parametrize("map_number", BUNDLED_MAPS)
+def test_robots_never_jump(load_map, map_number, scheduler):
+    # Yields and reroutes must not snap a robot on a lane back to the vertex it left
+    nav_graph = load_map(map_number)
+    top_speed = max(
+        math.dist((nav_graph.coords_x[a], nav_graph.coords_y[a]), (nav_graph.coords_x[b], nav_graph.coords_y[b]))
+        / nav_graph.travel_time(a, b)
+        for a, b in nav_graph.edges()
+    )
+    for seed in range(20):
+        engine = populate(SimulationEngine(nav_graph, scheduler=scheduler), seed)
+        last = {robot.id: (position(nav_graph, robot), engine.time) for robot in engine.fleet_manager.robots}
+        for _ in range(1000):
+            if scheduler == "event":
+                if not engine.process_event():
+                    break
+            else:
+                engine.tick()
+            for robot in engine.fleet_manager.robots:
+                here = position(nav_graph, robot)
+                there, then = last[robot.id]
+                assert math.dist(here, there) <= top_speed * (engine.time - then) * 1.001 + 1e-6, \
+                    f"seed {seed}: {robot.id} jumped from {there} to {here} at t={engine.time:.2f}"
+                last[robot.id] = (here, engine.time)
+
+
+def test_mid_lane_robot_turns_back_to_yield(load_map):
+    nav_graph = load_map(3)
+    engine = SimulationEngine(nav_graph)
+    traffic_manager = engine.traffic_manager
+    robot = engine.spawn_robot(1)
+    engine.assign_task(robot, 6)
+    first = robot.path[0]
+    robot.progress = 0.25
+    spot = position(nav_graph, robot)
+    traffic_manager._build_conflict_index(engine.fleet_manager.robots)
+    traffic_manager._robot_lookup = {robot.id: robot}
+
+    assert traffic_manager._yield(robot)
+    assert robot.pos_idx == first and robot.path[0] == 1 and robot.progress == pytest.approx(0.75)
+    assert position(nav_graph, robot) == pytest.approx(spot)
+
+
+@pytest.mark.parametrize("map_number", BUNDLED_MAPS)
+def test_parked_and_stuck_robots_make_way(load_map, map_number):
+    # Reservation mode: robots standing at their goal, or stuck without a route, must not
+    # block the others for good
+    nav_graph = load_map(map_number)
+    for seed in range(40):
+        engine = populate(SimulationEngine(nav_graph, planning_mode="reservation"), seed, 3)
+        engine.run(max_ticks=3000)
+        left = [robot.id for robot in engine.fleet_manager.robots if robot.status in ("moving", "waiting")]
+        assert not left, f"seed {seed}: {left} never finished"
+        assert not engine.traffic_manager._making_way
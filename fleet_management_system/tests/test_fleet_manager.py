@@ -0,0 +1,42 @@
+import pytest
+
+from src.controllers.command_server import CommandServer
+from src.controllers.simulation_engine import SimulationEngine
+
+
+@pytest.mark.parametrize("vertex", [-1, 7, 10 ** 6])
+def test_unknown_vertices_are_refused_before_any_change(load_map, vertex):
+    engine = SimulationEngine(load_map(3))
+    robot = engine.spawn_robot(0)
+    fleet_manager = engine.fleet_manager
+
+    with pytest.raises(ValueError, match="Unknown vertex"):
+        engine.spawn_robot(vertex)
+    with pytest.raises(ValueError, match="Unknown vertex"):
+        engine.assign_task(robot, vertex)
+    with pytest.raises(ValueError, match="Unknown vertex"):
+        engine.assign_tasks([5, vertex])
+    assert fleet_manager.robot_count == 1 and len(fleet_manager.robots) == 1
+    assert (robot.pos_idx, robot.goal_idx, robot.path, robot.status) == (0, None, [], "idle")
+
+
+def test_command_server_reports_unknown_vertices(load_map):
+    server = CommandServer(SimulationEngine(load_map(3)), port=0)
+    with pytest.raises(ValueError, match="Unknown vertex 99"):
+        server._apply("spawn", {"vertex": 99})
+    assert server.engine.fleet_manager.robots == []
+
+
+@pytest.mark.parametrize("planning_mode", ["reactive", "reservation"])
+def test_spawns_are_refused_where_robots_stand(load_map, planning_mode):
+    engine = SimulationEngine(load_map(3), planning_mode=planning_mode)
+    parked = engine.spawn_robot(0)
+    assert engine.spawn_robot(0) is None
+    robot = engine.spawn_robot(1)
+    engine.assign_task(robot, 6)
+    while robot.pos_idx == 1:
+        engine.tick()
+    assert engine.spawn_robot(robot.pos_idx) is None
+    engine.run()
+    assert engine.spawn_robot(1) is not None
+    assert parked.pos_idx == 0 and engine.spawn_robot(0) is None
@@ -0,0 +1,14 @@
+import subprocess
+import sys
+
+from conftest import ROOT
+
+HEADLESS_MODULES = ("src.controllers.simulation_engine", "src.controllers.command_server", "server", "run_scenarios",
+                    "replay")
+
+
+def test_engine_imports_without_tkinter():
+    # A None entry in sys.modules makes ``import tkinter`` fail as on a host without Tk
+    code = "import sys; sys.modules['tkinter'] = None\n" + "".join(f"import {name}\n" for name in HEADLESS_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
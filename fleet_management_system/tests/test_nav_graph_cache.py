@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from src.models import nav_graph_cache
+from src.models.nav_graph import NavGraph
+from src.models.nav_graph_cache import cache_path_for, open_cache, write_cache
+
+
+def test_touched_source_keeps_its_cache_and_is_restamped(load_map, monkeypatch):
+    source_path = load_map(1).file_path
+    cache_path = cache_path_for(source_path)
+    stat = os.stat(source_path)
+    os.utime(source_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    compiled = open_cache(cache_path, source_path)
+    assert compiled is not None and compiled.header["mtime_ns"] == stat.st_mtime_ns + 10 ** 9
+
+    def no_hashing(path):
+        raise AssertionError("the restamped cache was hashed again")
+
+    monkeypatch.setattr(nav_graph_cache, "file_sha256", no_hashing)
+    assert open_cache(cache_path, source_path) is not None
+    assert NavGraph.load(source_path).compiled is not None
+
+
+def test_failed_write_leaves_no_temporary_file(load_map):
+    source_path = load_map(1).file_path
+    cache_path = os.path.join(os.path.dirname(source_path), "broken.navbin")
+    with pytest.raises(TypeError):
+        write_cache(cache_path, source_path, {}, [], meta={"unserializable": object()})
+    assert not [name for name in os.listdir(os.path.dirname(source_path)) if name.startswith("broken")]
@@ -0,0 +1,37 @@
+import pytest
+
+from conftest import BUNDLED_MAPS, populate
+from src.controllers.simulation_engine import SimulationEngine
+from src.controllers.traffic_manager import TrafficManager
+
+
+def outcome(engine):
+    traffic_manager = engine.traffic_manager
+    robots = [(robot.id, robot.pos_idx, robot.status, tuple(robot.path), round(robot.progress, 9))
+              for robot in engine.fleet_manager.robots]
+    return robots, traffic_manager.trip_times, traffic_manager.replan_count, traffic_manager.deadlock_count
+
+
+@pytest.mark.parametrize("planning_mode", TrafficManager.PLANNING_MODES)
+@pytest.mark.parametrize("map_number", BUNDLED_MAPS)
+def test_event_scheduler_matches_fixed_ticks(load_map, map_number, planning_mode):
+    nav_graph = load_map(map_number)
+    for seed in range(8):
+        results = []
+        for scheduler in SimulationEngine.SCHEDULERS:
+            engine = populate(SimulationEngine(nav_graph, scheduler=scheduler, planning_mode=planning_mode), seed, 8)
+            engine.run(until=90.0)
+            results.append(outcome(engine))
+        fixed, event = results
+        assert event == fixed, f"seed {seed}"
+
+
+def test_event_scheduler_skips_idle_ticks(load_map):
+    nav_graph = load_map(1)
+    fixed = populate(SimulationEngine(nav_graph), 2, 4)
+    event = populate(SimulationEngine(nav_graph, scheduler="event"), 2, 4)
+    ticks = fixed.run()
+    events = event.run()
+    assert event.time == fixed.time
+    assert outcome(event) == outcome(fixed)
+    assert events < ticks / 2
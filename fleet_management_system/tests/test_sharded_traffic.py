@@ -0,0 +1,47 @@
+import pytest
+
+from conftest import BUNDLED_MAPS, populate
+from src.controllers.simulation_engine import SimulationEngine
+
+
+def trajectory(nav_graph, seed, regions, ticks=400):
+    engine = populate(SimulationEngine(nav_graph, traffic_shards=regions), seed, nav_graph.vertex_count // 2)
+    traffic_manager = engine.traffic_manager
+    traffic_manager.parallel_min_robots = 0
+    states = []
+    try:
+        for _ in range(ticks):
+            engine.tick()
+            states.append((
+                [(robot.id, robot.pos_idx, robot.status, tuple(robot.path), round(robot.progress, 9))
+                 for robot in engine.fleet_manager.robots],
+                dict(traffic_manager.wait_for), traffic_manager.replan_count, traffic_manager.deadlock_count,
+            ))
+    finally:
+        engine.close()
+    return states, list(traffic_manager.trip_times), traffic_manager.handoffs
+
+
+@pytest.mark.parametrize("map_number", BUNDLED_MAPS)
+def test_regions_match_a_single_shard(load_map, map_number):
+    nav_graph = load_map(map_number)
+    handoffs = 0
+    for seed in range(4):
+        single, trips, _ = trajectory(nav_graph, seed, 1)
+        for regions in (2, 3):
+            states, region_trips, region_handoffs = trajectory(nav_graph, seed, regions)
+            assert states == single, f"seed {seed}, {regions} regions"
+            assert region_trips == trips, f"seed {seed}, {regions} regions"
+            handoffs += region_handoffs
+    assert handoffs  # The border protocol was exercised
+
+
+def test_close_stops_the_workers(load_map):
+    engine = populate(SimulationEngine(load_map(2), traffic_shards=2), 0, 8)
+    engine.traffic_manager.parallel_min_robots = 0
+    engine.tick()
+    workers = list(engine.traffic_manager._pool._processes.values())
+    assert workers and all(worker.is_alive() for worker in workers)
+    engine.close()
+    assert engine.traffic_manager._pool is None
+    assert not any(worker.is_alive() for worker in workers)
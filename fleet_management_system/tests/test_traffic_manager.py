@@ -0,0 +1,74 @@
+import pytest
+
+from conftest import BUNDLED_MAPS, populate
+from src.controllers.simulation_engine import SimulationEngine
+from src.controllers.traffic_manager import TrafficManager
+
+
+def lane_of(robot):
+    return tuple(sorted([robot.pos_idx, robot.path[0]]))
+
+
+# The conflict queries as update_traffic ran them before the vertex, lane and next-edge
+# indexes: full scans of the fleet
+def build_scan(self, robots):
+    self._scanned = robots
+
+
+def scan_meeting_robots(self, robot, lane):
+    next_idx = robot.path[0]
+    return [
+        r for r in self._scanned
+        if r != robot and r.status == "moving" and r.path and (
+            (r.pos_idx == next_idx and r.path[0] == robot.pos_idx) or lane_of(r) == lane
+        )
+    ]
+
+
+def scan_same_edge_robots(self, robot, next_idx):
+    return [r for r in self._scanned if r != robot and r.pos_idx == robot.pos_idx and r.path and r.path[0] == next_idx]
+
+
+def scan_blockers(self, robot, next_idx, lane):
+    return [
+        r for r in self._scanned
+        if r != robot and (
+            (r.status == "moving" and r.path and lane_of(r) == lane)
+            or (r.pos_idx == next_idx and r.status in ["moving", "waiting"])
+        )
+    ]
+
+
+def scan_robots_at(self, robot, vertex):
+    return [r for r in self._scanned if r != robot and r.pos_idx == vertex]
+
+
+def trajectory(nav_graph, seed, robots, ticks=600):
+    engine = populate(SimulationEngine(nav_graph), seed, robots)
+    traffic_manager = engine.traffic_manager
+    states = []
+    for _ in range(ticks):
+        engine.tick()
+        states.append((
+            [(robot.id, robot.pos_idx, robot.status, tuple(robot.path), round(robot.progress, 9))
+             for robot in engine.fleet_manager.robots],
+            dict(traffic_manager.wait_for), traffic_manager.replan_count, traffic_manager.deadlock_count,
+        ))
+    return states
+
+
+@pytest.mark.parametrize("map_number", BUNDLED_MAPS)
+def test_indexed_conflicts_match_full_scans(load_map, monkeypatch, map_number):
+    nav_graph = load_map(map_number)
+    for seed in range(8):
+        robots = nav_graph.vertex_count // 2
+        indexed = trajectory(nav_graph, seed, robots)
+        with monkeypatch.context() as patch:
+            patch.setattr(TrafficManager, "_build_conflict_index", build_scan)
+            patch.setattr(TrafficManager, "_reindex_robot", lambda self, robot: None)
+            patch.setattr(TrafficManager, "_meeting_robots", scan_meeting_robots)
+            patch.setattr(TrafficManager, "_same_edge_robots", scan_same_edge_robots)
+            patch.setattr(TrafficManager, "_blockers", scan_blockers)
+            patch.setattr(TrafficManager, "_robots_at", scan_robots_at)
+            scanned = trajectory(nav_graph, seed, robots)
+        assert indexed == scanned, f"seed {seed}"